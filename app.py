@@ -1,4 +1,6 @@
+import json
 import tempfile
+import time
 from pathlib import Path
 
 import requests
@@ -25,6 +27,20 @@ def download_and_show_image(url: str, caption: str = ""):
         st.error(f"Error loading image: {e}")
 
 
+def show_sources(sources: list[dict]):
+    st.markdown("### 🧩 Sources")
+    for i, src in enumerate(sources, 1):
+        if src["type"] == "text":
+            st.write(f"**[{i}] Text ({src['time']})**: {src['text'][:200]}...")
+        else:
+            img_url = src.get("path")
+            if img_url:
+                img_url = img_url.replace(
+                    "http://minio:9000", "http://localhost:9005"
+                ).replace("http://chatbot:8080", BASE_URL)
+                download_and_show_image(img_url, caption=f"Frame ~{src['time']}")
+
+
 BASE_URL = "http://localhost:8080"
 
 st.set_page_config(page_title="Video QA Demo", page_icon="🎥", layout="wide")
@@ -48,10 +64,30 @@ if st.button("Ingest Video"):
                     f"{BASE_URL}/ingest", json={"video_url": youtube_url}
                 )
                 if response.status_code == 200:
-                    data = response.json()
-                    st.session_state["video_id"] = data["video_id"]
-                    st.success(f"✅ Ingested successfully! Video ID: {data['video_id']}")
-                    st.write(f"Frames extracted: {data['frames']}")
+                    job = response.json()
+                    progress = st.empty()
+                    while job["status"] in ("queued", "running"):
+                        progress.write(
+                            " · ".join(
+                                f"{stage}: {state}"
+                                for stage, state in job["stages"].items()
+                            )
+                        )
+                        time.sleep(2)
+                        job = requests.get(f"{BASE_URL}/ingest/{job['job_id']}").json()
+                    progress.empty()
+
+                    if job["status"] == "completed":
+                        st.session_state["video_id"] = job["video_id"]
+                        st.success(
+                            f"✅ Ingested successfully! Video ID: {job['video_id']}"
+                        )
+                        st.write(
+                            f"Frames extracted: {job['frames']} "
+                            f"({job['frames_dropped']} near-duplicates skipped)"
+                        )
+                    else:
+                        st.error(f"❌ Ingest failed: {job['error']}")
                 else:
                     st.error(f"❌ Ingest failed ({response.status_code})")
                     st.write(response.text)
@@ -71,9 +107,8 @@ if "video_id" in st.session_state:
         if not query.strip():
             st.warning("Please enter a query.")
         else:
-            with st.spinner("Querying video..."):
-                files = None
-                if uploaded_image:
+            if uploaded_image:
+                with st.spinner("Querying video..."):
                     files = {
                         "image": (
                             uploaded_image.name,
@@ -82,38 +117,62 @@ if "video_id" in st.session_state:
                         )
                     }
 
+                    try:
+                        response = requests.post(
+                            f"{BASE_URL}/chat",
+                            data={
+                                "video_id": st.session_state["video_id"],
+                                "query": query,
+                            },
+                            files=files,
+                            timeout=120,
+                        )
+
+                        if response.status_code == 200:
+                            result = response.json()
+
+                            # --- Display Answer ---
+                            st.markdown("### 💬 Answer")
+                            st.write(result["answer"])
+
+                            # --- Display Sources ---
+                            show_sources(result["sources"])
+
+                        else:
+                            st.error(f"API Error: {response.status_code}")
+                            st.write(response.text)
+
+                    except Exception as e:
+                        st.error(f"Request failed: {e}")
+            else:
+                # Text-only queries stream tokens as the LLM generates them
                 try:
                     response = requests.post(
-                        f"{BASE_URL}/chat",
+                        f"{BASE_URL}/chat/stream",
                         data={"video_id": st.session_state["video_id"], "query": query},
-                        files=files,
+                        stream=True,
                         timeout=120,
                     )
 
                     if response.status_code == 200:
-                        result = response.json()
-
-                        # --- Display Answer ---
                         st.markdown("### 💬 Answer")
-                        st.write(result["answer"])
-
-                        # --- Display Sources ---
-                        st.markdown("### 🧩 Sources")
-                        for i, src in enumerate(result["sources"], 1):
-                            if src["type"] == "text":
-                                st.write(
-                                    f"**[{i}] Text ({src['time']})**: {src['text'][:200]}..."
-                                )
-                            else:
-                                img_url = src.get("path")
-                                if img_url:
-                                    img_url = img_url.replace(
-                                        "http://minio:9000", "http://localhost:9005"
-                                    )
-                                    download_and_show_image(
-                                        img_url, caption=f"Frame ~{src['time']}"
-                                    )
-
+                        answer_box = st.empty()
+                        answer = ""
+                        for line in response.iter_lines():
+                            if not line:
+                                continue
+                            frame = json.loads(line)
+                            if frame["type"] == "sources":
+                                show_sources(frame["sources"])
+                            elif frame["type"] == "token":
+                                answer += frame["text"]
+                                answer_box.markdown(answer + "▌")
+                            elif frame["type"] == "done":
+                                answer_box.markdown(frame["answer"])
+                                if frame.get("cached"):
+                                    st.caption("♻️ Answered from cache")
+                            elif frame["type"] == "error":
+                                st.error(f"API Error: {frame['detail']}")
                     else:
                         st.error(f"API Error: {response.status_code}")
                         st.write(response.text)
@@ -7,6 +7,11 @@ class Settings(BaseSettings):
     # ── App ─────────────────────────────────────
     APP_NAME: str = "YouTube Multimodal RAG API"
     DEBUG: bool = False
+    # "chat": chat/search only, "ingest": ingest only, "all": both
+    APP_ROLE: Literal["all", "chat", "ingest"] = "all"
+    WARMUP_ON_STARTUP: bool = False  # load the role's models before serving
+    LOG_LEVEL: str = "INFO"
+    LOG_JSON: bool = True  # one JSON object per line, for Promtail/Loki
 
     # ── MinIO ───────────────────────────────────
     MINIO_ENDPOINT: str = "minio:9000"
@@ -14,30 +19,134 @@ class Settings(BaseSettings):
     MINIO_SECRET_KEY: str = "minioadmin"
     MINIO_BUCKET: str = "video-assets"
     MINIO_SECURE: bool = False
+    UPLOAD_WORKERS: int = 8  # concurrent uploads in StorageManager.upload_many
+    UPLOAD_RETRIES: int = 3
+    UPLOAD_BACKOFF: float = 0.5  # seconds, doubled per retry
+    FRAME_PACK: bool = False  # store each video's frames as one tar + byte-range index
+    MINIO_MAX_CONNECTIONS: int = 16  # shared HTTP pool, also async executor threads
 
     # ── Qdrant ──────────────────────────────────
     QDRANT_URL: str = "http://qdrant:6333"
+    # "per_video": text_{id}/img_{id} collections per video
+    # "shared": one text + one image collection filtered on a video_id payload
+    QDRANT_LAYOUT: Literal["per_video", "shared"] = "per_video"
+    QDRANT_TEXT_COLLECTION: str = "text_shared"
+    QDRANT_IMAGE_COLLECTION: str = "img_shared"
+    QDRANT_MAX_CONNECTIONS: int = 32  # per client (sync and async)
+    # Vector storage per modality (see src/vector_profiles.py): "float32",
+    # "on_disk", "scalar" (int8) or "product" quantization with on-disk
+    # originals and rescoring. Applies to collections created afterwards.
+    QDRANT_TEXT_PROFILE: Literal["float32", "on_disk", "scalar", "product"] = "float32"
+    QDRANT_IMAGE_PROFILE: Literal["float32", "on_disk", "scalar", "product"] = "float32"
+    # HNSW "m" / "ef_construct" / search "ef"; {} = Qdrant defaults
+    QDRANT_TEXT_HNSW: dict[str, int] = {}
+    QDRANT_IMAGE_HNSW: dict[str, int] = {}
+    QDRANT_OVERSAMPLING: float = 2.0  # quantized candidates per result, rescored
+    QDRANT_PQ_COMPRESSION: Literal["x4", "x8", "x16", "x32", "x64"] = "x16"
 
     # ── Redis ───────────────────────────────────
     REDIS_HOST: str = "redis"
     REDIS_PORT: int = 6379
     REDIS_DB: int = 0
+    REDIS_MAX_CONNECTIONS: int = 64  # per pool (sync and async)
+    REDIS_POOL_TIMEOUT: float = 5.0  # seconds to wait for a free connection
 
     # ── Ollama (Llava) ──────────────────────────
     OLLAMA_MODEL: str = "llava:3b-q4_0"
     OLLAMA_BASE_URL: str = "http://ollama:11434"
+    OLLAMA_CONTEXT_WINDOW: int = 2048
+    OLLAMA_MAX_NEW_TOKENS: int = 256
+    OLLAMA_IMAGE_TOKENS: int = 576  # prompt tokens LLaVA spends per image
 
     # ── Embedding Models ────────────────────────
     TEXT_EMBED_MODEL: str = "sentence-transformers/all-MiniLM-L6-v2"
     IMAGE_EMBED_MODEL: str = "ViT-B/32"
     EMBED_DEVICE: Literal["cpu", "cuda"] = "cpu"
+    EMBED_THREADS: int = 0  # torch / ONNX Runtime intra-op threads, 0 = default
+    # CLIP frame encoder: torch, or an ONNX Runtime export (CPU) of its
+    # visual tower, optionally with int8 matmul weights
+    IMAGE_EMBED_BACKEND: Literal["torch", "onnx", "onnx_int8"] = "torch"
+    IMAGE_EMBED_ONNX_DIR: str = "onnx_cache"  # exported models, built on first use
+    WHISPER_MODEL: str = "base"  # transcription fallback when YouTube has none
+    WHISPER_CHUNK_SECONDS: float = 60.0  # audio is split at silences near this
+    WHISPER_WORKERS: int = 0  # shared processes, 0 = cores // INGEST_WORKERS
+    QUERY_EMBED_WINDOW_MS: float = 5.0  # how long concurrent queries are batched
+    QUERY_EMBED_MAX_BATCH: int = 32
+    QUERY_EMBED_CACHE_SIZE: int = 2048  # cached query embeddings
 
     # ── Video Processing ────────────────────────
     FRAME_FPS: float = 0.2
     MAX_VIDEO_HEIGHT: int = 720
+    FRAME_SAMPLER: Literal["fixed", "scene"] = "scene"
+    FRAME_FORMAT: Literal["jpeg", "webp"] = "jpeg"  # stored frames, encoded in memory
+    FRAME_QUALITY: int = 85
+    SCENE_SAMPLE_FPS: float = 1.0  # rate at which candidate frames are scored
+    SCENE_THRESHOLD: float = 0.15  # change score (0-1) that counts as a new scene
+    SCENE_MIN_INTERVAL: float = 2.0  # seconds
+    SCENE_MAX_INTERVAL: float = 30.0  # seconds
+
+    # ── Chat ────────────────────────────────────
+    QUERY_ENGINE_CACHE_SIZE: int = 32  # videos kept loaded per process
+    QUERY_ENGINE_CACHE_TTL: int = 600  # seconds
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_THRESHOLD: float = 0.95  # cosine similarity to reuse an answer
+    ANSWER_CACHE_TTL: int = 24 * 3600  # seconds
+    ANSWER_CACHE_MAX_ENTRIES: int = 500  # per video, least recently used evicted
+    IMAGE_QUERY_MAX_BYTES: int = 10 * 1024 * 1024  # larger uploads get 413
+    IMAGE_QUERY_MAX_SIDE: int = 448  # downscale before CLIP (it crops to 224)
+    IMAGE_QUERY_TOP_K: int = 2  # frames retrieved per image question
+    IMAGE_QUERY_CACHE_SIZE: int = 256  # embeddings keyed by upload content hash
+
+    # ── Retrieval ───────────────────────────────
+    # "hybrid" fuses Qdrant dense hits with a per-video BM25 index (RRF);
+    # "dense" is the plain llama_index vector retriever
+    RETRIEVAL_MODE: Literal["dense", "hybrid"] = "hybrid"
+    RETRIEVAL_TOP_K: int = 3  # transcript nodes sent to the LLM
+    RETRIEVAL_CANDIDATES: int = 10  # per retriever, before fusion
+    RETRIEVAL_RRF_K: int = 60
+    RERANK_ENABLED: bool = False  # cross-encoder pass over fused candidates
+    RERANK_MODEL: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    # Long videos are searched coarse-to-fine: the SEGMENT_TOP_K best chapters
+    # or windows first, then only the nodes and frames inside them
+    # (see src/segments.py). Shorter videos search everything.
+    SEGMENT_INDEX: bool = True
+    SEGMENT_MIN_DURATION: float = 1800.0  # seconds of video
+    SEGMENT_SECONDS: float = 300.0  # window length; longer chapters are split
+    SEGMENT_TOP_K: int = 3
+    # Retrieved context is packed into a single prompt (see src/context.py)
+    CONTEXT_RESERVED_TOKENS: int = 64  # slack for tokenizer mismatch
+    CONTEXT_MIN_TEXT_TOKENS: int = 256  # images are dropped before text
+    CONTEXT_MERGE_GAP: float = 1.0  # seconds between segments that get merged
+
+    # ── Search ──────────────────────────────────
+    SEARCH_MAX_TOP_K: int = 50
+    SEARCH_SNIPPET_CHARS: int = 200
+
+    # ── Ingest Artifact Cache ─────────────────────
+    ARTIFACT_CACHE_DIR: str = "artifact_cache"
+    ARTIFACT_CACHE_MAX_GB: float = 20.0
+    CHUNK_SIZES: list[int] = [128, 512, 2048]  # HierarchicalNodeParser levels
+
+    # ── Ingest Jobs ─────────────────────────────
+    # A job downloads on one pool, then transcribes/decodes/embeds on another;
+    # INGEST_MAX_ACTIVE caps videos in between so downloads can't run ahead.
+    # Transcription and embedding take slots shared by all processing videos
+    INGEST_WORKERS: int = 2  # videos processed at once (CPU-bound)
+    INGEST_DOWNLOAD_WORKERS: int = 4  # concurrent downloads (network-bound)
+    INGEST_TRANSCRIBE_WORKERS: int = 2  # videos transcribing at once (Whisper)
+    INGEST_EMBED_WORKERS: int = 2  # embedding batches at once, text + frames
+    INGEST_MAX_ACTIVE: int = 6  # videos from download start to indexed
+    INGEST_BATCH_MAX_VIDEOS: int = 500  # per batch, after playlist expansion
+    FRAME_EMBED_BATCH: int = 64  # frames per CLIP forward pass
+    TRANSCRIPT_BATCH: int = 64  # segments parsed and embedded together
+    INCREMENTAL_INDEX: bool = True  # queryable while a new video ingests
+    INGEST_JOB_TTL: int = 7 * 24 * 3600  # seconds a finished job stays pollable
+    INGEST_JOB_LEASE: int = 60  # seconds a replica's claim on a job outlives it
 
     # ── API ────────────────────────
     CHAT_APP_PORT: int = 8080
+    API_PUBLIC_URL: str = "http://chatbot:8080"  # base URL for packed frame links
+    STORAGE_HEALTH_TIMEOUT: float = 2.0  # seconds per backend in /ready
 
     model_config = {
         "env_file": ".env",  # ← Load from .env
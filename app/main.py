@@ -1,18 +1,131 @@
+import json
+import logging
+import mimetypes
+import time
+import uuid
+from contextlib import asynccontextmanager
 from typing import Optional
 
 import uvicorn
 from config.settings import settings
-from fastapi import FastAPI, File, Form, HTTPException, UploadFile
-from schema import ChatResponse, IngestRequest, IngestResponse
-from src import ChatService, IngestService
+from fastapi import (
+    Depends,
+    FastAPI,
+    File,
+    Form,
+    HTTPException,
+    Query,
+    Request,
+    UploadFile,
+)
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from schema import (
+    ChatResponse,
+    IngestBatchRequest,
+    IngestBatchResponse,
+    IngestJobResponse,
+    IngestRequest,
+    SearchResponse,
+    VideoStatusResponse,
+)
+from src import (
+    ChatService,
+    IngestJobManager,
+    ModelRegistry,
+    SearchService,
+    StorageManager,
+)
+from utils.helpers import StageTimer
+from utils.telemetry import (
+    HTTP_SECONDS,
+    METRICS_CONTENT_TYPE,
+    bind_request_id,
+    log_event,
+    metrics,
+    setup_logging,
+)
 
-app = FastAPI(title=settings.APP_NAME)
+setup_logging(settings.LOG_LEVEL, settings.LOG_JSON)
+
+# CPU seconds until here: interpreter start-up plus imports. Models and
+# storage clients load on first use (or on /warmup), not at import.
+startup = {"imports": round(time.process_time(), 3)}
 
 # Global services
-ingest_service = IngestService()
+ingest_jobs = IngestJobManager()
 chat_service = ChatService()
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    timer = StageTimer()
+    # Storage pools are shared by every request and ingest job of the process
+    with timer.track("storage"):
+        StorageManager.open()
+        health = await StorageManager.health()
+    if any(state != "ok" for state in health.values()):
+        log_event("Storage unavailable at start-up", logging.WARNING, health=health)
+    if settings.APP_ROLE in ("all", "ingest"):
+        with timer.track("resume_jobs"):
+            resumed = ingest_jobs.resume()
+        if resumed:
+            log_event("Resumed ingest jobs", jobs=resumed)
+    if settings.WARMUP_ON_STARTUP:
+        with timer.track("warmup"):
+            ModelRegistry.warmup()
+    startup.update(timer.timings())
+    log_event("Started", role=settings.APP_ROLE, startup=startup)
+    yield
+    ingest_jobs.shutdown()
+    ModelRegistry.shutdown()
+    await StorageManager.close()
+
+
+app = FastAPI(title=settings.APP_NAME, lifespan=lifespan)
+
+
+@app.middleware("http")
+async def observe_requests(request: Request, call_next):
+    # Request id from the caller (or a fresh one) on every log line of the
+    # request; latency per route template, so /ingest/{job_id} is one series
+    rid = request.headers.get("x-request-id") or uuid.uuid4().hex[:16]
+    start = time.perf_counter()
+    with bind_request_id(rid):
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+        finally:
+            elapsed = time.perf_counter() - start
+            route = request.scope.get("route")
+            path = route.path if route else "unmatched"
+            HTTP_SECONDS.labels(request.method, path, status).observe(elapsed)
+            log_event(
+                "request",
+                logging.DEBUG if path in ("/metrics", "/health") else logging.INFO,
+                method=request.method,
+                route=path,
+                status=status,
+                seconds=round(elapsed, 4),
+            )
+    response.headers["X-Request-ID"] = rid
+    return response
+
+
+def require_role(role: str):
+    # Endpoints a replica doesn't serve fail fast instead of loading models
+    def check():
+        if settings.APP_ROLE not in ("all", role):
+            raise HTTPException(
+                status_code=503,
+                detail=f"{role} is disabled on this replica "
+                f"(APP_ROLE={settings.APP_ROLE})",
+            )
+
+    return Depends(check)
+
+
 @app.get("/")
 async def root():
     return {"message": f"{settings.APP_NAME}", "debug": settings.DEBUG}
@@ -23,33 +136,179 @@ def health():
     return {"status": "ok"}
 
 
-@app.post("/ingest", response_model=IngestResponse)
-async def ingest_video(request: IngestRequest):
+@app.get("/ready")
+async def ready():
+    # Readiness: every storage backend answers within STORAGE_HEALTH_TIMEOUT
+    health = await StorageManager.health()
+    ok = all(state == "ok" for state in health.values())
+    return JSONResponse(
+        {"status": "ok" if ok else "unavailable", "storage": health},
+        status_code=200 if ok else 503,
+    )
+
+
+@app.get("/stats")
+def stats():
+    return {
+        "query_engine_cache": chat_service.engines.stats(),
+        "answer_cache": chat_service.answers.stats(),
+        "image_query_cache": chat_service.image_embeddings.stats(),
+        "models": ModelRegistry.stats(),
+    }
+
+
+@app.get("/metrics")
+def prometheus_metrics():
+    return Response(content=metrics(), media_type=METRICS_CONTENT_TYPE)
+
+
+@app.get("/startup")
+def startup_report():
+    # Per-component start-up cost; models and clients appear once loaded
+    return {
+        "role": settings.APP_ROLE,
+        "startup": startup,
+        "clients": StorageManager.connect_times,
+        "models": ModelRegistry.load_times,
+    }
+
+
+@app.post("/warmup")
+def warmup():
+    return {"role": settings.APP_ROLE, "models": ModelRegistry.warmup()}
+
+
+@app.post(
+    "/ingest",
+    response_model=IngestJobResponse,
+    dependencies=[require_role("ingest")],
+)
+def ingest_video(request: IngestRequest):
     try:
-        result = ingest_service.ingest(request.video_url)
-        video_id = result["video_id"]
-        return IngestResponse(
-            video_id=video_id, status="ingested", frames=len(result.get("frames", []))
-        )
+        job = ingest_jobs.submit(request.video_url)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    return IngestJobResponse(**job)
 
 
-@app.post("/chat", response_model=ChatResponse)
+@app.post(
+    "/ingest/batch",
+    response_model=IngestBatchResponse,
+    dependencies=[require_role("ingest")],
+)
+def ingest_batch(request: IngestBatchRequest):
+    # Playlists are expanded here (one yt-dlp listing each); the videos are
+    # then queued like single ingests and polled with GET /ingest/batch/{id}
+    max_videos = min(
+        request.max_videos or settings.INGEST_BATCH_MAX_VIDEOS,
+        settings.INGEST_BATCH_MAX_VIDEOS,
+    )
+    try:
+        batch = ingest_jobs.submit_batch(request.urls, max_videos=max_videos)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return IngestBatchResponse(**batch)
+
+
+@app.get("/ingest/batch/{batch_id}", response_model=IngestBatchResponse)
+def ingest_batch_status(batch_id: str):
+    batch = ingest_jobs.get_batch(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return IngestBatchResponse(**batch)
+
+
+@app.get("/ingest/{job_id}", response_model=IngestJobResponse)
+def ingest_status(job_id: str):
+    job = ingest_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return IngestJobResponse(**job)
+
+
+@app.get("/videos/{video_id}/status", response_model=VideoStatusResponse)
+async def video_status(video_id: str):
+    # While an ingest runs, indexed_until is how far into the video chat sees
+    return VideoStatusResponse(**await StorageManager.aget_video_status(video_id))
+
+
+@app.get("/frames/{video_id}/{name}")
+async def packed_frame(video_id: str, name: str):
+    try:
+        data = await StorageManager.aread_packed(f"frames/{video_id}", name)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Frame not found")
+    return Response(
+        content=data, media_type=mimetypes.guess_type(name)[0] or "image/png"
+    )
+
+
+@app.post("/chat", response_model=ChatResponse, dependencies=[require_role("chat")])
 async def chat(
     video_id: str = Form(...),
     query: str = Form(...),
     image: Optional[UploadFile] = File(None),
 ):
 
-    image_bytes = await image.read() if image else None
-    response = chat_service.chat(
-        video_id=video_id, query=query, image_bytes=image_bytes
-    )
+    image_bytes = None
+    if image:
+        image_bytes = await image.read(settings.IMAGE_QUERY_MAX_BYTES + 1)
+        if len(image_bytes) > settings.IMAGE_QUERY_MAX_BYTES:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Image larger than {settings.IMAGE_QUERY_MAX_BYTES} bytes",
+            )
+    try:
+        await chat_service.acoverage(video_id)
+        # Embedding, retrieval and the LLM call block; keep them off the loop
+        response = await run_in_threadpool(
+            chat_service.chat, video_id=video_id, query=query, image_bytes=image_bytes
+        )
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     return ChatResponse(**response)
 
 
+@app.get("/search", response_model=SearchResponse, dependencies=[require_role("chat")])
+async def search(
+    q: str = Query(..., min_length=1),
+    top_k: int = Query(10, ge=1, le=settings.SEARCH_MAX_TOP_K),
+    offset: int = Query(0, ge=0),
+    per_video: int = Query(3, ge=1),
+    images: bool = False,
+):
+    # Library-wide retrieval, no LLM call
+    return SearchResponse(
+        **await SearchService.asearch(
+            q, top_k=top_k, offset=offset, per_video=per_video, images=images
+        )
+    )
+
+
+@app.post("/chat/stream", dependencies=[require_role("chat")])
+async def chat_stream(video_id: str = Form(...), query: str = Form(...)):
+    # NDJSON: a "sources" frame, then "token" frames, then a "done" summary.
+    # The generator is sync, so Starlette iterates it on the threadpool.
+    try:
+        await chat_service.acoverage(video_id)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    def frames():
+        try:
+            for frame in chat_service.stream_chat(video_id=video_id, query=query):
+                yield json.dumps(frame) + "\n"
+        except Exception as e:
+            yield json.dumps({"type": "error", "detail": str(e)}) + "\n"
+
+    return StreamingResponse(frames(), media_type="application/x-ndjson")
+
+
 if __name__ == "__main__":
     uvicorn.run(
         app,
@@ -1,3 +1,21 @@
-from .main import ChatResponse, IngestRequest, IngestResponse
+from .main import (
+    ChatResponse,
+    IngestBatchRequest,
+    IngestBatchResponse,
+    IngestJobResponse,
+    IngestRequest,
+    SearchHit,
+    SearchResponse,
+    VideoStatusResponse,
+)
 
-__all__ = ["IngestRequest", "IngestResponse", "ChatResponse"]
+__all__ = [
+    "IngestRequest",
+    "IngestBatchRequest",
+    "IngestBatchResponse",
+    "IngestJobResponse",
+    "ChatResponse",
+    "SearchHit",
+    "SearchResponse",
+    "VideoStatusResponse",
+]
@@ -1,14 +1,52 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class IngestRequest(BaseModel):
     video_url: str
 
 
-class IngestResponse(BaseModel):
+class IngestJobResponse(BaseModel):
+    job_id: str
     video_id: str
-    status: str
-    frames: int
+    status: str  # queued | running | completed | failed
+    stage: str
+    stages: dict[str, str]  # stage -> pending | running | done | failed
+    frames: int = 0
+    frames_dropped: int = 0  # near-duplicate frames skipped by the sampler
+    timings: dict[str, float] = {}  # wall-clock seconds per ingest stage
+    cache_hits: list[str] = []  # stages reused from the artifact cache
+    disk: dict[str, int] = {}  # local bytes: "written", "peak" footprint
+    frame_bytes: int = 0  # encoded frames sent to MinIO
+    error: str = ""
+    created_at: float
+    updated_at: float
+
+
+class IngestBatchRequest(BaseModel):
+    # Video URLs (watch, youtu.be, shorts, embed, bare ids) and/or playlist
+    # or channel URLs; duplicates across all of them are ingested once
+    urls: list[str] = Field(min_length=1)
+    max_videos: int | None = Field(default=None, ge=1)
+
+
+class IngestBatchVideo(BaseModel):
+    job_id: str
+    video_id: str
+    status: str  # queued | running | completed | failed | expired
+    stage: str
+    frames: int = 0
+    error: str = ""
+
+
+class IngestBatchResponse(BaseModel):
+    batch_id: str
+    status: str  # running | completed (per-video outcomes in `videos`)
+    counts: dict[str, int]  # videos per status
+    videos: list[IngestBatchVideo]
+    rejected: list[dict[str, str]] = []  # {"url", "error"} that didn't expand
+    duplicates: int = 0  # repeated video ids dropped
+    truncated: int = 0  # videos over the batch limit dropped
+    created_at: float
 
 
 class SourceItem(BaseModel):
@@ -21,3 +59,32 @@ class SourceItem(BaseModel):
 class ChatResponse(BaseModel):
     answer: str
     sources: list[SourceItem]
+    cached: bool = False  # served from the semantic answer cache
+    partial: bool = False  # video still ingesting; answer covers a prefix
+    indexed_until: float | None = None  # seconds indexed when partial
+
+
+class VideoStatusResponse(BaseModel):
+    video_id: str
+    state: str  # missing | partial | indexed | failed
+    indexed_until: float  # seconds of video queryable so far
+    duration: float | None = None
+    version: int
+
+
+class SearchHit(BaseModel):
+    video_id: str
+    type: str  # text | image
+    score: float
+    start: float  # seconds; equal to end for frames
+    end: float
+    time: str
+    text: str | None = None
+    path: str | None = None
+
+
+class SearchResponse(BaseModel):
+    query: str
+    hits: list[SearchHit]
+    total: int  # ranked hits for paging; shared layout: within offset + top_k videos
+    took_ms: float
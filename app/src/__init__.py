@@ -1,4 +1,15 @@
 from .chat import ChatService
 from .ingest import IngestService
+from .jobs import IngestJobManager
+from .models import ModelRegistry
+from .search import SearchService
+from .storage import StorageManager
 
-__all__ = ["ChatService", "IngestService"]
+__all__ = [
+    "ChatService",
+    "IngestService",
+    "IngestJobManager",
+    "ModelRegistry",
+    "SearchService",
+    "StorageManager",
+]
@@ -0,0 +1,96 @@
+import base64
+import json
+import time
+import uuid
+
+import numpy as np
+from config.settings import settings
+
+from .storage import StorageManager
+
+
+class AnswerCache:
+    # Semantic cache of chat answers in Redis. Entries for a video live in
+    # answers:{video_id}:{version} (hash: entry id -> JSON) with a companion
+    # sorted set ordering them by last use for eviction. The ingest version in
+    # the key means a re-ingest never serves answers from the old index.
+    prefix = "answers:"
+
+    def __init__(
+        self,
+        threshold: float = settings.ANSWER_CACHE_THRESHOLD,
+        ttl: int = settings.ANSWER_CACHE_TTL,
+        max_entries: int = settings.ANSWER_CACHE_MAX_ENTRIES,
+    ):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def redis(self):
+        return StorageManager.redis
+
+    def _key(self, video_id: str) -> str:
+        return f"{self.prefix}{video_id}:{StorageManager.get_video_version(video_id)}"
+
+    def get(self, video_id: str, embedding: list[float]) -> dict | None:
+        # Best cached answer whose query embedding clears the threshold
+        key = self._key(video_id)
+        entries = self.redis.hgetall(key)
+        best, best_score = None, self.threshold
+        if entries:
+            query = np.asarray(embedding, dtype=np.float32)
+            query /= np.linalg.norm(query) or 1.0
+            for entry_id, raw in entries.items():
+                entry = json.loads(raw)
+                vector = np.frombuffer(
+                    base64.b64decode(entry["embedding"]), dtype=np.float32
+                )
+                score = float(vector @ query)
+                if score >= best_score:
+                    best, best_score = (entry_id, entry), score
+
+        if best is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.redis.zadd(f"{key}:lru", {best[0]: time.time()})
+        return {**best[1]["response"], "similarity": round(best_score, 4)}
+
+    def set(self, video_id: str, query: str, embedding: list[float], response: dict):
+        vector = np.asarray(embedding, dtype=np.float32)
+        vector /= np.linalg.norm(vector) or 1.0
+        entry_id = uuid.uuid4().hex
+        entry = {
+            "query": query,
+            "embedding": base64.b64encode(vector.tobytes()).decode(),
+            "response": response,
+        }
+        key = self._key(video_id)
+        pipe = self.redis.pipeline()
+        pipe.hset(key, entry_id, json.dumps(entry))
+        pipe.zadd(f"{key}:lru", {entry_id: time.time()})
+        pipe.expire(key, self.ttl)
+        pipe.expire(f"{key}:lru", self.ttl)
+        pipe.execute()
+
+        # Evict least recently used entries beyond the per-video cap
+        overflow = self.redis.zcard(f"{key}:lru") - self.max_entries
+        if overflow > 0:
+            stale = [m for m, _ in self.redis.zpopmin(f"{key}:lru", overflow)]
+            self.redis.hdel(key, *stale)
+
+    def invalidate(self, video_id: str):
+        keys = list(self.redis.scan_iter(f"{self.prefix}{video_id}:*"))
+        if keys:
+            self.redis.delete(*keys)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+import shutil
+import stat
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from config.settings import settings
+
+
+class ArtifactCache:
+    # On-disk cache of ingest stage outputs, laid out as
+    # {root}/{video_id}/{stage}-{key}/. The key hashes every setting the stage
+    # output depends on (including upstream stage keys), so changing e.g. the
+    # embedding model only invalidates the stages downstream of it.
+    marker = ".complete"
+
+    def __init__(
+        self,
+        root: str = settings.ARTIFACT_CACHE_DIR,
+        max_bytes: int = int(settings.ARTIFACT_CACHE_MAX_GB * 1024**3),
+    ):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        # video_id -> local disk report of its running ingest (see write)
+        self.usage: dict[str, dict[str, int]] = {}
+        self.lock = threading.Lock()
+        # Download and processing threads both prune; one pass at a time
+        self.prune_lock = threading.Lock()
+
+    @staticmethod
+    def key(**params) -> str:
+        payload = json.dumps(params, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+    def dir(self, video_id: str, stage: str, key: str) -> Path:
+        return self.root / video_id / f"{stage}-{key}"
+
+    def get(self, video_id: str, stage: str, key: str) -> Path | None:
+        path = self.dir(video_id, stage, key)
+        if not (path / self.marker).exists():
+            return None
+        (path / self.marker).touch()  # recency for pruning
+        return path
+
+    @contextmanager
+    def write(self, video_id: str, stage: str, key: str):
+        # Outputs are written in place and only marked complete on success;
+        # a crashed write is cleared by the next attempt. Older keys of the
+        # same stage are dropped once the new one is complete.
+        path = self.dir(video_id, stage, key)
+        shutil.rmtree(path, ignore_errors=True)
+        path.mkdir(parents=True)
+        try:
+            yield path
+        except BaseException:
+            # Half-written outputs (e.g. a .part download) never outlive a failure
+            shutil.rmtree(path, ignore_errors=True)
+            raise
+        (path / self.marker).touch()
+        with self.lock:
+            usage = self.usage.setdefault(video_id, {"written": 0, "peak": 0})
+            usage["written"] += _disk_bytes(path)
+            # The video's footprint peaks now: the new output and the one it
+            # replaces are both on disk
+            usage["peak"] = max(usage["peak"], _disk_bytes(path.parent))
+        for old in path.parent.glob(f"{stage}-*"):
+            if old != path:
+                shutil.rmtree(old, ignore_errors=True)
+
+    def start_usage(self, video_id: str):
+        # Counts from zero written bytes, peak starting at what's cached
+        with self.lock:
+            self.usage[video_id] = {
+                "written": 0,
+                "peak": _disk_bytes(self.root / video_id),
+            }
+
+    def pop_usage(self, video_id: str) -> dict[str, int]:
+        with self.lock:
+            return self.usage.pop(video_id, {"written": 0, "peak": 0})
+
+    def prune(self):
+        # Evict least recently used videos until the cache fits max_bytes.
+        # Videos with an ingest in flight (a download waiting for its
+        # processing slot, say) are never evicted.
+        if not self.root.exists():
+            return
+        with self.prune_lock:
+            videos = []
+            for video_dir in self.root.iterdir():
+                stats = _file_stats(video_dir)
+                size = sum(st.st_size for st in stats)
+                used = max((st.st_mtime for st in stats), default=time.time())
+                videos.append((used, size, video_dir))
+
+            total = sum(size for _, size, _ in videos)
+            for _, size, video_dir in sorted(videos, key=lambda v: v[0]):
+                if total <= self.max_bytes:
+                    break
+                # Checked under the lock so an ingest starting now either
+                # keeps its video or begins after the removal
+                with self.lock:
+                    if video_dir.name in self.usage:
+                        continue
+                    shutil.rmtree(video_dir, ignore_errors=True)
+                total -= size
+
+
+def _file_stats(path: Path) -> list[os.stat_result]:
+    # Files under `path`; ingest threads replace stage outputs concurrently,
+    # so anything removed mid-walk is skipped (os.walk ignores vanished dirs)
+    stats = []
+    for parent, _, names in os.walk(path):
+        for name in names:
+            try:
+                st = os.stat(os.path.join(parent, name))
+            except FileNotFoundError:
+                continue
+            if stat.S_ISREG(st.st_mode):
+                stats.append(st)
+    return stats
+
+
+def _disk_bytes(path: Path) -> int:
+    if not path.exists():
+        return 0
+    return sum(st.st_size for st in _file_stats(path))
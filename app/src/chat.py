@@ -1,57 +1,254 @@
-from pathlib import Path
+import hashlib
+import time
+from typing import Iterator
 
 from config.settings import settings
-from llama_index.core import Settings, StorageContext, load_index_from_storage
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
-from llama_index.llms.ollama import Ollama
-from utils.helpers import ts
+from llama_index.core import QueryBundle, StorageContext, load_index_from_storage
+from llama_index.core.base.llms.generic_utils import image_node_to_image_block
+from llama_index.core.llms import LLM, ChatMessage, TextBlock
+from llama_index.core.prompts.default_prompts import DEFAULT_TEXT_QA_PROMPT
+from llama_index.core.query_engine import SimpleMultiModalQueryEngine
+from llama_index.core.schema import ImageNode, MetadataMode, NodeWithScore
+from llama_index.core.vector_stores import VectorStoreQuery
+from utils.helpers import StageTimer, load_query_image, ts
+from utils.telemetry import record_packing, record_stages
 
+from .answers import AnswerCache
+from .cache import LRUCache
+from .context import pack_context
+from .models import ModelRegistry
+from .retrieval import BM25Index, HybridRetriever
+from .segments import SegmentIndex, SegmentRetriever
 from .storage import StorageManager
 
-Settings.llm = Ollama(
-    model=settings.OLLAMA_MODEL,
-    base_url=settings.OLLAMA_BASE_URL,
-    request_timeout=120,
-    max_new_tokens=256,
-    context_window=2048,
-)
-Settings.embed_model = HuggingFaceEmbedding(model_name=settings.TEXT_EMBED_MODEL)
-
 
 class ChatService:
-    @staticmethod
-    def chat(video_id: str, query: str, image_bytes: bytes | None = None) -> dict:
+    engines = LRUCache(
+        maxsize=settings.QUERY_ENGINE_CACHE_SIZE, ttl=settings.QUERY_ENGINE_CACHE_TTL
+    )
 
-        index_store = StorageManager.get_redis_index_store(f"index_{video_id}")
-        text_vec = StorageManager.get_qdrant_vector_store(f"text_{video_id}", 384)
-        img_vec = StorageManager.get_qdrant_vector_store(f"img_{video_id}", 512)
+    answers = AnswerCache()
 
-        storage_ctx = StorageContext.from_defaults(
-            vector_store=text_vec,
-            image_store=img_vec,
-            index_store=index_store,
-        )
+    image_embeddings = LRUCache(maxsize=settings.IMAGE_QUERY_CACHE_SIZE)
+
+    @classmethod
+    def chat(cls, video_id: str, query: str, image_bytes: bytes | None = None) -> dict:
+        timer, fields = StageTimer(), {"video_id": video_id, "image": bool(image_bytes)}
+        try:
+            coverage = cls.coverage(video_id)
+            # Text questions close enough to an earlier one reuse its answer; a
+            # partially indexed video's answers would go stale, so skip the cache
+            embedding = None
+            if settings.ANSWER_CACHE_ENABLED and not image_bytes and not coverage:
+                with timer.track("answer_cache"):
+                    embedding = ModelRegistry.query_embed().get_query_embedding(query)
+                    cached = cls.answers.get(video_id, embedding)
+                if cached is not None:
+                    fields["cached"] = True
+                    return {
+                        "answer": cached["answer"],
+                        "sources": cached["sources"],
+                        "cached": True,
+                        **coverage,
+                    }
+
+            if image_bytes:
+                # Image questions: nearest frames to the upload, answered in memory
+                with timer.track("image_embed"):
+                    image_embedding = cls.image_query_embedding(image_bytes)
+                with timer.track("retrieve"):
+                    nodes = cls.image_retrieve(video_id, image_embedding)
+                with timer.track("pack"):
+                    nodes = cls.pack(query, nodes, fields)
+                with timer.track("generate"):
+                    message = cls.build_message(query, nodes)
+                    answer = ModelRegistry.llm().chat([message]).message.content
+            else:
+                with timer.track("index_load"):
+                    query_engine = cls.get_query_engine(video_id)
+                bundle = QueryBundle(query_str=query)
+                with timer.track("retrieve"):
+                    nodes = query_engine.retrieve(bundle)
+                with timer.track("pack"):
+                    nodes = cls.pack(query, nodes, fields)
+                with timer.track("generate"):
+                    answer = query_engine.synthesize(bundle, nodes).response
 
-        index = load_index_from_storage(
-            storage_ctx, embed_model=Settings.embed_model, index_id=video_id
+            with timer.track("format_sources"):
+                result = {"answer": answer, "sources": cls.format_sources(nodes)}
+            if embedding is not None:
+                cls.answers.set(video_id, query, embedding, result)
+            fields["cached"] = False
+            return {**result, "cached": False, **coverage}
+        finally:
+            record_stages("chat", timer.timings(), **fields)
+
+    @classmethod
+    def stream_chat(cls, video_id: str, query: str) -> Iterator[dict]:
+        started = time.perf_counter()
+        timer, fields = StageTimer(), {"video_id": video_id}
+        try:
+            coverage = cls.coverage(video_id)
+            embedding = None
+            if settings.ANSWER_CACHE_ENABLED and not coverage:
+                with timer.track("answer_cache"):
+                    embedding = ModelRegistry.query_embed().get_query_embedding(query)
+                    cached = cls.answers.get(video_id, embedding)
+                if cached is not None:
+                    fields["cached"] = True
+                    # Same frame sequence, with the whole answer as one token
+                    yield {"type": "sources", "sources": cached["sources"]}
+                    yield {"type": "token", "text": cached["answer"]}
+                    elapsed = time.perf_counter() - started
+                    yield {
+                        "type": "done",
+                        "answer": cached["answer"],
+                        "tokens": 0,
+                        "time_to_first_token": elapsed,
+                        "elapsed": elapsed,
+                        "cached": True,
+                    }
+                    return
+
+            with timer.track("index_load"):
+                query_engine = cls.get_query_engine(video_id)
+            with timer.track("retrieve"):
+                nodes = query_engine.retrieve(QueryBundle(query_str=query))
+            with timer.track("pack"):
+                nodes = cls.pack(query, nodes, fields)
+            sources = []
+            for frame in cls.stream_answer(query, nodes):
+                if frame["type"] == "sources":
+                    sources = frame["sources"]
+                elif frame["type"] == "done":
+                    frame.update(coverage)
+                    fields.update(
+                        cached=False,
+                        first_token=frame["time_to_first_token"],
+                        generate=frame["elapsed"],
+                    )
+                    if embedding is not None:
+                        cls.answers.set(
+                            video_id,
+                            query,
+                            embedding,
+                            {"answer": frame["answer"], "sources": sources},
+                        )
+                yield frame
+        finally:
+            timings = timer.timings()
+            for stage in ("first_token", "generate"):
+                if fields.get(stage) is not None:
+                    timings[stage] = round(fields.pop(stage), 3)
+            record_stages("chat_stream", timings, **fields)
+
+    @classmethod
+    def stream_answer(
+        cls, query: str, nodes: list[NodeWithScore], llm: LLM | None = None
+    ) -> Iterator[dict]:
+        # Frames: one "sources", then a "token" per LLM delta, then "done"
+        llm = llm or ModelRegistry.llm()
+        started = time.perf_counter()
+        yield {"type": "sources", "sources": cls.format_sources(nodes)}
+
+        answer, first_token = [], None
+        for chunk in llm.stream_chat([cls.build_message(query, nodes)]):
+            if not chunk.delta:
+                continue
+            if first_token is None:
+                first_token = time.perf_counter() - started
+            answer.append(chunk.delta)
+            yield {"type": "token", "text": chunk.delta}
+
+        yield {
+            "type": "done",
+            "answer": "".join(answer),
+            "tokens": len(answer),
+            "time_to_first_token": first_token,
+            "elapsed": time.perf_counter() - started,
+            "cached": False,
+        }
+
+    @staticmethod
+    def pack(query: str, nodes: list[NodeWithScore], fields: dict) -> list:
+        # One prompt within the LLM window; token counts go to the chat log line
+        nodes, stats = pack_context(query, nodes)
+        record_packing(stats)
+        fields.update(stats)
+        return nodes
+
+    @classmethod
+    def image_query_embedding(cls, image_bytes: bytes) -> list[float]:
+        # Keyed by content hash: a re-sent screenshot skips decode and CLIP
+        key = hashlib.sha256(image_bytes).hexdigest()
+        embedding = cls.image_embeddings.get(key)
+        if embedding is None:
+            image = load_query_image(image_bytes, settings.IMAGE_QUERY_MAX_SIDE)
+            embedding = ModelRegistry.embed_image(image)
+            cls.image_embeddings.set(key, embedding)
+        return embedding
+
+    @staticmethod
+    def image_retrieve(video_id: str, embedding: list[float]) -> list[NodeWithScore]:
+        _, img_vec = StorageManager.get_video_vector_stores(video_id)
+        result = img_vec.query(
+            VectorStoreQuery(
+                query_embedding=embedding,
+                similarity_top_k=settings.IMAGE_QUERY_TOP_K,
+                filters=StorageManager.video_filters(video_id),
+            )
         )
+        return [
+            NodeWithScore(node=node, score=score)
+            for node, score in zip(result.nodes, result.similarities)
+        ]
 
-        query_engine = index.as_query_engine(response_mode="compact")
+    @classmethod
+    def coverage(cls, video_id: str) -> dict:
+        # {} for a fully indexed video; for one still ingesting, how far into
+        # the video answers can see. Raises LookupError if nothing is indexed.
+        return cls._coverage(StorageManager.get_video_status(video_id))
 
-        if image_bytes:
-            tmp_path = f"/tmp/uploaded_{video_id}.jpg"
-            with open(tmp_path, "wb") as f:
-                f.write(image_bytes)
+    @classmethod
+    async def acoverage(cls, video_id: str) -> dict:
+        return cls._coverage(await StorageManager.aget_video_status(video_id))
 
-            response = query_engine.image_query(tmp_path, query)
+    @staticmethod
+    def _coverage(status: dict) -> dict:
+        video_id = status["video_id"]
+        if status["state"] == "missing":
+            raise LookupError(f"Video {video_id} has not been ingested")
+        if status["state"] == "failed":
+            raise LookupError(f"Ingest of video {video_id} failed; ingest it again")
+        if status["state"] == "partial":
+            return {"partial": True, "indexed_until": status["indexed_until"]}
+        return {}
 
-            # clean up
-            Path(tmp_path).unlink(missing_ok=True)
-        else:
-            response = query_engine.query(query)
+    @staticmethod
+    def build_message(query: str, nodes: list[NodeWithScore]) -> ChatMessage:
+        # Same prompt layout as SimpleMultiModalQueryEngine.synthesize
+        text_nodes = [n for n in nodes if not isinstance(n.node, ImageNode)]
+        context_str = "\n\n".join(
+            n.get_content(metadata_mode=MetadataMode.LLM) for n in text_nodes
+        )
+        blocks = [
+            image_node_to_image_block(n.node)
+            for n in nodes
+            if isinstance(n.node, ImageNode)
+        ]
+        blocks.append(
+            TextBlock(
+                text=DEFAULT_TEXT_QA_PROMPT.format(
+                    context_str=context_str, query_str=query
+                )
+            )
+        )
+        return ChatMessage(role="user", blocks=blocks)
 
+    @staticmethod
+    def format_sources(nodes: list[NodeWithScore]) -> list[dict]:
         sources = []
-        for node in response.source_nodes:
+        for node in nodes:
             m = node.node.metadata
             if m.get("type") == "text":
                 sources.append(
@@ -69,5 +266,81 @@ class ChatService:
                         "path": node.node.image_url,
                     }
                 )
+        return sources
+
+    @classmethod
+    def get_query_engine(cls, video_id: str):
+        # Cached per video; a re-ingest (version bump) or, mid-ingest, a new
+        # watermark invalidates the entry so the BM25 index sees new nodes
+        status = StorageManager.get_video_status(video_id)
+        key = (status["version"], status["indexed_until"])
+        cached = cls.engines.get(video_id)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        filters = StorageManager.video_filters(video_id)
+        if settings.RETRIEVAL_MODE == "hybrid":
+            reranker = ModelRegistry.reranker() if settings.RERANK_ENABLED else None
+            duration = max(status["duration"] or 0.0, status["indexed_until"])
+            retriever = None
+            if settings.SEGMENT_INDEX and duration >= settings.SEGMENT_MIN_DURATION:
+                retriever = cls._segment_retriever(video_id, duration, reranker)
+            if retriever is None:
+                retriever = HybridRetriever(
+                    cls._load_index(video_id).as_retriever(
+                        similarity_top_k=settings.RETRIEVAL_CANDIDATES, filters=filters
+                    ),
+                    BM25Index(StorageManager.video_nodes(video_id)),
+                    reranker=reranker,
+                )
+            query_engine = SimpleMultiModalQueryEngine(
+                retriever, multi_modal_llm=ModelRegistry.llm()
+            )
+        else:
+            query_engine = cls._load_index(video_id).as_query_engine(
+                llm=ModelRegistry.llm(), response_mode="compact", filters=filters
+            )
+        cls.engines.set(video_id, (key, query_engine))
+        return query_engine
+
+    @staticmethod
+    def _load_index(video_id: str):
+        index_store = StorageManager.get_redis_index_store(f"index_{video_id}")
+        text_vec, img_vec = StorageManager.get_video_vector_stores(video_id)
+        storage_ctx = StorageContext.from_defaults(
+            vector_store=text_vec,
+            image_store=img_vec,
+            index_store=index_store,
+        )
+        return load_index_from_storage(
+            storage_ctx,
+            embed_model=ModelRegistry.query_embed(),
+            image_embed_model=ModelRegistry.image_embed(),
+            index_id=video_id,
+        )
+
+    @staticmethod
+    def _segment_retriever(video_id: str, duration: float, reranker):
+        # Long videos: coarse-to-fine over segments, searched in memory from
+        # the stored vectors; None (plain hybrid) for a video without transcript
+        text_nodes = StorageManager.video_nodes(video_id, with_vectors=True)
+        if not text_nodes:
+            return None
+        segments = SegmentIndex(
+            text_nodes,
+            StorageManager.video_nodes(video_id, "image", with_vectors=True),
+            duration,
+            StorageManager.get_video_chapters(video_id),
+        )
+        return SegmentRetriever(
+            segments,
+            BM25Index(text_nodes),
+            embed_model=ModelRegistry.query_embed(),
+            image_embed_model=ModelRegistry.image_embed(),
+            reranker=reranker,
+        )
 
-        return {"answer": response.response, "sources": sources}
+    @classmethod
+    def invalidate(cls, video_id: str):
+        cls.engines.pop(video_id)
+        cls.answers.invalidate(video_id)
@@ -0,0 +1,113 @@
+from config.settings import settings
+from llama_index.core.prompts.default_prompts import DEFAULT_TEXT_QA_PROMPT
+from llama_index.core.schema import ImageNode, MetadataMode, NodeWithScore, TextNode
+from llama_index.core.utils import get_tokenizer
+
+from .retrieval import drop_nested
+
+
+def count_tokens(text: str) -> int:
+    return len(get_tokenizer()(text))
+
+
+def _node_tokens(hit: NodeWithScore) -> int:
+    # As the prompt renders it: LLM metadata header + text + "\n\n" separator
+    return count_tokens(hit.node.get_content(metadata_mode=MetadataMode.LLM)) + 2
+
+
+def context_budget(query: str, images: int = 0) -> int:
+    # Tokens left for transcript context in one prompt: the window minus the
+    # answer, the QA template with the question, images and some slack for
+    # the difference between our tokenizer and the model's
+    template = DEFAULT_TEXT_QA_PROMPT.format(context_str="", query_str=query)
+    return (
+        settings.OLLAMA_CONTEXT_WINDOW
+        - settings.OLLAMA_MAX_NEW_TOKENS
+        - settings.CONTEXT_RESERVED_TOKENS
+        - count_tokens(template)
+        - images * settings.OLLAMA_IMAGE_TOKENS
+    )
+
+
+def pack_context(query: str, nodes: list[NodeWithScore]) -> tuple[list, dict]:
+    # Fits retrieved nodes into a single prompt. Best-scored first, parent/
+    # child duplicates dropped, adjacent transcript segments merged; images
+    # are kept only while CONTEXT_MIN_TEXT_TOKENS of text still fit.
+    ranked = sorted(nodes, key=lambda hit: hit.score or 0.0, reverse=True)
+    images = [hit for hit in ranked if isinstance(hit.node, ImageNode)]
+    text = drop_nested([hit for hit in ranked if not isinstance(hit.node, ImageNode)])
+    while (
+        images and context_budget(query, len(images)) < settings.CONTEXT_MIN_TEXT_TOKENS
+    ):
+        images.pop()
+    budget = context_budget(query, len(images))
+
+    packed, used, dropped = [], 0, 0
+    for hit in text:
+        tokens = _node_tokens(hit)
+        if used + tokens <= budget:
+            packed.append(hit)
+            used += tokens
+        elif not packed:
+            # The best node alone overflows (e.g. a 2048-token parent chunk):
+            # keep its head rather than answer without context
+            hit = _truncate(hit, budget)
+            packed.append(hit)
+            kept = _node_tokens(hit)
+            used += kept
+            dropped += tokens - kept
+        else:
+            dropped += tokens
+
+    merged = _merge_adjacent(packed)
+    stats = {
+        "packed_tokens": sum(_node_tokens(hit) for hit in merged),
+        "dropped_tokens": dropped,
+        "budget_tokens": budget,
+        "nodes_in": len(nodes),
+        "nodes_packed": len(merged),
+        "images": len(images),
+    }
+    return merged + images, stats
+
+
+def _truncate(hit: NodeWithScore, budget: int) -> NodeWithScore:
+    words = hit.node.get_content().split()
+    keep = len(words)
+    node = hit.node
+    while keep and _node_tokens(NodeWithScore(node=node)) > budget:
+        keep = int(keep * 0.9)
+        node = hit.node.model_copy(update={"text": " ".join(words[:keep])})
+    return NodeWithScore(node=node, score=hit.score)
+
+
+def _merge_adjacent(hits: list[NodeWithScore]) -> list[NodeWithScore]:
+    # Segments of the same video that touch or overlap in time (captions
+    # often run into the next one's start) become one node: one metadata
+    # header instead of several, and the transcript reads in order.
+    # Merged nodes take the best score of their parts, then keep score order.
+    merged: list[NodeWithScore] = []
+    for hit in sorted(
+        hits,
+        key=lambda h: (h.node.metadata.get("video_id", ""), h.node.metadata["start"]),
+    ):
+        m = hit.node.metadata
+        if merged:
+            last = merged[-1].node.metadata
+            if (
+                last.get("video_id") == m.get("video_id")
+                and m["start"] - last["end"] <= settings.CONTEXT_MERGE_GAP
+            ):
+                prev = merged[-1]
+                node = TextNode(
+                    text=f"{prev.node.get_content()} {hit.node.get_content()}",
+                    metadata={**last, "end": max(last["end"], m["end"])},
+                    excluded_embed_metadata_keys=prev.node.excluded_embed_metadata_keys,
+                    excluded_llm_metadata_keys=prev.node.excluded_llm_metadata_keys,
+                )
+                merged[-1] = NodeWithScore(
+                    node=node, score=max(prev.score or 0.0, hit.score or 0.0)
+                )
+                continue
+        merged.append(hit)
+    return sorted(merged, key=lambda hit: hit.score or 0.0, reverse=True)
@@ -1,102 +1,570 @@
+import contextlib
+import json
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from pathlib import Path
 from urllib.parse import quote
 
+import numpy as np
 from config.settings import settings
 from llama_index.core import Document, StorageContext
 from llama_index.core.indices import MultiModalVectorStoreIndex
 from llama_index.core.node_parser import HierarchicalNodeParser
-from llama_index.core.schema import ImageDocument
-from llama_index.embeddings.clip import ClipEmbedding
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
-from utils.helpers import download_video, extract_frames, get_transcript
+from llama_index.core.schema import ImageNode, MetadataMode
+from utils.helpers import (
+    FRAME_FORMATS,
+    StageTimer,
+    download_video,
+    encode_frame,
+    iter_frames,
+    iter_transcript,
+    parse_video_id,
+)
+from utils.telemetry import record_stages
 
+from .artifacts import ArtifactCache
+from .models import ModelRegistry
 from .storage import StorageManager
 
 
+class IncrementalIndex:
+    # Inserts a video's nodes as soon as they are embedded. The watermark
+    # (indexed_until) is how many seconds of video both the transcript and
+    # the frames are indexed for, published through the video status.
+    def __init__(self, video_id: str, index: MultiModalVectorStoreIndex):
+        self.video_id = video_id
+        self.index = index
+        self.covered = {"text": 0.0, "image": 0.0}
+        self.inserted = {"text": 0, "image": 0}
+        self.lock = threading.Lock()
+
+    def insert(self, modality: str, nodes: list, until: float = math.inf):
+        # until: seconds of video covered once these nodes are in (inf = all)
+        with self.lock:
+            if nodes:
+                self.index.insert_nodes(nodes)
+                self.inserted[modality] += len(nodes)
+            self.covered[modality] = max(self.covered[modality], until)
+            watermark = min(self.covered.values())
+            if watermark < math.inf:
+                StorageManager.set_video_status(
+                    self.video_id, state="partial", indexed_until=watermark
+                )
+
+
 class IngestService:
-    text_embed = HuggingFaceEmbedding(model_name=settings.TEXT_EMBED_MODEL)
-    image_embed = ClipEmbedding(
-        model_name=settings.IMAGE_EMBED_MODEL, device=settings.EMBED_DEVICE
-    )
     frame_fps = settings.FRAME_FPS
+    artifacts = ArtifactCache()
+    # Shared by every video being processed, so the CPU-heavy stages have
+    # their own limits however many videos INGEST_WORKERS lets through
+    transcribe_slots = threading.BoundedSemaphore(
+        max(settings.INGEST_TRANSCRIBE_WORKERS, 1)
+    )
+    embed_slots = threading.BoundedSemaphore(max(settings.INGEST_EMBED_WORKERS, 1))
+
+    @classmethod
+    def ingest(cls, video_url: str, progress=None) -> dict:
+        return cls.process(cls.fetch(video_url, progress), progress)
 
     @classmethod
-    def ingest(cls, video_url: str) -> dict:
-        video_id = video_url.split("/watch?v=")[-1]
+    def fetch(cls, video_url: str, progress=None) -> dict:
+        # Network-bound first half of an ingest: the download (or its cached
+        # copy). Returns what `process` needs, so the job manager can run the
+        # two halves on separately sized pools.
+        started = time.perf_counter()
+        video_id = parse_video_id(video_url)
+        progress = progress or (lambda stage, state="running": None)
+        timer = StageTimer()
+        keys = cls._stage_keys(video_id)
+        # Make room before downloading; disk use of this run is reported
+        cls.artifacts.prune()
+        cls.artifacts.start_usage(video_id)
 
-        # 1. Download + upload video
-        local_vid, yt_id = download_video(video_url)
-        StorageManager.upload(local_vid, f"videos/{video_id}.mp4")
+        # 1. Download
+        progress("download")
+        try:
+            with timer.track("download"):
+                local_vid, yt_id, chapters, hit = cls._download(
+                    video_url, video_id, keys["download"]
+                )
+        except BaseException:
+            cls.artifacts.pop_usage(video_id)
+            raise
+        StorageManager.set_video_chapters(video_id, chapters)
+        progress("download", "done")
+        return {
+            "video_id": video_id,
+            "local_vid": local_vid,
+            "yt_id": yt_id,
+            "keys": keys,
+            "timer": timer,
+            "cache_hits": ["download"] if hit else [],
+            "seconds": time.perf_counter() - started,
+        }
 
-        # 2. Extract + upload frames
-        duration, frames_dir = extract_frames(
-            local_vid, out_dir=f"/tmp/frames/{video_id}", fps=cls.frame_fps
-        )
-        frame_paths = sorted(Path(frames_dir).glob("frame*.png"))
-
-        frame_urls = []
-        for i, p in enumerate(frame_paths):
-            object_name = f"frames/{video_id}/frame_{i:04d}.png"
-            StorageManager.upload(str(p), object_name)
-            url = cls._get_minio_url(object_name)
-            frame_urls.append(url)
-
-        # 3. Transcript
-        segments = get_transcript(yt_id, local_video_path=local_vid)
-
-        # 4. Documents
-        text_docs = [
-            Document(
-                text=s["text"],
-                metadata={"start": s["start"], "end": s["end"], "type": "text"},
+    @classmethod
+    def process(cls, fetched: dict, progress=None) -> dict:
+        # CPU-bound second half: transcript, frames, embedding and index
+        try:
+            return cls._process(fetched, progress)
+        except BaseException:
+            cls.artifacts.pop_usage(fetched["video_id"])
+            if fetched.get("staged"):
+                # Built alongside the old index, which stays as it was
+                StorageManager.delete_video_points(
+                    fetched["video_id"], fetched["staged"]
+                )
+            elif fetched.get("replaced"):
+                cls._abandon(fetched["video_id"])
+            raise
+
+    @classmethod
+    def _process(cls, fetched: dict, progress=None) -> dict:
+        started = time.perf_counter()
+        video_id, local_vid = fetched["video_id"], fetched["local_vid"]
+        yt_id, keys, timer = fetched["yt_id"], fetched["keys"], fetched["timer"]
+        cache_hits = list(fetched["cache_hits"])
+        progress = progress or (lambda stage, state="running": None)
+
+        # Incremental mode makes the index live now and inserts nodes as they
+        # are embedded, so chat works over the processed prefix meanwhile.
+        # An indexed video keeps serving its full index instead: the new one
+        # is built next to it and replaces it at the end.
+        indexed = StorageManager.get_video_status(video_id)["state"] == "indexed"
+        partial = None
+        if settings.INCREMENTAL_INDEX and not indexed:
+            fetched["replaced"] = True
+            partial = cls._open_incremental(video_id)
+
+        # Everything below only needs the local file, so the stages overlap:
+        # transcript runs in its own thread while frames stream from the
+        # extractor into concurrent uploads and batched CLIP embedding.
+        with ThreadPoolExecutor(
+            max_workers=settings.UPLOAD_WORKERS, thread_name_prefix="upload"
+        ) as uploads, ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="transcript"
+        ) as transcriber, ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="embed"
+        ) as embedder:
+            video_upload = uploads.submit(
+                cls._upload, timer, local_vid, f"videos/{video_id}.mp4"
             )
-            for s in segments
-        ]
-        step = duration / len(frame_urls) if frame_urls else 0
-        image_docs = [
-            ImageDocument(
-                image_url=url,
-                metadata={
-                    "timestamp": i * step,
-                    "type": "image",
-                    "minio_key": f"frames/{video_id}/frame_{i:04d}.png",
-                },
+
+            # 2. Transcript + text embedding (parallel, batch by batch)
+            progress("transcript")
+            transcript = transcriber.submit(
+                cls._transcript_nodes, timer, video_id, keys, yt_id, local_vid, partial
             )
-            for i, url in enumerate(frame_urls)
-        ]
-        all_docs = text_docs + image_docs
 
-        # 5. Nodes
-        parser = HierarchicalNodeParser.from_defaults(chunk_sizes=[128, 512, 2048])
-        nodes = parser.get_nodes_from_documents(all_docs)
+            # 3. Frames, decoded in memory → encoded uploads + batched image
+            # embedding of the decoded pixels (no frame files on local disk)
+            progress("frames")
+            frame_stats = {}
+            times = cls._cached_frame_times(video_id, keys["frames"], frame_stats)
+            cached_vectors = cls._load_vectors(video_id, "image_embed", keys)
+            if times is None or len(cached_vectors or []) != len(times):
+                cached_vectors = None
+            ext, content_type = FRAME_FORMATS[settings.FRAME_FORMAT]
+            frames, packed, frame_uploads = [], [], []
+            embed_batches, batch = [], []
+            frame_bytes = 0
+            with timer.track("frames"):
+                for i, (frame, t) in enumerate(
+                    cls._iter_frames(local_vid, frame_stats, times)
+                ):
+                    object_name = f"frames/{video_id}/frame_{i:04d}.{ext}"
+                    frames.append((object_name, t))
+                    data = encode_frame(
+                        frame, settings.FRAME_FORMAT, settings.FRAME_QUALITY
+                    )
+                    frame_bytes += len(data)
+                    upload = None
+                    if settings.FRAME_PACK:
+                        packed.append((data, object_name.rsplit("/", 1)[-1]))
+                    else:
+                        upload = uploads.submit(
+                            cls._upload_bytes, timer, data, object_name, content_type
+                        )
+                        frame_uploads.append(upload)
+                    if cached_vectors is not None:
+                        continue
+                    batch.append((frame, object_name, t, upload))
+                    if len(batch) >= settings.FRAME_EMBED_BATCH:
+                        embed_batches.append(
+                            embedder.submit(
+                                cls._embed_frame_batch, timer, video_id, batch, partial
+                            )
+                        )
+                        batch = []
+                if batch:
+                    embed_batches.append(
+                        embedder.submit(
+                            cls._embed_frame_batch, timer, video_id, batch, partial
+                        )
+                    )
+                if settings.FRAME_PACK:
+                    frame_uploads.append(
+                        uploads.submit(cls._upload_pack, timer, video_id, packed)
+                    )
+            if times is None:
+                cls._save_frame_times(video_id, keys["frames"], frames, frame_stats)
+            else:
+                cache_hits.append("frames")
+            progress("frames", "done")
 
-        # 6. Vector stores
-        text_vec = StorageManager.get_qdrant_vector_store(f"text_{video_id}", 384)
-        img_vec = StorageManager.get_qdrant_vector_store(f"img_{video_id}", 512)
+            # 4. Transcript nodes (frames keep embedding meanwhile)
+            text_nodes, hits = transcript.result()
+            cache_hits += hits
+            progress("transcript", "done")
 
-        # 7. Index store
-        index_store = StorageManager.get_redis_index_store(f"index_{video_id}")
+            progress("embed")
+            if cached_vectors is not None:
+                image_vectors = cached_vectors
+                cache_hits.append("image_embed")
+            else:
+                image_vectors = [v for f in embed_batches for v in f.result()]
+                cls._save_vectors(video_id, "image_embed", keys, image_vectors)
+            for f in [video_upload, *frame_uploads]:
+                f.result()  # re-raise upload errors
+            progress("embed", "done")
 
-        # 8. Storage context
+        image_nodes = cls._image_nodes(video_id, frames, image_vectors)
+
+        # 5. Index (nodes already carry their embeddings)
+        progress("index")
+        with timer.track("index"):
+            nodes = text_nodes + image_nodes
+            if partial is None and indexed:
+                fetched["staged"] = [node.node_id for node in nodes]
+                cls._build_index(video_id, nodes)
+                StorageManager.prune_video_vectors(video_id, fetched.pop("staged"))
+            elif partial is None:
+                fetched["replaced"] = True
+                StorageManager.delete_video_vectors(video_id)
+                cls._build_index(video_id, nodes)
+            else:
+                # Whatever the pipeline didn't insert yet: cached image
+                # vectors and packed frames, which are only served once the
+                # pack is uploaded
+                partial.insert("text", text_nodes[partial.inserted["text"] :])
+                partial.insert("image", image_nodes[partial.inserted["image"] :])
+        duration = frame_stats["duration"]
+        StorageManager.bump_video_version(video_id)
+        StorageManager.set_video_status(
+            video_id, state="indexed", indexed_until=duration, duration=duration
+        )
+        disk = cls.artifacts.pop_usage(video_id)
+        cls.artifacts.prune()
+        progress("index", "done")
+
+        # Time spent queued between the two halves is left out
+        timings = {
+            **timer.timings(),
+            "total": round(time.perf_counter() - started + fetched["seconds"], 3),
+        }
+        record_stages(
+            "ingest",
+            timings,
+            video_id=video_id,
+            frames=len(image_nodes),
+            cache_hits=cache_hits,
+            disk=disk,
+            frame_bytes=frame_bytes,
+        )
+        return {
+            "video_id": video_id,
+            "frames": len(image_nodes),
+            "frames_dropped": frame_stats["dropped"],
+            "cache_hits": cache_hits,
+            "timings": timings,
+            "disk": disk,
+            "frame_bytes": frame_bytes,
+        }
+
+    @classmethod
+    def _build_index(cls, video_id: str, nodes: list) -> MultiModalVectorStoreIndex:
+        text_vec, img_vec = StorageManager.get_video_vector_stores(video_id)
+        index_store = StorageManager.get_redis_index_store(f"index_{video_id}")
         storage_ctx = StorageContext.from_defaults(
             vector_store=text_vec,
             image_store=img_vec,
             index_store=index_store,
         )
-
-        # 9. Build index
         index = MultiModalVectorStoreIndex(
             nodes,
             storage_context=storage_ctx,
-            embed_model=cls.text_embed,
-            image_embed_model=cls.image_embed,
+            embed_model=ModelRegistry.text_embed(),
+            image_embed_model=ModelRegistry.image_embed(),
         )
-
         index.set_index_id(video_id)
+        return index
 
-        return {
-            "video_id": video_id,
-        }
+    @classmethod
+    def _open_incremental(cls, video_id: str) -> "IncrementalIndex":
+        StorageManager.delete_video_vectors(video_id)
+        StorageManager.ensure_video_collections(video_id)
+        index = cls._build_index(video_id, [])
+        # Drops cached engines and answers built on the previous index
+        StorageManager.bump_video_version(video_id)
+        StorageManager.set_video_status(video_id, state="partial", indexed_until=0.0)
+        return IncrementalIndex(video_id, index)
+
+    @staticmethod
+    def _abandon(video_id: str):
+        # A failed ingest of a video that wasn't indexed before: its fragment
+        # goes too, and chat reports the video as failed rather than
+        # answering from a part of it
+        StorageManager.delete_video_vectors(video_id)
+        StorageManager.bump_video_version(video_id)
+        StorageManager.set_video_status(video_id, state="failed", indexed_until=0.0)
+
+    @classmethod
+    def _image_nodes(cls, video_id: str, frames: list, vectors: list) -> list:
+        return [
+            ImageNode(
+                image_url=cls._get_frame_url(object_name),
+                metadata={
+                    "timestamp": t,
+                    "type": "image",
+                    "minio_key": object_name,
+                    "video_id": video_id,
+                },
+                embedding=vector,
+            )
+            for (object_name, t), vector in zip(frames, vectors)
+        ]
+
+    @classmethod
+    def _stage_keys(cls, video_id: str) -> dict[str, str]:
+        # Each key covers the settings a stage depends on plus its inputs' keys
+        key = ArtifactCache.key
+        keys = {"download": key(video_id=video_id, height=settings.MAX_VIDEO_HEIGHT)}
+        keys["transcript"] = key(
+            video=keys["download"],
+            whisper=settings.WHISPER_MODEL,
+            chunk_seconds=settings.WHISPER_CHUNK_SECONDS,
+        )
+        keys["frames"] = key(
+            video=keys["download"],
+            sampler=settings.FRAME_SAMPLER,
+            fps=cls.frame_fps,
+            output="times",  # timestamps only, frames are decoded again
+            scene=[
+                settings.SCENE_SAMPLE_FPS,
+                settings.SCENE_THRESHOLD,
+                settings.SCENE_MIN_INTERVAL,
+                settings.SCENE_MAX_INTERVAL,
+            ],
+        )
+        keys["image_embed"] = key(
+            frames=keys["frames"],
+            model=settings.IMAGE_EMBED_MODEL,
+            backend=settings.IMAGE_EMBED_BACKEND,  # int8 vectors differ slightly
+        )
+        keys["text_embed"] = key(
+            transcript=keys["transcript"],
+            model=settings.TEXT_EMBED_MODEL,
+            chunk_sizes=settings.CHUNK_SIZES,
+            batch=settings.TRANSCRIPT_BATCH,  # node order follows the batching
+        )
+        return keys
+
+    @classmethod
+    def _download(cls, video_url: str, video_id: str, key: str):
+        cached = cls.artifacts.get(video_id, "download", key)
+        if cached:
+            meta = json.loads((cached / "meta.json").read_text())
+            chapters = meta.get("chapters", [])
+            return str(cached / meta["file"]), meta["yt_id"], chapters, True
+
+        with cls.artifacts.write(video_id, "download", key) as out:
+            path, yt_id, chapters = download_video(video_url, out_dir=str(out))
+            meta = {"file": Path(path).name, "yt_id": yt_id, "chapters": chapters}
+            (out / "meta.json").write_text(json.dumps(meta))
+        return path, yt_id, chapters, False
+
+    @classmethod
+    def _cached_frame_times(cls, video_id: str, key: str, stats: dict):
+        # Timestamps the sampler kept on an earlier run, replayed without
+        # scoring every candidate frame again
+        cached = cls.artifacts.get(video_id, "frames", key)
+        if not cached:
+            return None
+        meta = json.loads((cached / "frames.json").read_text())
+        stats.update(meta["stats"], cache_hit=True)
+        return meta["times"]
+
+    @classmethod
+    def _save_frame_times(cls, video_id: str, key: str, frames: list, stats: dict):
+        with cls.artifacts.write(video_id, "frames", key) as out:
+            meta = {"times": [t for _, t in frames], "stats": stats}
+            (out / "frames.json").write_text(json.dumps(meta))
+
+    @classmethod
+    def _iter_frames(cls, local_vid: str, stats: dict, times=None):
+        return iter_frames(
+            local_vid,
+            fps=cls.frame_fps,
+            sampler=settings.FRAME_SAMPLER,
+            stats=stats,
+            sample_fps=settings.SCENE_SAMPLE_FPS,
+            threshold=settings.SCENE_THRESHOLD,
+            min_interval=settings.SCENE_MIN_INTERVAL,
+            max_interval=settings.SCENE_MAX_INTERVAL,
+            times=times,
+        )
+
+    @classmethod
+    def _load_vectors(cls, video_id: str, stage: str, keys: dict):
+        cached = cls.artifacts.get(video_id, stage, keys[stage])
+        if cached is None:
+            return None
+        return np.load(cached / "vectors.npy").tolist()
+
+    @classmethod
+    def _save_vectors(cls, video_id: str, stage: str, keys: dict, vectors):
+        with cls.artifacts.write(video_id, stage, keys[stage]) as out:
+            np.save(out / "vectors.npy", np.asarray(vectors, dtype=np.float32))
+
+    @classmethod
+    def _embed_frame_batch(
+        cls, timer: StageTimer, video_id: str, batch: list, partial
+    ) -> list[list[float]]:
+        # batch: (frame, object_name, timestamp, upload future) per frame
+        vectors = cls._embed_frames(timer, [frame for frame, *_ in batch])
+        if partial is not None and not settings.FRAME_PACK:
+            for *_, upload in batch:
+                upload.result()  # a frame must be fetchable before it's retrievable
+            frames = [(object_name, t) for _, object_name, t, _ in batch]
+            partial.insert(
+                "image",
+                cls._image_nodes(video_id, frames, vectors),
+                until=frames[-1][1],
+            )
+        return vectors
+
+    @classmethod
+    def _embed_frames(
+        cls, timer: StageTimer, frames: list[np.ndarray]
+    ) -> list[list[float]]:
+        with cls.embed_slots, timer.track("image_embed"):
+            return ModelRegistry.embed_images(frames)
+
+    @staticmethod
+    def _upload(timer: StageTimer, local_path: str, object_name: str):
+        with timer.track("upload"):
+            StorageManager.upload(local_path, object_name)
+
+    @staticmethod
+    def _upload_bytes(
+        timer: StageTimer, data: bytes, object_name: str, content_type: str
+    ):
+        with timer.track("upload"):
+            StorageManager.upload_bytes(data, object_name, content_type)
+
+    @staticmethod
+    def _upload_pack(timer: StageTimer, video_id: str, packed: list):
+        # packed: (encoded frame, member name) pairs
+        with timer.track("upload"):
+            StorageManager.upload_frame_pack(f"frames/{video_id}", packed)
+
+    @classmethod
+    def _transcript_nodes(
+        cls,
+        timer: StageTimer,
+        video_id: str,
+        keys: dict,
+        yt_id: str,
+        local_vid: str,
+        partial=None,
+    ) -> tuple[list, list[str]]:
+        # Runs on the transcript thread. Segments are parsed and embedded
+        # TRANSCRIPT_BATCH at a time as they arrive, so text embedding overlaps
+        # a chunked Whisper transcription instead of waiting for all of it.
+        hits = []
+        cached = cls.artifacts.get(video_id, "transcript", keys["transcript"])
+        if cached:
+            segments = json.loads((cached / "segments.json").read_text())
+            hits.append("transcript")
+            slot = contextlib.nullcontext()
+        else:
+            # Lazy: Whisper runs as the loop below pulls segments, holding
+            # one of the transcription slots
+            slot = cls.transcribe_slots
+            segments = iter_transcript(
+                yt_id,
+                local_video_path=local_vid,
+                load_s2t=ModelRegistry.whisper,
+                chunk_seconds=settings.WHISPER_CHUNK_SECONDS,
+                load_pool=ModelRegistry.whisper_pool,
+            )
+
+        vectors = cls._load_vectors(video_id, "text_embed", keys)
+        parser = HierarchicalNodeParser.from_defaults(chunk_sizes=settings.CHUNK_SIZES)
+        segments = iter(segments)
+        seen, text_nodes = [], []
+        with slot, timer.track("transcript"):
+            while batch := list(islice(segments, settings.TRANSCRIPT_BATCH)):
+                seen += batch
+                nodes = parser.get_nodes_from_documents(
+                    [cls._segment_doc(s, video_id) for s in batch]
+                )
+                done = len(text_nodes)
+                if vectors is not None and done + len(nodes) <= len(vectors):
+                    for node, vector in zip(nodes, vectors[done:]):
+                        node.embedding = vector
+                else:
+                    cls._embed_text(timer, nodes)
+                text_nodes += nodes
+                if partial is not None:
+                    partial.insert("text", nodes, until=batch[-1]["end"])
+
+        if not cached:
+            with cls.artifacts.write(video_id, "transcript", keys["transcript"]) as out:
+                (out / "segments.json").write_text(json.dumps(seen))
+
+        if vectors is not None and len(vectors) == len(text_nodes):
+            hits.append("text_embed")
+        else:
+            cls._save_vectors(
+                video_id, "text_embed", keys, [n.embedding for n in text_nodes]
+            )
+        return text_nodes, hits
+
+    @staticmethod
+    def _segment_doc(segment: dict, video_id: str) -> Document:
+        return Document(
+            text=segment["text"],
+            metadata={
+                "start": segment["start"],
+                "end": segment["end"],
+                "type": "text",
+                "video_id": video_id,
+            },
+            excluded_embed_metadata_keys=["video_id"],
+            excluded_llm_metadata_keys=["video_id"],
+        )
+
+    @classmethod
+    def _embed_text(cls, timer: StageTimer, nodes: list):
+        if not nodes:
+            return
+        with cls.embed_slots, timer.track("text_embed"):
+            vectors = ModelRegistry.text_embed().get_text_embedding_batch(
+                [n.get_content(metadata_mode=MetadataMode.EMBED) for n in nodes]
+            )
+        for node, vector in zip(nodes, vectors):
+            node.embedding = vector
+
+    @classmethod
+    def _get_frame_url(cls, object_name: str) -> str:
+        # Packed frames are served by the API from the pack's byte-range index
+        if settings.FRAME_PACK:
+            return f"{settings.API_PUBLIC_URL}/{object_name}"
+        return cls._get_minio_url(object_name)
 
     @classmethod
     def _get_minio_url(cls, object_name: str) -> str:
@@ -0,0 +1,386 @@
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from config.settings import settings
+from redis.exceptions import WatchError
+from utils.helpers import list_playlist, parse_video_id
+from utils.telemetry import bind_request_id, log
+
+from .chat import ChatService
+from .ingest import IngestService
+from .storage import StorageManager
+
+INGEST_STAGES = ["download", "frames", "transcript", "embed", "index"]
+
+
+class IngestJobManager:
+    # Jobs live in Redis as hashes under ingest:job:{job_id}. While a job is
+    # queued or running, ingest:inflight:{video_id} points at it so duplicate
+    # submissions for the same video collapse into that job. A job downloads
+    # on `downloads`, then processes on `pool`; `active` bounds the videos
+    # anywhere in between. Batches (ingest:batch:{batch_id}) group the jobs
+    # of one batch request. Each replica holds ingest:lease:{job_id} (its
+    # owner id, INGEST_JOB_LEASE TTL, refreshed by a heartbeat) for the jobs
+    # it runs; an active job whose lease expired lost its replica and is
+    # adopted by resume.
+    job_prefix = "ingest:job:"
+    inflight_prefix = "ingest:inflight:"
+    lease_prefix = "ingest:lease:"
+    active_key = "ingest:jobs:active"
+    batch_prefix = "ingest:batch:"
+    json_fields = ("stages", "timings", "cache_hits", "disk")
+
+    def __init__(
+        self,
+        max_workers: int = settings.INGEST_WORKERS,
+        download_workers: int = settings.INGEST_DOWNLOAD_WORKERS,
+        max_active: int = settings.INGEST_MAX_ACTIVE,
+    ):
+        self.downloads = ThreadPoolExecutor(
+            max_workers=download_workers, thread_name_prefix="ingest-download"
+        )
+        self.pool = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="ingest"
+        )
+        self.active = threading.BoundedSemaphore(max(max_active, 1))
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.leases: set[str] = set()
+        self.stopped = threading.Event()
+        self.heartbeat: threading.Thread | None = None
+
+    @property
+    def redis(self):
+        return StorageManager.redis
+
+    def submit(self, video_url: str) -> dict:
+        video_id = parse_video_id(video_url)
+        job_id = uuid.uuid4().hex
+
+        now = time.time()
+        job = {
+            "job_id": job_id,
+            "video_id": video_id,
+            "video_url": video_url,
+            "status": "queued",
+            "stage": "",
+            "stages": {stage: "pending" for stage in INGEST_STAGES},
+            "frames": 0,
+            "frames_dropped": 0,
+            "timings": {},
+            "cache_hits": [],
+            "disk": {},
+            "frame_bytes": 0,
+            "error": "",
+            "created_at": now,
+            "updated_at": now,
+        }
+        # Saved before claiming, so whoever reads the claim finds the job
+        self._save(job)
+
+        # Claim the video; if another job already holds it, return that one
+        key = f"{self.inflight_prefix}{video_id}"
+        while not self.redis.set(key, job_id, nx=True):
+            existing = self.redis.get(key)
+            other = self.get(existing) if existing else None
+            if other and other["status"] in ("queued", "running"):
+                self.redis.delete(f"{self.job_prefix}{job_id}")
+                return other
+            # Stale claim (job expired or already finished) → take it over,
+            # unless another submitter got there first; then look again
+            if self._compare_and_set(key, existing, job_id):
+                break
+
+        self._lease(job_id)
+        self.redis.sadd(self.active_key, job_id)
+        self.downloads.submit(self._run, job_id)
+        return job
+
+    def submit_batch(
+        self, urls: list[str], max_videos: int = settings.INGEST_BATCH_MAX_VIDEOS
+    ) -> dict:
+        # Video URLs (any form parse_video_id knows) and playlist or channel
+        # URLs, expanded and deduplicated by video id into one job per video.
+        # Videos already ingesting join their running job (see submit).
+        video_ids, rejected, duplicates = [], [], 0
+        for url in urls:
+            try:
+                ids = [parse_video_id(url)]
+            except ValueError:
+                try:
+                    ids = list_playlist(url, max_videos)
+                except Exception as e:
+                    rejected.append({"url": url, "error": str(e)})
+                    continue
+            for video_id in ids:
+                if video_id in video_ids:
+                    duplicates += 1
+                else:
+                    video_ids.append(video_id)
+        truncated = max(0, len(video_ids) - max_videos)
+        video_ids = video_ids[:max_videos]
+
+        jobs = [
+            self.submit(f"https://www.youtube.com/watch?v={video_id}")
+            for video_id in video_ids
+        ]
+        batch_id = uuid.uuid4().hex
+        key = f"{self.batch_prefix}{batch_id}"
+        self.redis.hset(
+            key,
+            mapping={
+                "job_ids": json.dumps([job["job_id"] for job in jobs]),
+                "rejected": json.dumps(rejected),
+                "duplicates": duplicates,
+                "truncated": truncated,
+                "created_at": time.time(),
+            },
+        )
+        self.redis.expire(key, settings.INGEST_JOB_TTL)
+        return self.get_batch(batch_id)
+
+    def get_batch(self, batch_id: str) -> dict | None:
+        raw = self.redis.hgetall(f"{self.batch_prefix}{batch_id}")
+        if not raw:
+            return None
+        job_ids = json.loads(raw["job_ids"])
+        pipe = self.redis.pipeline(transaction=False)
+        for job_id in job_ids:
+            pipe.hgetall(f"{self.job_prefix}{job_id}")
+        videos, counts = [], {}
+        for job_id, job_raw in zip(job_ids, pipe.execute()):
+            job = self._parse(job_raw) if job_raw else None
+            video = {
+                "job_id": job_id,
+                "video_id": job["video_id"] if job else "",
+                "status": job["status"] if job else "expired",
+                "stage": job["stage"] if job else "",
+                "frames": job["frames"] if job else 0,
+                "error": job["error"] if job else "",
+            }
+            videos.append(video)
+            counts[video["status"]] = counts.get(video["status"], 0) + 1
+        running = counts.get("queued", 0) + counts.get("running", 0)
+        return {
+            "batch_id": batch_id,
+            "status": "running" if running else "completed",
+            "counts": counts,
+            "videos": videos,
+            "rejected": json.loads(raw["rejected"]),
+            "duplicates": int(raw["duplicates"]),
+            "truncated": int(raw["truncated"]),
+            "created_at": float(raw["created_at"]),
+        }
+
+    def get(self, job_id: str) -> dict | None:
+        raw = self.redis.hgetall(f"{self.job_prefix}{job_id}")
+        if not raw:
+            return None
+        return self._parse(raw)
+
+    def _parse(self, raw: dict) -> dict:
+        return {
+            **raw,
+            **{f: json.loads(raw[f]) for f in self.json_fields if f in raw},
+            "frames": int(raw["frames"]),
+            "frames_dropped": int(raw.get("frames_dropped", 0)),
+            "frame_bytes": int(raw.get("frame_bytes", 0)),
+            "created_at": float(raw["created_at"]),
+            "updated_at": float(raw["updated_at"]),
+        }
+
+    def resume(self) -> list[str]:
+        # Re-queue active jobs whose replica is gone (lease expired): on
+        # start-up, and from the heartbeat for replicas that never come back.
+        # Jobs leased by live replicas, this one included, are left alone.
+        resumed = []
+        for job_id in self.redis.smembers(self.active_key):
+            if job_id in self.leases:
+                continue
+            if self.get(job_id) is None:
+                self.redis.srem(self.active_key, job_id)
+                continue
+            if not self._lease(job_id):
+                continue
+            # The snapshot above may be stale: the job can have finished
+            # (and dropped its lease) since, so look again now that it's ours
+            job = self.get(job_id)
+            if (
+                job is None
+                or job["status"] not in ("queued", "running")
+                or not self.redis.sismember(self.active_key, job_id)
+            ):
+                self._release(job_id)
+                continue
+            # Point the video's claim back at this job unless a newer job
+            # for the video took it over
+            key = f"{self.inflight_prefix}{job['video_id']}"
+            claim = self.redis.get(key)
+            if claim != job_id and not self._compare_and_set(key, claim, job_id):
+                self._release(job_id)
+                continue
+            self._update(job, status="queued")
+            self.downloads.submit(self._run, job_id)
+            resumed.append(job_id)
+        return resumed
+
+    def shutdown(self):
+        self.stopped.set()
+        self.downloads.shutdown(wait=False, cancel_futures=True)
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        # Unfinished jobs stay active; dropping their leases lets the next
+        # replica to start resume them without waiting for expiry
+        for job_id in list(self.leases):
+            self._release(job_id)
+
+    def _lease(self, job_id: str) -> bool:
+        # Takes the job for this replica; False while another one holds it
+        key = f"{self.lease_prefix}{job_id}"
+        if not self.redis.set(key, self.owner, nx=True, ex=settings.INGEST_JOB_LEASE):
+            return False
+        self.leases.add(job_id)
+        if self.heartbeat is None:
+            self.heartbeat = threading.Thread(
+                target=self._heartbeat, name="ingest-heartbeat", daemon=True
+            )
+            self.heartbeat.start()
+        return True
+
+    def _release(self, job_id: str):
+        self.leases.discard(job_id)
+        self._compare_and_set(f"{self.lease_prefix}{job_id}", self.owner, None)
+
+    def _heartbeat(self):
+        while not self.stopped.wait(settings.INGEST_JOB_LEASE / 3):
+            try:
+                for job_id in list(self.leases):
+                    key = f"{self.lease_prefix}{job_id}"
+                    if not self._compare_and_set(
+                        key, self.owner, self.owner, ex=settings.INGEST_JOB_LEASE
+                    ):
+                        # Expired and adopted elsewhere; that replica reruns it
+                        self.leases.discard(job_id)
+                        log.warning(
+                            "ingest lease lost", extra={"fields": {"job_id": job_id}}
+                        )
+                adopted = self.resume()
+                if adopted:
+                    log.info("adopted ingest jobs", extra={"fields": {"jobs": adopted}})
+            except Exception:
+                log.exception("ingest heartbeat failed")
+
+    def _compare_and_set(
+        self, key: str, expected: str | None, value: str | None, ex: int | None = None
+    ) -> bool:
+        # Sets `key` (deletes it for value None) only if it still holds
+        # `expected` (None: missing); False if it changed under us
+        with self.redis.pipeline() as pipe:
+            try:
+                pipe.watch(key)
+                if pipe.get(key) != expected:
+                    pipe.unwatch()
+                    return False
+                pipe.multi()
+                if value is None:
+                    pipe.delete(key)
+                else:
+                    pipe.set(key, value, ex=ex)
+                pipe.execute()
+                return True
+            except WatchError:
+                return False
+
+    def _run(self, job_id: str):
+        # Download pool: waits for an active slot, downloads, then hands the
+        # job to the processing pool
+        job = self.get(job_id)
+        if job is None:
+            self._release(job_id)
+            return
+        self.active.acquire()
+        self._update(job, status="running")
+
+        # Ingest stages overlap, so progress may be reported from several threads
+        lock = threading.Lock()
+
+        def progress(stage: str, state: str = "running"):
+            with lock:
+                stages = {**job["stages"], stage: state}
+                running = [s for s in INGEST_STAGES if stages[s] == "running"]
+                self._update(job, stage=running[-1] if running else "", stages=stages)
+
+        try:
+            with bind_request_id(job_id):
+                fetched = IngestService.fetch(job["video_url"], progress=progress)
+        except Exception as e:
+            self._fail(job, lock, e)
+            self._finish(job)
+            return
+        try:
+            self.pool.submit(self._process, job, lock, progress, fetched)
+        except RuntimeError:
+            # Shutting down: the job stays active and is resumed on restart
+            IngestService.artifacts.pop_usage(job["video_id"])
+            self.active.release()
+
+    def _process(self, job: dict, lock: threading.Lock, progress, fetched: dict):
+        try:
+            with bind_request_id(job["job_id"]):
+                result = IngestService.process(fetched, progress=progress)
+        except Exception as e:
+            self._fail(job, lock, e)
+        else:
+            ChatService.invalidate(job["video_id"])
+            self._update(
+                job,
+                status="completed",
+                stage="",
+                stages={stage: "done" for stage in INGEST_STAGES},
+                frames=result.get("frames", 0),
+                frames_dropped=result.get("frames_dropped", 0),
+                timings=result.get("timings", {}),
+                cache_hits=result.get("cache_hits", []),
+                disk=result.get("disk", {}),
+                frame_bytes=result.get("frame_bytes", 0),
+            )
+        finally:
+            self._finish(job)
+
+    def _fail(self, job: dict, lock: threading.Lock, error: Exception):
+        log.exception(
+            "ingest failed",
+            extra={"fields": {"job_id": job["job_id"], "video_id": job["video_id"]}},
+        )
+        with lock:
+            stages = {
+                s: "failed" if state == "running" else state
+                for s, state in job["stages"].items()
+            }
+            self._update(job, status="failed", stages=stages, error=str(error))
+
+    def _finish(self, job: dict):
+        self.active.release()
+        self.redis.srem(self.active_key, job["job_id"])
+        # Only release the claim if it still belongs to this job
+        key = f"{self.inflight_prefix}{job['video_id']}"
+        self._compare_and_set(key, job["job_id"], None)
+        self._release(job["job_id"])
+
+    def _update(self, job: dict, **fields):
+        job.update(fields, updated_at=time.time())
+        self._save(job)
+
+    def _save(self, job: dict):
+        key = f"{self.job_prefix}{job['job_id']}"
+        self.redis.hset(
+            key,
+            mapping={
+                **job,
+                **{f: json.dumps(job[f]) for f in self.json_fields},
+            },
+        )
+        self.redis.expire(key, settings.INGEST_JOB_TTL)
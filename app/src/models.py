@@ -0,0 +1,490 @@
+import asyncio
+import copy
+import io
+import os
+import queue
+import re
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+from config.settings import settings
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+from PIL import Image
+from pydantic import PrivateAttr
+
+from .cache import LRUCache
+
+
+class BatchingEmbedding(BaseEmbedding):
+    # Query-side wrapper around a text embedding model. Concurrent
+    # get_query_embedding calls are grouped into one batched forward pass per
+    # `window` seconds, and results are cached by normalized query text.
+    _model: BaseEmbedding = PrivateAttr()
+    _window: float = PrivateAttr()
+    _max_batch: int = PrivateAttr()
+    _cache: LRUCache = PrivateAttr()
+    _queue: queue.Queue = PrivateAttr()
+    _worker: threading.Thread | None = PrivateAttr(default=None)
+    _lock: threading.Lock = PrivateAttr()
+    _batches: int = PrivateAttr(default=0)
+    _queries: int = PrivateAttr(default=0)
+    _largest: int = PrivateAttr(default=0)
+
+    def __init__(
+        self,
+        model: BaseEmbedding,
+        window: float = settings.QUERY_EMBED_WINDOW_MS / 1000,
+        max_batch: int = settings.QUERY_EMBED_MAX_BATCH,
+        cache_size: int = settings.QUERY_EMBED_CACHE_SIZE,
+        **kwargs: Any,
+    ):
+        super().__init__(
+            model_name=model.model_name,
+            embed_batch_size=model.embed_batch_size,
+            **kwargs,
+        )
+        self._model = model
+        self._window = window
+        self._max_batch = max_batch
+        self._cache = LRUCache(maxsize=cache_size)
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "BatchingEmbedding"
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        # The default MiniLM model is uncased, so case and spacing don't matter
+        return " ".join(query.split()).casefold()
+
+    def _get_query_embedding(self, query: str) -> Embedding:
+        key = self.normalize(query)
+        vector = self._cache.get(key)
+        if vector is None:
+            future = Future()
+            self._ensure_worker()
+            self._queue.put((key, future))
+            vector = future.result()
+            self._cache.set(key, vector)
+        return vector
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        return await asyncio.to_thread(self._get_query_embedding, query)
+
+    def _get_text_embedding(self, text: str) -> Embedding:
+        return self._model.get_text_embedding(text)
+
+    def _get_text_embeddings(self, texts: list[str]) -> list[Embedding]:
+        return self._model.get_text_embedding_batch(texts)
+
+    async def _aget_text_embedding(self, text: str) -> Embedding:
+        return await self._model.aget_text_embedding(text)
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run, name="query-embed", daemon=True
+                )
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self._window
+            while len(batch) < self._max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            texts = list(dict.fromkeys(key for key, _ in batch))
+            try:
+                vectors = dict(zip(texts, self._embed_queries(texts)))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            self._batches += 1
+            self._queries += len(batch)
+            self._largest = max(self._largest, len(batch))
+            for key, future in batch:
+                future.set_result(vectors[key])
+
+    def _embed_queries(self, texts: list[str]) -> list[Embedding]:
+        # Query and passage embeddings only differ when the model adds a
+        # query instruction; without one a single batched call covers them all
+        if getattr(self._model, "query_instruction", None):
+            return [self._model.get_query_embedding(t) for t in texts]
+        return self._model.get_text_embedding_batch(texts)
+
+    def stats(self) -> dict:
+        return {
+            "batches": self._batches,
+            "queries": self._queries,
+            "avg_batch_size": self._queries / self._batches if self._batches else 0.0,
+            "max_batch_size": self._largest,
+            "cache": self._cache.stats(),
+        }
+
+
+class FrameEmbedder:
+    # Ingest-side CLIP image encoder over decoded frames (H x W x 3 uint8
+    # arrays or PIL images), FRAME_EMBED_BATCH frames per forward pass.
+    # Preprocessing is vectorised per batch: centre-crop to a square, then
+    # one antialiased bicubic resize and normalisation as tensor ops, where
+    # CLIP's own transform runs PIL per image. The forward pass runs on torch
+    # or, on CPU nodes, on an ONNX Runtime export of the visual tower
+    # ("onnx", or "onnx_int8" with dynamically quantized matmuls).
+    mean = (0.48145466, 0.4578275, 0.40821073)
+    std = (0.26862954, 0.26130258, 0.27577711)
+
+    def __init__(
+        self,
+        clip_model,
+        device: str = "cpu",
+        backend: str = "torch",
+        threads: int = 0,
+        batch_size: int = 64,
+        onnx_dir: str = "onnx_cache",
+        name: str = "clip",
+    ):
+        import torch
+
+        if threads > 0:
+            torch.set_num_threads(threads)  # process-wide, text embedding too
+        self.model = clip_model
+        self.device = device if backend == "torch" else "cpu"
+        self.backend = backend
+        self.batch_size = batch_size
+        self.threads = threads or torch.get_num_threads()
+        self.size = clip_model.visual.input_resolution
+        self._mean = torch.tensor(self.mean, device=self.device).view(1, 3, 1, 1)
+        self._std = torch.tensor(self.std, device=self.device).view(1, 3, 1, 1)
+        self.session = None
+        if backend != "torch":
+            self.session = self._onnx_session(Path(onnx_dir), name)
+
+    def embed(self, frames: list) -> list[Embedding]:
+        frames = [
+            np.asarray(f.convert("RGB")) if isinstance(f, Image.Image) else f
+            for f in frames
+        ]
+        vectors = []
+        for i in range(0, len(frames), self.batch_size):
+            pixels = self.preprocess(frames[i : i + self.batch_size])
+            vectors += self._forward(pixels).tolist()
+        return vectors
+
+    def preprocess(self, frames: list[np.ndarray]):
+        # Frames of one video share a size, so a batch is normally a single
+        # resize; mixed sizes are resized one by one
+        import torch
+        import torch.nn.functional as F
+
+        crops = [_center_square(frame) for frame in frames]
+        groups = (
+            [np.stack(crops)]
+            if len({c.shape for c in crops}) == 1
+            else [c[None] for c in crops]
+        )
+        pixels = torch.cat(
+            [
+                F.interpolate(
+                    torch.from_numpy(group)
+                    .to(self.device)
+                    .permute(0, 3, 1, 2)
+                    .float()
+                    .div_(255),
+                    size=(self.size, self.size),
+                    mode="bicubic",
+                    antialias=True,
+                    align_corners=False,
+                )
+                for group in groups
+            ]
+        )
+        return pixels.clamp_(0, 1).sub_(self._mean).div_(self._std).contiguous()
+
+    def _forward(self, pixels) -> np.ndarray:
+        if self.session is not None:
+            return self.session.run(None, {"pixels": pixels.numpy()})[0]
+        import torch
+
+        with torch.inference_mode():
+            return self.model.encode_image(pixels).float().cpu().numpy()
+
+    def _onnx_session(self, onnx_dir: Path, name: str):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise RuntimeError(
+                f"IMAGE_EMBED_BACKEND={self.backend} needs onnxruntime and onnx "
+                "(pip install onnxruntime onnx)"
+            ) from e
+
+        path = self._export(onnx_dir, re.sub(r"[^\w.-]", "-", name))
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = self.threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        return ort.InferenceSession(
+            str(path), options, providers=["CPUExecutionProvider"]
+        )
+
+    def _export(self, onnx_dir: Path, stem: str) -> Path:
+        # One-off per model: the fp32 visual tower with a dynamic batch axis,
+        # then int8 weights for its matmuls. Written under a temporary name
+        # so concurrent workers never load a half-written file.
+        import torch
+
+        onnx_dir.mkdir(parents=True, exist_ok=True)
+        fp32 = onnx_dir / f"{stem}.onnx"
+        if not fp32.exists():
+            visual = copy.deepcopy(self.model.visual).float().cpu().eval()
+            tmp = fp32.with_suffix(f".{threading.get_ident()}.tmp")
+            torch.onnx.export(
+                visual,
+                torch.randn(1, 3, self.size, self.size),
+                str(tmp),
+                input_names=["pixels"],
+                output_names=["embeds"],
+                dynamic_axes={"pixels": {0: "batch"}, "embeds": {0: "batch"}},
+                opset_version=17,
+                dynamo=False,
+            )
+            tmp.replace(fp32)
+        if self.backend != "onnx_int8":
+            return fp32
+
+        int8 = onnx_dir / f"{stem}.int8.onnx"
+        if not int8.exists():
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+
+            tmp = int8.with_suffix(f".{threading.get_ident()}.tmp")
+            quantize_dynamic(
+                str(fp32),
+                str(tmp),
+                weight_type=QuantType.QInt8,
+                op_types_to_quantize=["MatMul", "Gemm"],
+            )
+            tmp.replace(int8)
+        return int8
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.backend,
+            "device": self.device,
+            "threads": self.threads,
+            "batch_size": self.batch_size,
+        }
+
+
+def _center_square(frame: np.ndarray) -> np.ndarray:
+    # CLIP resizes the short side, then centre-crops; cropping first is the
+    # same region for a fraction of the resize work
+    h, w = frame.shape[:2]
+    side = min(h, w)
+    top, left = (h - side) // 2, (w - side) // 2
+    return frame[top : top + side, left : left + side, :3]
+
+
+class ModelRegistry:
+    # One instance per model per process, loaded on first use and shared by
+    # ingest, chat and search
+    _models: dict[str, Any] = {}
+    _locks: dict[str, threading.RLock] = {}  # per model, held while loading it
+    _locks_lock = threading.Lock()
+    load_times: dict[str, float] = {}  # seconds spent loading each model
+
+    # Models each APP_ROLE needs, in warm-up order
+    role_models = {
+        "chat": ["query_embed", "image_embed", "frame_embed", "llm"],
+        "ingest": ["text_embed", "image_embed", "frame_embed", "whisper_pool"],
+        "all": ["query_embed", "image_embed", "frame_embed", "llm", "whisper_pool"],
+    }
+
+    @classmethod
+    def _get(cls, name: str, factory: Callable[[], Any]):
+        # Loaded models are read without locking; a load only blocks other
+        # callers of the same model, not lookups of ones already loaded
+        model = cls._models.get(name)
+        if model is not None or name in cls._models:
+            return model
+        with cls._locks_lock:
+            lock = cls._locks.setdefault(name, threading.RLock())
+        with lock:
+            if name not in cls._models:
+                started = time.perf_counter()
+                cls._models[name] = factory()
+                cls.load_times[name] = round(time.perf_counter() - started, 3)
+            return cls._models[name]
+
+    @classmethod
+    def text_embed(cls) -> BaseEmbedding:
+        # Imports live in the loaders: a model placed in _models up front
+        # (tests, benchmarks) never needs its package installed
+        def load():
+            from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+
+            return HuggingFaceEmbedding(model_name=settings.TEXT_EMBED_MODEL)
+
+        return cls._get("text_embed", load)
+
+    @classmethod
+    def query_embed(cls) -> BatchingEmbedding:
+        return cls._get("query_embed", lambda: BatchingEmbedding(cls.text_embed()))
+
+    @classmethod
+    def image_embed(cls):
+        def load():
+            from llama_index.embeddings.clip import ClipEmbedding
+
+            return ClipEmbedding(
+                model_name=settings.IMAGE_EMBED_MODEL, device=settings.EMBED_DEVICE
+            )
+
+        return cls._get("image_embed", load)
+
+    @classmethod
+    def frame_embed(cls) -> FrameEmbedder | None:
+        # None when image_embed isn't a CLIP model (e.g. a test stand-in)
+        def load():
+            model = cls.image_embed()
+            if not hasattr(model, "_preprocess"):
+                return None
+            return FrameEmbedder(
+                model._model,
+                device=model._device,
+                backend=settings.IMAGE_EMBED_BACKEND,
+                threads=settings.EMBED_THREADS,
+                batch_size=settings.FRAME_EMBED_BATCH,
+                onnx_dir=settings.IMAGE_EMBED_ONNX_DIR,
+                name=settings.IMAGE_EMBED_MODEL,
+            )
+
+        return cls._get("frame_embed", load)
+
+    @classmethod
+    def embed_image(cls, image: Image.Image) -> Embedding:
+        return cls.embed_images([image])[0]
+
+    @classmethod
+    def embed_images(cls, images: list) -> list[Embedding]:
+        # Decoded frames or PIL images. ClipEmbedding only reads from paths
+        # or file objects, so CLIP goes through FrameEmbedder; other models
+        # get in-memory PNGs.
+        embedder = cls.frame_embed()
+        if embedder is not None:
+            return embedder.embed(images)
+        buffers = []
+        for image in images:
+            if not isinstance(image, Image.Image):
+                image = Image.fromarray(image)
+            buffer = io.BytesIO()
+            image.save(buffer, format="PNG")
+            buffer.seek(0)
+            buffers.append(buffer)
+        return cls.image_embed().get_image_embedding_batch(buffers)
+
+    @classmethod
+    def llm(cls):
+        def load():
+            from llama_index.llms.ollama import Ollama
+
+            return Ollama(
+                model=settings.OLLAMA_MODEL,
+                base_url=settings.OLLAMA_BASE_URL,
+                request_timeout=120,
+                max_new_tokens=settings.OLLAMA_MAX_NEW_TOKENS,
+                context_window=settings.OLLAMA_CONTEXT_WINDOW,
+            )
+
+        return cls._get("llm", load)
+
+    @classmethod
+    def reranker(cls):
+        def load():
+            from llama_index.core.postprocessor import SentenceTransformerRerank
+
+            return SentenceTransformerRerank(
+                model=settings.RERANK_MODEL,
+                top_n=settings.RETRIEVAL_TOP_K,
+                device=settings.EMBED_DEVICE,
+            )
+
+        return cls._get("reranker", load)
+
+    @classmethod
+    def whisper(cls):
+        def load():
+            from utils.transcribe import load_s2t_model
+
+            return load_s2t_model(settings.WHISPER_MODEL)
+
+        return cls._get("whisper", load)
+
+    @classmethod
+    def whisper_pool(cls):
+        # The Whisper process pool every ingest shares, or None when it
+        # would have a single worker (Whisper then runs in-process on
+        # whisper(), loaded here so warm-up covers it). WHISPER_WORKERS=0
+        # gives each of the INGEST_WORKERS videos its share of the cores;
+        # torch threads are split so the pool stays within that share too.
+        def load():
+            from utils.transcribe import WhisperPool
+
+            cores = len(os.sched_getaffinity(0))
+            budget = max(1, cores // max(settings.INGEST_WORKERS, 1))
+            workers = settings.WHISPER_WORKERS or budget
+            if workers <= 1:
+                cls.whisper()
+                return None
+            pool = WhisperPool(
+                settings.WHISPER_MODEL, workers, threads=max(1, budget // workers)
+            )
+            pool.warm()
+            return pool
+
+        return cls._get("whisper_pool", load)
+
+    @classmethod
+    def shutdown(cls):
+        # Stops the worker processes models run in (the Whisper pool)
+        pool = cls._models.pop("whisper_pool", None)
+        if pool is not None:
+            pool.shutdown()
+
+    @classmethod
+    def warmup(cls, role: str = settings.APP_ROLE) -> dict[str, float]:
+        # Loads every model the role needs; returns per-model load seconds
+        names = list(cls.role_models[role])
+        if settings.RERANK_ENABLED and role != "ingest":
+            names.append("reranker")
+        for name in names:
+            getattr(cls, name)()
+        return {name: cls.load_times.get(name, 0.0) for name in names}
+
+    @classmethod
+    def loaded(cls) -> list[str]:
+        return list(cls._models)
+
+    @classmethod
+    def stats(cls) -> dict:
+        query_embed = cls._models.get("query_embed")
+        frame_embed = cls._models.get("frame_embed")
+        return {
+            "loaded": cls.loaded(),
+            "load_times": dict(cls.load_times),
+            "query_embed": query_embed.stats() if query_embed else None,
+            "frame_embed": frame_embed.stats() if frame_embed else None,
+        }
@@ -0,0 +1,50 @@
+from llama_index.core.vector_stores.types import (
+    VectorStoreQuery,
+    VectorStoreQueryMode,
+    VectorStoreQueryResult,
+)
+from llama_index.vector_stores.qdrant import QdrantVectorStore
+from pydantic import PrivateAttr
+from qdrant_client import models
+
+
+class ProfiledQdrantVectorStore(QdrantVectorStore):
+    # QdrantVectorStore whose dense searches carry a vector profile's
+    # SearchParams (HNSW ef, oversampling + rescoring of quantized vectors);
+    # the stock store has no way to pass them. Other query modes are
+    # unchanged.
+    _search_params: models.SearchParams | None = PrivateAttr(default=None)
+
+    def __init__(self, *args, search_params: models.SearchParams | None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._search_params = search_params
+
+    def _search(self, query: VectorStoreQuery, kwargs: dict) -> dict | None:
+        if (
+            self._search_params is None
+            or self.enable_hybrid
+            or query.mode != VectorStoreQueryMode.DEFAULT
+        ):
+            return None
+        return {
+            "collection_name": self.collection_name,
+            "query_vector": models.NamedVector(
+                name=self.dense_vector_name, vector=query.query_embedding
+            ),
+            "limit": query.similarity_top_k,
+            "query_filter": kwargs.get("qdrant_filters")
+            or self._build_query_filter(query),
+            "search_params": self._search_params,
+        }
+
+    def query(self, query: VectorStoreQuery, **kwargs) -> VectorStoreQueryResult:
+        search = self._search(query, kwargs)
+        if search is None:
+            return super().query(query, **kwargs)
+        return self.parse_to_query_result(self._client.search(**search))
+
+    async def aquery(self, query: VectorStoreQuery, **kwargs) -> VectorStoreQueryResult:
+        search = self._search(query, kwargs)
+        if search is None:
+            return await super().aquery(query, **kwargs)
+        return self.parse_to_query_result(await self._aclient.search(**search))
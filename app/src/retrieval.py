@@ -0,0 +1,134 @@
+import math
+import re
+
+import numpy as np
+from config.settings import settings
+from llama_index.core import QueryBundle
+from llama_index.core.retrievers import BaseRetriever
+from llama_index.core.schema import BaseNode, ImageNode, NodeWithScore
+
+# Keeps identifiers, versions and numbers whole: "foo_bar", "v1.2", "3.14"
+TOKEN = re.compile(r"[a-z0-9_]+(?:[.\-][a-z0-9_]+)*")
+
+
+def tokenize(text: str) -> list[str]:
+    return TOKEN.findall(text.lower())
+
+
+class BM25Index:
+    # Okapi BM25 over a video's transcript nodes. Postings are numpy arrays
+    # per term, so a query costs one vectorised update per query term.
+    def __init__(self, nodes: list[BaseNode], k1: float = 1.5, b: float = 0.75):
+        self.nodes = nodes
+        docs = [tokenize(node.get_content()) for node in nodes]
+        lengths = np.array([len(doc) for doc in docs], dtype=np.float32)
+        avg = lengths.mean() if len(docs) else 0.0
+        # Length normalisation is per document, so fold it in once here
+        self._norm = k1 * (1 - b + b * lengths / (avg or 1.0))
+        self._k1 = k1
+
+        postings: dict[str, dict[int, int]] = {}
+        for i, doc in enumerate(docs):
+            for term in doc:
+                counts = postings.setdefault(term, {})
+                counts[i] = counts.get(i, 0) + 1
+        n = len(docs)
+        self._postings = {
+            term: (
+                math.log(1 + (n - len(counts) + 0.5) / (len(counts) + 0.5)),
+                np.fromiter(counts.keys(), dtype=np.int64),
+                np.fromiter(counts.values(), dtype=np.float32),
+            )
+            for term, counts in postings.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def search(
+        self, query: str, top_k: int, within: np.ndarray | None = None
+    ) -> list[NodeWithScore]:
+        # within: optional boolean mask over self.nodes; other nodes never hit
+        scores = np.zeros(len(self.nodes), dtype=np.float32)
+        for term in set(tokenize(query)):
+            if term not in self._postings:
+                continue
+            idf, docs, tf = self._postings[term]
+            scores[docs] += idf * tf * (self._k1 + 1) / (tf + self._norm[docs])
+        if within is not None:
+            scores[~within] = 0.0
+        hits = np.flatnonzero(scores)
+        if len(hits) > top_k:
+            hits = hits[np.argpartition(-scores[hits], top_k)[:top_k]]
+        hits = hits[np.argsort(-scores[hits])]
+        return [NodeWithScore(node=self.nodes[i], score=float(scores[i])) for i in hits]
+
+
+def reciprocal_rank_fusion(
+    rankings: list[list[NodeWithScore]], k: int = 60
+) -> list[NodeWithScore]:
+    # score(node) = sum over rankings of 1 / (k + rank); raw scores from
+    # different retrievers aren't comparable, ranks are
+    fused: dict[str, NodeWithScore] = {}
+    for ranking in rankings:
+        for rank, hit in enumerate(ranking, start=1):
+            node_id = hit.node.node_id
+            if node_id not in fused:
+                fused[node_id] = NodeWithScore(node=hit.node, score=0.0)
+            fused[node_id].score += 1.0 / (k + rank)
+    return sorted(fused.values(), key=lambda hit: hit.score, reverse=True)
+
+
+def drop_nested(hits: list[NodeWithScore]) -> list[NodeWithScore]:
+    # Transcripts are indexed at every HierarchicalNodeParser level; a parent
+    # and its child chunk would put the same words in the prompt twice
+    kept = []
+    for hit in hits:
+        m = hit.node.metadata
+        if any(
+            (k["start"] <= m["start"] and m["end"] <= k["end"])
+            or (m["start"] <= k["start"] and k["end"] <= m["end"])
+            for k in (other.node.metadata for other in kept)
+        ):
+            continue
+        kept.append(hit)
+    return kept
+
+
+class HybridRetriever(BaseRetriever):
+    # Dense (Qdrant) and sparse (BM25) transcript candidates fused with RRF,
+    # optionally reranked by a cross-encoder, cut to top_k text nodes. Image
+    # nodes from the dense retriever pass through unchanged.
+    def __init__(
+        self,
+        dense: BaseRetriever,
+        bm25: BM25Index,
+        top_k: int = settings.RETRIEVAL_TOP_K,
+        candidates: int = settings.RETRIEVAL_CANDIDATES,
+        rrf_k: int = settings.RETRIEVAL_RRF_K,
+        reranker=None,
+    ):
+        super().__init__()
+        self.dense = dense
+        self.bm25 = bm25
+        self.top_k = top_k
+        self.candidates = candidates
+        self.rrf_k = rrf_k
+        self.reranker = reranker
+
+    def _retrieve(self, query_bundle: QueryBundle) -> list[NodeWithScore]:
+        text, sparse, images = self._candidates(query_bundle)
+        fused = drop_nested(reciprocal_rank_fusion([text, sparse], k=self.rrf_k))
+        if self.reranker is not None and fused:
+            fused = self.reranker.postprocess_nodes(
+                fused[: self.candidates], query_bundle=query_bundle
+            )
+        return fused[: self.top_k] + images
+
+    def _candidates(self, query_bundle: QueryBundle) -> tuple[list, list, list]:
+        # (dense transcript hits, BM25 hits, frames)
+        dense = self.dense.retrieve(query_bundle)
+        images = [hit for hit in dense if isinstance(hit.node, ImageNode)]
+        text = [hit for hit in dense if not isinstance(hit.node, ImageNode)]
+        sparse = self.bm25.search(query_bundle.query_str, self.candidates)
+        return text, sparse, images
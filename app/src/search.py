@@ -0,0 +1,194 @@
+import asyncio
+import json
+import time
+from itertools import zip_longest
+
+from config.settings import settings
+from utils.helpers import ts
+
+from .models import ModelRegistry
+from .storage import StorageManager
+from .vector_profiles import VectorProfile
+
+
+class SearchService:
+    # Library-wide retrieval straight from Qdrant: no index loading and no LLM
+    # call, so a query costs one embedding plus the vector searches. With
+    # the per_video layout those are one query per video collection, sent
+    # concurrently; the shared layout needs a single grouped query.
+
+    @classmethod
+    async def asearch(
+        cls,
+        query: str,
+        top_k: int = 10,
+        offset: int = 0,
+        per_video: int = 3,
+        images: bool = False,
+    ) -> dict:
+        started = time.perf_counter()
+        wanted = offset + top_k
+        # Transcript chunks are indexed at every HierarchicalNodeParser level,
+        # so over-fetch to still fill the cap once nested chunks are dropped
+        fetch = per_video * len(settings.CHUNK_SIZES)
+
+        searches = [
+            cls._asearch_modality(
+                "text",
+                await ModelRegistry.query_embed().aget_query_embedding(query),
+                wanted,
+                fetch,
+            )
+        ]
+        if images:
+            vector = await asyncio.to_thread(
+                ModelRegistry.image_embed().get_text_embedding, query
+            )
+            searches.append(cls._asearch_modality("image", vector, wanted, per_video))
+        hits, *image_hits = await asyncio.gather(*searches)
+        if images:
+            # MiniLM and CLIP scores live on different scales, so the two
+            # lists are interleaved by rank rather than merged by score
+            image_hits = image_hits[0]
+            hits = [
+                hit
+                for pair in zip_longest(cls._by_score(hits), cls._by_score(image_hits))
+                for hit in pair
+                if hit is not None
+            ]
+        else:
+            hits = cls._by_score(hits)
+
+        ranked, per_video_count = [], {}
+        for hit in hits:
+            video_id = hit["video_id"]
+            if per_video_count.get(video_id, 0) >= per_video:
+                continue
+            if cls._is_nested(hit, ranked):
+                continue
+            per_video_count[video_id] = per_video_count.get(video_id, 0) + 1
+            ranked.append(hit)
+
+        # Exact for per_video (every video is searched); the shared layout
+        # only fetches the best `wanted` videos, so there it counts the
+        # hits of those and a full page means more may follow
+        return {
+            "query": query,
+            "hits": ranked[offset:wanted],
+            "total": len(ranked),
+            "took_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+
+    @classmethod
+    async def _asearch_modality(
+        cls, modality: str, vector: list[float], videos: int, per_video: int
+    ) -> list[dict]:
+        params = VectorProfile.for_modality(modality).search_params()
+        shared = (
+            settings.QDRANT_TEXT_COLLECTION
+            if modality == "text"
+            else settings.QDRANT_IMAGE_COLLECTION
+        )
+        if settings.QDRANT_LAYOUT == "shared":
+            if not await cls._qdrant("collection_exists", shared):
+                return []
+            # Top groups by best hit hold every hit that can survive the cap
+            response = await cls._qdrant(
+                "query_points_groups",
+                shared,
+                query=vector,
+                group_by="video_id",
+                group_size=per_video,
+                limit=videos,
+                with_payload=True,
+                search_params=params,
+            )
+            return [
+                cls._to_hit(point, group.id)
+                for group in response.groups
+                for point in group.hits
+            ]
+
+        prefix = "text_" if modality == "text" else "img_"
+        collections = (await cls._qdrant("get_collections")).collections
+        names = [
+            c.name
+            for c in collections
+            if c.name.startswith(prefix)
+            and c.name
+            not in (settings.QDRANT_TEXT_COLLECTION, settings.QDRANT_IMAGE_COLLECTION)
+        ]
+        # Bounded by the Qdrant pool, so one search can't queue past it
+        limit = asyncio.Semaphore(settings.QDRANT_MAX_CONNECTIONS)
+
+        async def query(name: str) -> list[dict]:
+            async with limit:
+                response = await cls._qdrant(
+                    "query_points",
+                    name,
+                    query=vector,
+                    limit=per_video,
+                    with_payload=True,
+                    search_params=params,
+                )
+            return [
+                cls._to_hit(point, name[len(prefix) :]) for point in response.points
+            ]
+
+        return [
+            hit for hits in await asyncio.gather(*map(query, names)) for hit in hits
+        ]
+
+    @staticmethod
+    async def _qdrant(method: str, *args, **kwargs):
+        # The async client where there is one, else the sync client on the
+        # storage executor (local modes, see _connect_async_qdrant)
+        if StorageManager.aqdrant is not None:
+            return await getattr(StorageManager.aqdrant, method)(*args, **kwargs)
+        return await StorageManager.run(
+            getattr(StorageManager.qdrant, method), *args, **kwargs
+        )
+
+    @staticmethod
+    def _by_score(hits: list[dict]) -> list[dict]:
+        return sorted(hits, key=lambda h: h["score"], reverse=True)
+
+    @staticmethod
+    def _to_hit(point, video_id: str) -> dict:
+        payload = point.payload or {}
+        content = json.loads(payload.get("_node_content") or "{}")
+        hit = {"video_id": video_id, "score": round(point.score, 4)}
+        if payload.get("type") == "text":
+            start, end = payload["start"], payload["end"]
+            text = content.get("text", "")
+            return {
+                **hit,
+                "type": "text",
+                "start": start,
+                "end": end,
+                "time": f"{ts(start)}–{ts(end)}",
+                "text": text[: settings.SEARCH_SNIPPET_CHARS],
+            }
+        t = payload["timestamp"]
+        return {
+            **hit,
+            "type": "image",
+            "start": t,
+            "end": t,
+            "time": ts(t),
+            "path": content.get("image_url"),
+        }
+
+    @staticmethod
+    def _is_nested(hit: dict, ranked: list[dict]) -> bool:
+        # A parent/child chunk of an already ranked transcript hit
+        if hit["type"] != "text":
+            return False
+        for other in ranked:
+            if other["video_id"] != hit["video_id"] or other["type"] != "text":
+                continue
+            if (other["start"] <= hit["start"] and hit["end"] <= other["end"]) or (
+                hit["start"] <= other["start"] and other["end"] <= hit["end"]
+            ):
+                return True
+        return False
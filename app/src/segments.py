@@ -0,0 +1,181 @@
+import math
+from itertools import zip_longest
+
+import numpy as np
+from config.settings import settings
+from llama_index.core import QueryBundle
+from llama_index.core.constants import DEFAULT_SIMILARITY_TOP_K
+from llama_index.core.node_parser import get_leaf_nodes
+from llama_index.core.schema import BaseNode, NodeWithScore, TextNode
+
+from .retrieval import BM25Index, HybridRetriever
+
+
+def segment_bounds(
+    duration: float, chapters: list[dict], window: float
+) -> list[tuple[float, float, str]]:
+    # (start, end, title) per segment: the video's chapters where it has
+    # them (yt-dlp "chapters"), each cut into equal pieces of at most
+    # `window` seconds; a video without chapters is one long chapter
+    cuts = {0.0: ""}
+    for chapter in chapters:
+        if 0 < chapter["start_time"] < duration:
+            cuts[float(chapter["start_time"])] = chapter.get("title") or ""
+    starts = sorted(cuts)
+    bounds = []
+    for start, end in zip(starts, starts[1:] + [max(duration, starts[-1])]):
+        pieces = max(1, math.ceil((end - start) / window))
+        step = (end - start) / pieces
+        bounds += [
+            (start + i * step, start + (i + 1) * step, cuts[start])
+            for i in range(pieces)
+        ]
+    return bounds
+
+
+class _SegmentedVectors:
+    # One modality's nodes with their (normalised) embeddings, grouped by
+    # segment, so a search only scores the members of the chosen segments
+    def __init__(self, nodes: list[BaseNode], segment: np.ndarray, count: int):
+        self.nodes = nodes
+        self.segment = segment
+        vectors = np.asarray([n.embedding for n in nodes], dtype=np.float32)
+        if vectors.ndim == 2:
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12
+        self.vectors = vectors
+        order = np.argsort(segment, kind="stable")
+        splits = np.searchsorted(segment[order], np.arange(1, count))
+        self.members = np.split(order, splits)
+
+    def search(
+        self, query: list[float], segments: list[int], top_k: int
+    ) -> list[NodeWithScore]:
+        ids = np.concatenate([self.members[s] for s in segments] or [[]]).astype(int)
+        if not len(ids) or top_k <= 0:
+            return []
+        scores = self.vectors[ids] @ np.asarray(query, dtype=np.float32)
+        if len(ids) > top_k:
+            best = np.argpartition(-scores, top_k)[:top_k]
+            ids, scores = ids[best], scores[best]
+        order = np.argsort(-scores)
+        return [
+            NodeWithScore(node=self.nodes[i], score=float(s))
+            for i, s in zip(ids[order], scores[order])
+        ]
+
+
+class SegmentIndex:
+    # Coarse level of a long video's index. Segments (chapters or fixed
+    # windows) are summarised by the normalised mean of their leaf
+    # transcript vectors and by a BM25 document of their text; a question
+    # first picks the best segments by both rankings, then only the
+    # transcript nodes and frames inside them are scored. The fine search
+    # touches a few segments' worth of vectors however long the video is.
+    def __init__(
+        self,
+        text_nodes: list[BaseNode],
+        image_nodes: list[BaseNode],
+        duration: float,
+        chapters: list[dict] = (),
+        window: float = settings.SEGMENT_SECONDS,
+    ):
+        self.bounds = segment_bounds(duration, list(chapters), window)
+        starts = np.array([start for start, _, _ in self.bounds])
+
+        def segment_of(times) -> np.ndarray:
+            times = np.asarray(times, dtype=np.float64).reshape(-1)
+            return np.clip(np.searchsorted(starts, times, side="right") - 1, 0, None)
+
+        count = len(self.bounds)
+        self.text = _SegmentedVectors(
+            text_nodes, segment_of([n.metadata["start"] for n in text_nodes]), count
+        )
+        self.images = _SegmentedVectors(
+            image_nodes,
+            segment_of([n.metadata["timestamp"] for n in image_nodes]),
+            count,
+        )
+
+        # Leaves only: every hierarchy level holds the same words
+        leaf_ids = {n.node_id for n in get_leaf_nodes(text_nodes)}
+        texts = [[title] for _, _, title in self.bounds]
+        centroids = np.zeros((count, self.text.vectors.shape[-1]), dtype=np.float32)
+        for i, (node, s) in enumerate(zip(text_nodes, self.text.segment)):
+            if node.node_id in leaf_ids:
+                texts[s].append(node.get_content())
+                centroids[s] += self.text.vectors[i]
+        centroids /= np.linalg.norm(centroids, axis=1, keepdims=True) + 1e-12
+        self.centroids = centroids
+        self.docs = [
+            TextNode(
+                id_=f"segment_{i}",
+                text=" ".join(t for t in words if t),
+                metadata={"start": start, "end": end, "segment": i},
+            )
+            for i, ((start, end, _), words) in enumerate(zip(self.bounds, texts))
+        ]
+        self.bm25 = BM25Index(self.docs)
+
+    def __len__(self) -> int:
+        return len(self.bounds)
+
+    def select(self, query: str, embedding: list[float], top_k: int) -> list[int]:
+        # Best segments for a question, the dense (summary vector) and BM25
+        # rankings interleaved by rank: with two short lists RRF favours a
+        # segment both rank middling over one BM25 alone ranks first, and a
+        # rare exact term is usually the whole question
+        scores = self.centroids @ np.asarray(embedding, dtype=np.float32)
+        dense = [int(i) for i in np.argsort(-scores)[:top_k]]
+        sparse = [
+            hit.node.metadata["segment"] for hit in self.bm25.search(query, top_k)
+        ]
+        chosen = []
+        for pair in zip_longest(sparse, dense):
+            for segment in pair:
+                if segment is not None and segment not in chosen:
+                    chosen.append(segment)
+        return sorted(chosen[:top_k])
+
+    def within(self, segments: list[int]) -> np.ndarray:
+        # Boolean mask over the transcript nodes in `segments`
+        return np.isin(self.text.segment, segments)
+
+
+class SegmentRetriever(HybridRetriever):
+    # Hybrid retrieval inside the segments a SegmentIndex picks: dense hits
+    # come from the in-memory segment vectors (no Qdrant round trip), BM25
+    # is masked to the same nodes, frames are the nearest inside the
+    # segments. Fusion, reranking and the top_k cut are HybridRetriever's.
+    def __init__(
+        self,
+        segments: SegmentIndex,
+        bm25: BM25Index,
+        embed_model,
+        image_embed_model,
+        segment_top_k: int = settings.SEGMENT_TOP_K,
+        image_top_k: int = DEFAULT_SIMILARITY_TOP_K,
+        **kwargs,
+    ):
+        super().__init__(dense=None, bm25=bm25, **kwargs)
+        self.segments = segments
+        self.embed_model = embed_model
+        self.image_embed_model = image_embed_model
+        self.segment_top_k = segment_top_k
+        self.image_top_k = image_top_k
+
+    def _candidates(self, query_bundle: QueryBundle) -> tuple[list, list, list]:
+        query = query_bundle.query_str
+        embedding = self.embed_model.get_query_embedding(query)
+        chosen = self.segments.select(query, embedding, self.segment_top_k)
+        text = self.segments.text.search(embedding, chosen, self.candidates)
+        sparse = self.bm25.search(
+            query, self.candidates, within=self.segments.within(chosen)
+        )
+        images = []
+        if len(self.segments.images.nodes):
+            images = self.segments.images.search(
+                self.image_embed_model.get_text_embedding(query),
+                chosen,
+                self.image_top_k,
+            )
+        return text, sparse, images
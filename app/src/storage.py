@@ -1,45 +1,652 @@
+import asyncio
+import contextvars
+import functools
+import hashlib
+import inspect
+import io
+import json
+import random
+import tarfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
 import redis
+import redis.asyncio as aioredis
+import urllib3
 from config.settings import settings
+from llama_index.core.schema import BaseNode
+from llama_index.core.vector_stores import MetadataFilter, MetadataFilters
+from llama_index.core.vector_stores.utils import metadata_dict_to_node
 from llama_index.storage.index_store.redis import RedisIndexStore
+from llama_index.storage.kvstore.redis import RedisKVStore
 from minio import Minio
-from qdrant_client import QdrantClient
+from minio.error import S3Error, ServerError
+from qdrant_client import AsyncQdrantClient, QdrantClient, models
+from urllib3.exceptions import HTTPError
+from utils.helpers import file_sha256
+from utils.telemetry import instrument, watch_pool
 
+from .cache import LRUCache
+from .vector_profiles import VectorProfile
 
-class StorageManager:
-    # MinIO
-    minio = Minio(
+
+class _LazyClient:
+    # Class attribute built on first access, then cached on the owner class,
+    # so importing StorageManager never opens a connection. `close` releases
+    # a built client (see StorageManager.close).
+    def __init__(self, factory, close=None):
+        self.factory = factory
+        self.close = close
+        self.lock = threading.Lock()
+
+    def __set_name__(self, owner, name):
+        self.name = name
+        if "lazy_clients" not in owner.__dict__:
+            owner.lazy_clients = {}
+        owner.lazy_clients[name] = self
+
+    def __get__(self, obj, owner):
+        with self.lock:
+            value = owner.__dict__[self.name]
+            if value is self:
+                started = time.perf_counter()
+                value = self.factory()
+                owner.connect_times[self.name] = round(time.perf_counter() - started, 3)
+                setattr(owner, self.name, value)
+            return value
+
+
+def _connect_minio() -> Minio:
+    # One urllib3 pool shared by uploads, frame reads and the async executor;
+    # otherwise as Minio's default client
+    timeout = 300
+    client = Minio(
         endpoint=settings.MINIO_ENDPOINT,
         access_key=settings.MINIO_ACCESS_KEY,
         secret_key=settings.MINIO_SECRET_KEY,
         secure=settings.MINIO_SECURE,
+        http_client=urllib3.PoolManager(
+            timeout=urllib3.Timeout(connect=timeout, read=timeout),
+            maxsize=settings.MINIO_MAX_CONNECTIONS,
+            retries=urllib3.Retry(
+                total=5, backoff_factor=0.2, status_forcelist=[500, 502, 503, 504]
+            ),
+        ),
     )
-    if not minio.bucket_exists(settings.MINIO_BUCKET):
-        minio.make_bucket(settings.MINIO_BUCKET)
+    if not client.bucket_exists(settings.MINIO_BUCKET):
+        client.make_bucket(settings.MINIO_BUCKET)
+    return client
+
+
+def _qdrant_limits() -> httpx.Limits:
+    # qdrant-client turns keep-alive off for localhost; keep a real pool
+    return httpx.Limits(
+        max_connections=settings.QDRANT_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.QDRANT_MAX_CONNECTIONS,
+    )
+
+
+def _connect_async_qdrant() -> AsyncQdrantClient | None:
+    # Local modes (":memory:", a path) can't share data between a sync and
+    # an async client; their async calls go through the executor instead
+    if not settings.QDRANT_URL.startswith(("http://", "https://")):
+        return None
+    return AsyncQdrantClient(settings.QDRANT_URL, limits=_qdrant_limits())
+
+
+def _redis_kwargs(**overrides) -> dict:
+    return {
+        "host": settings.REDIS_HOST,
+        "port": settings.REDIS_PORT,
+        "db": settings.REDIS_DB,
+        "decode_responses": True,
+        "max_connections": settings.REDIS_MAX_CONNECTIONS,
+        "timeout": settings.REDIS_POOL_TIMEOUT,
+        **overrides,
+    }
+
+
+def _connect_index_kvstore() -> RedisKVStore:
+    # llama_index's index store decodes bytes itself, so it gets its own
+    # small pools (it is read once per query-engine build)
+    kwargs = _redis_kwargs(decode_responses=False, max_connections=8)
+    return RedisKVStore(
+        redis_client=redis.Redis(
+            connection_pool=redis.BlockingConnectionPool(**kwargs)
+        ),
+        async_redis_client=aioredis.Redis(
+            connection_pool=aioredis.BlockingConnectionPool(**kwargs)
+        ),
+    )
+
+
+async def _close_index_kvstore(kvstore: RedisKVStore):
+    kvstore._redis_client.close()
+    kvstore._redis_client.connection_pool.disconnect()
+    await kvstore._async_redis_client.aclose(close_connection_pool=True)
+
+
+def _httpx_in_use(client) -> int:
+    # Connections of an httpx client's pool that are serving a request
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    return sum(not c.is_idle() for c in pool.connections) if pool else 0
+
+
+@instrument
+class StorageManager:
+    connect_times: dict[str, float] = {}  # seconds spent creating each client
+
+    # MinIO. Its client is blocking, so async callers run it on `executor`
+    minio = _LazyClient(_connect_minio, close=lambda c: c._http.clear())
     bucket = settings.MINIO_BUCKET
 
     # Qdrant
-    qdrant = QdrantClient(settings.QDRANT_URL)
+    qdrant = _LazyClient(
+        lambda: QdrantClient(settings.QDRANT_URL, limits=_qdrant_limits()),
+        close=lambda c: c.close(),
+    )
+    aqdrant = _LazyClient(_connect_async_qdrant, close=lambda c: c and c.close())
 
-    # Redis
-    redis = redis.Redis(
-        host=settings.REDIS_HOST,
-        port=settings.REDIS_PORT,
-        db=settings.REDIS_DB,
-        decode_responses=True,
+    # Redis. Blocking pools: at the limit, callers wait for a free connection
+    # (up to REDIS_POOL_TIMEOUT) instead of opening more
+    redis_pool = _LazyClient(
+        lambda: redis.BlockingConnectionPool(**_redis_kwargs()),
+        close=lambda c: c.disconnect(),
+    )
+    redis = _LazyClient(
+        lambda: redis.Redis(connection_pool=StorageManager.redis_pool),
+        close=lambda c: c.close(),
     )
+    aredis = _LazyClient(
+        lambda: aioredis.Redis(
+            connection_pool=aioredis.BlockingConnectionPool(**_redis_kwargs())
+        ),
+        close=lambda c: c.aclose(close_connection_pool=True),
+    )
+    index_kvstore = _LazyClient(_connect_index_kvstore, close=_close_index_kvstore)
+
+    # Threads for blocking calls made from the event loop
+    executor = _LazyClient(
+        lambda: ThreadPoolExecutor(
+            max_workers=settings.MINIO_MAX_CONNECTIONS, thread_name_prefix="storage"
+        ),
+        close=lambda c: c.shutdown(wait=True),
+    )
+
+    # Frame-pack byte-range indexes, keyed by pack prefix
+    pack_indexes = LRUCache(maxsize=256)
 
     @classmethod
-    def upload(cls, local_path: str, object_name: str):
-        cls.minio.fput_object(cls.bucket, object_name, local_path)
+    def open(cls):
+        # Called once from the app lifespan: builds every pool up front
+        # (ingest threads and chat requests then share them) and exports
+        # their saturation as askyt_pool_connections_*
+        for name in cls.lazy_clients:
+            getattr(cls, name)
+        pool = cls.redis_pool
+        watch_pool(
+            "redis",
+            pool.max_connections,
+            lambda: pool.max_connections - pool.pool.qsize(),
+        )
+        apool = cls.aredis.connection_pool
+        watch_pool(
+            "redis_async", apool.max_connections, lambda: len(apool._in_use_connections)
+        )
+        http = cls.minio._http.connection_from_url(
+            f"{'https' if settings.MINIO_SECURE else 'http'}://{settings.MINIO_ENDPOINT}"
+        )
+        watch_pool(
+            "minio",
+            settings.MINIO_MAX_CONNECTIONS,
+            lambda: http.pool.maxsize - http.pool.qsize(),
+        )
+        if cls.aqdrant is not None:
+            sync_http = cls.qdrant._client.openapi_client.client._client
+            async_http = cls.aqdrant._client.openapi_client.client._async_client
+            watch_pool(
+                "qdrant",
+                settings.QDRANT_MAX_CONNECTIONS,
+                lambda: _httpx_in_use(sync_http),
+            )
+            watch_pool(
+                "qdrant_async",
+                settings.QDRANT_MAX_CONNECTIONS,
+                lambda: _httpx_in_use(async_http),
+            )
 
     @classmethod
-    def get_qdrant_vector_store(cls, collection: str, dim: int):
-        from llama_index.vector_stores.qdrant import QdrantVectorStore
+    async def close(cls):
+        # Lifespan shutdown: waits for in-flight executor calls, closes every
+        # built client and puts the lazy placeholders back
+        for name, lazy in reversed(cls.lazy_clients.items()):
+            client = cls.__dict__[name]
+            if client is lazy:
+                continue
+            setattr(cls, name, lazy)
+            if lazy.close is None:
+                continue
+            result = lazy.close(client)
+            if inspect.isawaitable(result):
+                await result
 
-        return QdrantVectorStore(client=cls.qdrant, collection_name=collection, dim=dim)
+    @classmethod
+    async def health(cls) -> dict:
+        # One round trip per backend, concurrently, each bounded by
+        # STORAGE_HEALTH_TIMEOUT: {"redis": "ok", "minio": "error: ...", ...}
+        qdrant = (
+            cls.aqdrant.get_collections()
+            if cls.aqdrant is not None
+            else cls.run(cls.qdrant.get_collections)
+        )
+        checks = {
+            "redis": cls.aredis.ping(),
+            "qdrant": qdrant,
+            "minio": cls.run(cls.minio.bucket_exists, cls.bucket),
+        }
+        results = await asyncio.gather(
+            *(
+                asyncio.wait_for(check, settings.STORAGE_HEALTH_TIMEOUT)
+                for check in checks.values()
+            ),
+            return_exceptions=True,
+        )
+        return {
+            name: (
+                f"error: {type(result).__name__}: {result}"
+                if isinstance(result, BaseException)
+                else "ok"
+            )
+            for name, result in zip(checks, results)
+        }
 
     @classmethod
-    def get_redis_index_store(cls, namespace: str):
-        return RedisIndexStore.from_host_and_port(
-            host=settings.REDIS_HOST, port=settings.REDIS_PORT, namespace=namespace
+    async def run(cls, fn, *args, **kwargs):
+        # A blocking call on the storage executor, keeping the caller's
+        # context (request id) for its log lines
+        ctx = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(
+            cls.executor, functools.partial(ctx.run, fn, *args, **kwargs)
+        )
+
+    @classmethod
+    def upload(cls, local_path: str, object_name: str, skip_existing: bool = True):
+        # Returns False when an object with the same sha256 is already stored
+        digest = file_sha256(local_path)
+        if skip_existing and cls._stored_checksum(object_name) == digest:
+            return False
+        cls._with_retries(
+            cls.minio.fput_object,
+            cls.bucket,
+            object_name,
+            local_path,
+            metadata={"sha256": digest},
+        )
+        return True
+
+    @classmethod
+    def upload_bytes(
+        cls,
+        data: bytes,
+        object_name: str,
+        content_type: str = "application/octet-stream",
+        skip_existing: bool = True,
+    ) -> bool:
+        # In-memory counterpart of upload; a fresh stream per attempt
+        digest = hashlib.sha256(data).hexdigest()
+        if skip_existing and cls._stored_checksum(object_name) == digest:
+            return False
+        cls._with_retries(
+            lambda: cls.minio.put_object(
+                cls.bucket,
+                object_name,
+                io.BytesIO(data),
+                len(data),
+                content_type=content_type,
+                metadata={"sha256": digest},
+            )
+        )
+        return True
+
+    @classmethod
+    def upload_many(
+        cls,
+        items: list[tuple[str, str]],
+        max_workers: int = settings.UPLOAD_WORKERS,
+        skip_existing: bool = True,
+    ) -> dict:
+        # items: (local_path, object_name) pairs, uploaded on a bounded pool
+        stats = {"uploaded": 0, "skipped": 0}
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            for uploaded in pool.map(
+                lambda item: cls.upload(*item, skip_existing=skip_existing), items
+            ):
+                stats["uploaded" if uploaded else "skipped"] += 1
+        return stats
+
+    @classmethod
+    def upload_frame_pack(cls, prefix: str, files: list[tuple]) -> dict:
+        # Packs (data, member_name) files, data being bytes or a local path,
+        # into one uncompressed tar at {prefix}/pack.tar plus a
+        # {prefix}/pack.json index of byte ranges, so a whole video's frames
+        # cost two PUTs instead of one per frame. The tar is built in memory.
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w") as tar:
+            for data, name in files:
+                if isinstance(data, bytes):
+                    info = tarfile.TarInfo(name)  # mtime 0: same frames, same pack
+                    info.size = len(data)
+                    tar.addfile(info, io.BytesIO(data))
+                else:
+                    tar.add(data, arcname=name)
+        buffer.seek(0)
+        with tarfile.open(fileobj=buffer) as tar:
+            index = {m.name: [m.offset_data, m.size] for m in tar.getmembers()}
+        cls.upload_bytes(buffer.getvalue(), f"{prefix}/pack.tar", "application/x-tar")
+        cls.upload_bytes(
+            json.dumps(index).encode(), f"{prefix}/pack.json", "application/json"
+        )
+        cls.pack_indexes.set(prefix, index)
+        return index
+
+    @classmethod
+    def read_packed(cls, prefix: str, name: str) -> bytes:
+        index = cls.pack_indexes.get(prefix)
+        if index is None:
+            index = json.loads(cls._read(f"{prefix}/pack.json"))
+            cls.pack_indexes.set(prefix, index)
+        offset, size = index[name]
+        return cls._read(f"{prefix}/pack.tar", offset=offset, length=size)
+
+    @classmethod
+    async def aread_packed(cls, prefix: str, name: str) -> bytes:
+        return await cls.run(cls.read_packed, prefix, name)
+
+    @classmethod
+    def _read(cls, object_name: str, **kwargs) -> bytes:
+        response = cls._with_retries(
+            cls.minio.get_object, cls.bucket, object_name, **kwargs
+        )
+        try:
+            return response.read()
+        finally:
+            response.close()
+            response.release_conn()
+
+    @classmethod
+    def _stored_checksum(cls, object_name: str) -> str | None:
+        try:
+            stat = cls.minio.stat_object(cls.bucket, object_name)
+        except S3Error:
+            return None
+        return (stat.metadata or {}).get("x-amz-meta-sha256")
+
+    @staticmethod
+    def _with_retries(fn, *args, **kwargs):
+        # Exponential backoff with jitter on transient (5xx / network) errors
+        for attempt in range(settings.UPLOAD_RETRIES + 1):
+            try:
+                return fn(*args, **kwargs)
+            except (ServerError, HTTPError, ConnectionError):
+                if attempt == settings.UPLOAD_RETRIES:
+                    raise
+                delay = settings.UPLOAD_BACKOFF * 2**attempt
+                time.sleep(delay * (1 + random.random() / 2))
+
+    @classmethod
+    def get_qdrant_vector_store(cls, collection: str, modality: str, **kwargs):
+        # Collection config and search params follow the modality's vector
+        # profile (QDRANT_{TEXT,IMAGE}_PROFILE / _HNSW)
+        from .qdrant_store import ProfiledQdrantVectorStore
+
+        profile = VectorProfile.for_modality(modality)
+        return ProfiledQdrantVectorStore(
+            client=cls.qdrant,
+            aclient=cls.aqdrant,
+            collection_name=collection,
+            dim=profile.dim,
+            dense_config=profile.vector_params(),
+            search_params=profile.search_params(),
+            **kwargs,
+        )
+
+    @classmethod
+    def get_video_vector_stores(cls, video_id: str):
+        # (text, image) stores for a video. "per_video" keeps two collections
+        # per video; "shared" puts every video in one text and one image
+        # collection, keyed by an indexed video_id payload (see video_filters).
+        if settings.QDRANT_LAYOUT == "shared":
+            tenant_index = [
+                {
+                    "field_name": "video_id",
+                    "field_schema": models.KeywordIndexParams(
+                        type="keyword", is_tenant=True
+                    ),
+                }
+            ]
+            return (
+                cls.get_qdrant_vector_store(
+                    settings.QDRANT_TEXT_COLLECTION,
+                    "text",
+                    payload_indexes=tenant_index,
+                ),
+                cls.get_qdrant_vector_store(
+                    settings.QDRANT_IMAGE_COLLECTION,
+                    "image",
+                    payload_indexes=tenant_index,
+                ),
+            )
+        return (
+            cls.get_qdrant_vector_store(f"text_{video_id}", "text"),
+            cls.get_qdrant_vector_store(f"img_{video_id}", "image"),
         )
+
+    @classmethod
+    def ensure_video_collections(cls, video_id: str):
+        # Creates the video's collections up front (through the stores, so
+        # their config matches) for queries that arrive before the first insert
+        for store in cls.get_video_vector_stores(video_id):
+            if not cls.qdrant.collection_exists(store.collection_name):
+                store._create_collection(
+                    store.collection_name, store._dense_config.size
+                )
+
+    @classmethod
+    def apply_vector_profiles(cls, dry_run: bool = False) -> dict[str, str]:
+        # Moves existing collections to the configured profiles in place
+        # (Qdrant re-quantizes / re-indexes in the background); new
+        # collections get them at creation. Returns {collection: profile}.
+        applied = {}
+        for collection in cls.qdrant.get_collections().collections:
+            name = collection.name
+            if name == settings.QDRANT_TEXT_COLLECTION or name.startswith("text_"):
+                modality = "text"
+            elif name == settings.QDRANT_IMAGE_COLLECTION or name.startswith("img_"):
+                modality = "image"
+            else:
+                continue
+            profile = VectorProfile.for_modality(modality)
+            applied[name] = profile.name
+            if dry_run:
+                continue
+            params = profile.vector_params()
+            vectors = cls.qdrant.get_collection(name).config.params.vectors
+            # llama_index creates an unnamed vector ("") unless hybrid
+            vector_name = next(iter(vectors)) if isinstance(vectors, dict) else ""
+            cls.qdrant.update_collection(
+                name,
+                vectors_config={
+                    vector_name: models.VectorParamsDiff(
+                        on_disk=params.on_disk, hnsw_config=params.hnsw_config
+                    )
+                },
+                quantization_config=params.quantization_config
+                or models.Disabled.DISABLED,
+            )
+        return applied
+
+    @classmethod
+    def video_nodes(
+        cls, video_id: str, modality: str = "text", with_vectors: bool = False
+    ) -> list[BaseNode]:
+        # Every transcript ("text") or frame ("image") node of a video, rebuilt
+        # from the Qdrant payloads, optionally with its stored embedding
+        store = cls.get_video_vector_stores(video_id)[modality != "text"]
+        if not cls.qdrant.collection_exists(store.collection_name):
+            return []
+        scroll_filter = None
+        if settings.QDRANT_LAYOUT == "shared":
+            scroll_filter = models.Filter(
+                must=[
+                    models.FieldCondition(
+                        key="video_id", match=models.MatchValue(value=video_id)
+                    )
+                ]
+            )
+        nodes, offset = [], None
+        while True:
+            points, offset = cls.qdrant.scroll(
+                store.collection_name,
+                scroll_filter=scroll_filter,
+                limit=1024,
+                offset=offset,
+                with_payload=True,
+                with_vectors=with_vectors,
+            )
+            for point in points:
+                node = metadata_dict_to_node(point.payload)
+                if with_vectors:
+                    vector = point.vector
+                    # llama_index stores a named dense vector
+                    if isinstance(vector, dict):
+                        vector = next(iter(vector.values()))
+                    node.embedding = vector
+                nodes.append(node)
+            if offset is None:
+                return nodes
+
+    @classmethod
+    def video_filters(cls, video_id: str) -> MetadataFilters | None:
+        if settings.QDRANT_LAYOUT == "shared":
+            return MetadataFilters(
+                filters=[MetadataFilter(key="video_id", value=video_id)]
+            )
+        return None
+
+    @classmethod
+    def delete_video_vectors(cls, video_id: str):
+        # Re-ingest replaces a video's points instead of appending duplicates
+        if settings.QDRANT_LAYOUT == "shared":
+            cls._delete_video_points(video_id)
+            return
+
+        for collection in (f"text_{video_id}", f"img_{video_id}"):
+            if cls.qdrant.collection_exists(collection):
+                cls.qdrant.delete_collection(collection)
+
+    @classmethod
+    def prune_video_vectors(cls, video_id: str, keep: list[str]):
+        # Switches a video over to a re-ingest built alongside its old index:
+        # every point of the video but the new ones (`keep`) goes
+        cls._delete_video_points(
+            video_id, must_not=[models.HasIdCondition(has_id=keep)]
+        )
+
+    @classmethod
+    def delete_video_points(cls, video_id: str, ids: list[str]):
+        # Rolls back a re-ingest built alongside the old index
+        cls._delete_video_points(video_id, must=[models.HasIdCondition(has_id=ids)])
+
+    @classmethod
+    def _delete_video_points(cls, video_id: str, must=(), must_not=()):
+        must = list(must)
+        if settings.QDRANT_LAYOUT == "shared":
+            collections = (
+                settings.QDRANT_TEXT_COLLECTION,
+                settings.QDRANT_IMAGE_COLLECTION,
+            )
+            must.append(
+                models.FieldCondition(
+                    key="video_id", match=models.MatchValue(value=video_id)
+                )
+            )
+        else:
+            collections = (f"text_{video_id}", f"img_{video_id}")
+        selector = models.FilterSelector(
+            filter=models.Filter(must=must, must_not=list(must_not))
+        )
+        for collection in collections:
+            if cls.qdrant.collection_exists(collection):
+                cls.qdrant.delete(collection, points_selector=selector)
+
+    @classmethod
+    def get_video_version(cls, video_id: str) -> int:
+        return int(cls.redis.get(f"video:{video_id}:version") or 0)
+
+    @classmethod
+    def bump_video_version(cls, video_id: str) -> int:
+        # Bumped after every (re-)ingest so in-process caches can invalidate
+        return cls.redis.incr(f"video:{video_id}:version")
+
+    @classmethod
+    def get_video_status(cls, video_id: str) -> dict:
+        # state: missing | partial (prefix up to indexed_until is queryable)
+        # | indexed | failed (a first ingest failed part way through)
+        pipe = cls.redis.pipeline(transaction=False)
+        pipe.hgetall(f"video:{video_id}:status")
+        pipe.get(f"video:{video_id}:version")
+        pipe.hexists(cls._index_struct_key(video_id), video_id)
+        return cls._video_status(video_id, *pipe.execute())
+
+    @classmethod
+    async def aget_video_status(cls, video_id: str) -> dict:
+        async with cls.aredis.pipeline(transaction=False) as pipe:
+            pipe.hgetall(f"video:{video_id}:status")
+            pipe.get(f"video:{video_id}:version")
+            pipe.hexists(cls._index_struct_key(video_id), video_id)
+            return cls._video_status(video_id, *await pipe.execute())
+
+    @staticmethod
+    def _index_struct_key(video_id: str) -> str:
+        # Hash holding the video's index struct: RedisIndexStore namespace
+        # index_{video_id}, whose collection it suffixes with "/index"
+        return f"index_{video_id}/index"
+
+    @staticmethod
+    def _video_status(
+        video_id: str, status: dict, version: str | None, has_index: bool
+    ) -> dict:
+        version = int(version or 0)
+        if not status and (version or has_index):
+            # Ingested before statuses (or versions) existed
+            status = {"state": "indexed"}
+        return {
+            "video_id": video_id,
+            "state": status.get("state", "missing"),
+            "indexed_until": float(status.get("indexed_until", 0)),
+            "duration": float(status["duration"]) if "duration" in status else None,
+            "version": version,
+        }
+
+    @classmethod
+    def set_video_status(cls, video_id: str, **fields):
+        cls.redis.hset(
+            f"video:{video_id}:status",
+            mapping={
+                k: str(v) for k, v in {**fields, "updated_at": time.time()}.items()
+            },
+        )
+
+    @classmethod
+    def set_video_chapters(cls, video_id: str, chapters: list[dict]):
+        cls.redis.set(f"video:{video_id}:chapters", json.dumps(chapters))
+
+    @classmethod
+    def get_video_chapters(cls, video_id: str) -> list[dict]:
+        return json.loads(cls.redis.get(f"video:{video_id}:chapters") or "[]")
+
+    @classmethod
+    def get_redis_index_store(cls, namespace: str):
+        return RedisIndexStore(cls.index_kvstore, namespace=namespace)
@@ -0,0 +1,101 @@
+from config.settings import settings
+from qdrant_client import models
+
+DIMS = {"text": 384, "image": 512}
+
+PROFILES = ("float32", "on_disk", "scalar", "product")
+
+
+class VectorProfile:
+    # How one modality's vectors are stored and searched in Qdrant:
+    #   float32  full vectors in RAM (Qdrant's default)
+    #   on_disk  full vectors memory-mapped from disk, RAM is page cache only
+    #   scalar   int8 copies in RAM (4x smaller), float32 originals on disk;
+    #            searches oversample on the int8 copies, then rescore
+    #   product  product-quantized codes in RAM (pq_compression, e.g. 16x
+    #            smaller), originals on disk, oversampled and rescored
+    # hnsw: "m" / "ef_construct" (graph, at collection creation) and "ef"
+    # (search beam); missing keys use Qdrant's defaults. Collection settings
+    # only apply to new collections, search settings to every query.
+    def __init__(
+        self,
+        name: str = "float32",
+        dim: int = 384,
+        hnsw: dict | None = None,
+        oversampling: float = settings.QDRANT_OVERSAMPLING,
+        pq_compression: str = settings.QDRANT_PQ_COMPRESSION,
+    ):
+        if name not in PROFILES:
+            raise ValueError(f"Unknown vector profile {name!r}, expected {PROFILES}")
+        self.name = name
+        self.dim = dim
+        self.hnsw = dict(hnsw or {})
+        self.oversampling = oversampling
+        self.pq_compression = pq_compression
+
+    @classmethod
+    def for_modality(cls, modality: str) -> "VectorProfile":
+        if modality == "text":
+            name, hnsw = settings.QDRANT_TEXT_PROFILE, settings.QDRANT_TEXT_HNSW
+        else:
+            name, hnsw = settings.QDRANT_IMAGE_PROFILE, settings.QDRANT_IMAGE_HNSW
+        return cls(name, DIMS[modality], hnsw)
+
+    @property
+    def quantized(self) -> bool:
+        return self.name in ("scalar", "product")
+
+    def vector_params(self) -> models.VectorParams:
+        # The collection's dense vector config (QdrantVectorStore dense_config)
+        hnsw = {k: self.hnsw[k] for k in ("m", "ef_construct") if k in self.hnsw}
+        return models.VectorParams(
+            size=self.dim,
+            distance=models.Distance.COSINE,
+            on_disk=self.name != "float32",
+            hnsw_config=models.HnswConfigDiff(**hnsw) if hnsw else None,
+            quantization_config=self.quantization(),
+        )
+
+    def quantization(self) -> models.QuantizationConfig | None:
+        if self.name == "scalar":
+            return models.ScalarQuantization(
+                scalar=models.ScalarQuantizationConfig(
+                    type=models.ScalarType.INT8, quantile=0.99, always_ram=True
+                )
+            )
+        if self.name == "product":
+            return models.ProductQuantization(
+                product=models.ProductQuantizationConfig(
+                    compression=models.CompressionRatio(self.pq_compression),
+                    always_ram=True,
+                )
+            )
+        return None
+
+    def search_params(self) -> models.SearchParams | None:
+        quantization = None
+        if self.quantized:
+            quantization = models.QuantizationSearchParams(
+                rescore=True, oversampling=self.oversampling
+            )
+        if quantization is None and "ef" not in self.hnsw:
+            return None
+        return models.SearchParams(
+            hnsw_ef=self.hnsw.get("ef"), quantization=quantization
+        )
+
+    def footprint(self, count: int) -> dict[str, int]:
+        # Approximate bytes for `count` vectors: RAM (vectors Qdrant keeps
+        # resident plus the HNSW level-0 links) and disk (vectors on disk)
+        full = count * self.dim * 4
+        links = count * self.hnsw.get("m", 16) * 2 * 4
+        ram = {
+            "float32": full,
+            "on_disk": 0,
+            "scalar": count * self.dim,
+            "product": full // int(self.pq_compression.lstrip("x")),
+        }[self.name]
+        return {"ram": ram + links, "disk": 0 if self.name == "float32" else full}
+
+    def __repr__(self) -> str:
+        return f"VectorProfile({self.name!r}, dim={self.dim}, hnsw={self.hnsw})"
@@ -1,12 +1,66 @@
-import os
+import hashlib
+import io
+import logging
+import re
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
+from urllib.parse import parse_qs, urlparse
 
-import whisper
+import numpy as np
 import yt_dlp
 from moviepy import VideoFileClip
+from PIL import Image
+from utils.telemetry import log_event
+from utils.transcribe import iter_whisper_segments, load_s2t_model
 from youtube_transcript_api import YouTubeTranscriptApi
 
-s2t_model = whisper.load_model("base")
+VIDEO_ID = re.compile(r"[A-Za-z0-9_-]+")
+YOUTUBE_HOSTS = ("youtube.com", "youtube-nocookie.com")
+
+
+def parse_video_id(url: str) -> str:
+    # The video id of watch?v=, youtu.be/, /shorts/, /embed/, /live/ and /v/
+    # URLs on any YouTube host (extra query parameters ignored), or a bare
+    # 11-character id. ValueError for anything else, e.g. playlists/channels.
+    url = url.strip()
+    if len(url) == 11 and VIDEO_ID.fullmatch(url):
+        return url
+    parsed = urlparse(url if "//" in url else f"https://{url}")
+    host = (parsed.hostname or "").lower()
+    parts = [p for p in parsed.path.split("/") if p]
+    candidate = ""
+    if host == "youtu.be" and parts:
+        candidate = parts[0]
+    elif any(host == h or host.endswith(f".{h}") for h in YOUTUBE_HOSTS):
+        if parts == ["watch"]:
+            candidate = parse_qs(parsed.query).get("v", [""])[0]
+        elif len(parts) >= 2 and parts[0] in ("shorts", "embed", "live", "v"):
+            candidate = parts[1]
+    if not VIDEO_ID.fullmatch(candidate):
+        raise ValueError(f"Not a YouTube video URL: {url}")
+    return candidate
+
+
+def list_playlist(url: str, limit: int | None = None) -> list[str]:
+    # Video ids of a playlist or channel URL without downloading anything
+    # (flat extraction: one page fetch per ~100 entries). A channel's root
+    # page lists its tabs (videos, shorts, live), which are expanded in turn.
+    opts = {"extract_flat": "in_playlist", "quiet": True, "skip_download": True}
+    if limit:
+        opts["playlistend"] = limit
+    with yt_dlp.YoutubeDL(opts) as ydl:
+        info = ydl.extract_info(url, download=False)
+    ids = []
+    for entry in info.get("entries") or []:
+        if entry.get("ie_key") == "YoutubeTab" or entry.get("_type") == "playlist":
+            ids += list_playlist(entry["url"], limit and limit - len(ids))
+        elif entry.get("id"):
+            ids.append(entry["id"])
+        if limit and len(ids) >= limit:
+            break
+    return ids[:limit] if limit else ids
 
 
 def download_video(url, out_dir="video_data"):
@@ -19,59 +73,214 @@ def download_video(url, out_dir="video_data"):
     with yt_dlp.YoutubeDL(ydl_opts) as ydl:
         info = ydl.extract_info(url, download=True)
         video_path = ydl.prepare_filename(info)
-    return video_path, info["id"]
+    # chapters: [{"start_time", "end_time", "title"}, ...], often empty
+    chapters = [
+        {k: c.get(k) for k in ("start_time", "end_time", "title")}
+        for c in info.get("chapters") or []
+    ]
+    return video_path, info["id"], chapters
 
 
-def extract_frames(video_path, out_dir="frames", fps=0.2):
-    os.makedirs(out_dir, exist_ok=True)
-    clip = VideoFileClip(video_path)
-    duration = clip.duration
-    clip.write_images_sequence(
-        os.path.join(out_dir, "frame%04d.png"), fps=fps, logger=None
-    )
-    clip.close()
-    return duration, out_dir
+def extract_frames(video_path, fps=0.2, sampler="fixed", **scene):
+    # Returns (duration, [(frame, timestamp), ...], stats)
+    stats = {}
+    frames = list(iter_frames(video_path, fps, sampler, stats=stats, **scene))
+    return stats["duration"], frames, stats
+
+
+def iter_frames(
+    video_path,
+    fps=0.2,
+    sampler="fixed",
+    stats=None,
+    sample_fps=1.0,
+    threshold=0.15,
+    min_interval=2.0,
+    max_interval=30.0,
+    thumb_size=64,
+    times=None,
+):
+    # Yields (frame, timestamp) as each frame is decoded, frame being an RGB
+    # uint8 array, so callers can encode/upload/embed while decoding
+    # continues; nothing touches the disk. "fixed" keeps one frame every
+    # 1 / fps seconds. "scene" samples at sample_fps, scores each frame
+    # against the last kept one on a small grayscale thumbnail and keeps only
+    # scene changes: never within min_interval seconds of the previous frame,
+    # always after max_interval seconds. `times` replays an earlier run's
+    # choice, decoding just those timestamps. Counts are written into `stats`.
+    stats = {} if stats is None else stats
+    clip = VideoFileClip(video_path, audio=False)
+    stats["duration"] = clip.duration
+    sampled, kept = 0, 0
+    last_thumb, last_t = None, None
+    try:
+        if times is not None:
+            for t in times:
+                kept += 1
+                yield clip.get_frame(t).astype(np.uint8, copy=False), float(t)
+            return
+
+        rate = sample_fps if sampler == "scene" else fps
+        for t, frame in clip.iter_frames(fps=rate, with_times=True, dtype="uint8"):
+            sampled += 1
+            if sampler == "scene":
+                thumb = _thumbnail(frame, thumb_size)
+                if last_thumb is not None:
+                    elapsed = t - last_t
+                    if elapsed < min_interval:
+                        continue
+                    if (
+                        elapsed < max_interval
+                        and frame_change_score(last_thumb, thumb) < threshold
+                    ):
+                        continue
+                last_thumb, last_t = thumb, t
+            kept += 1
+            yield frame, float(t)
+    finally:
+        clip.close()
+        if times is None:
+            stats.update(sampled=sampled, kept=kept, dropped=sampled - kept)
+
+
+FRAME_FORMATS = {"jpeg": ("jpg", "image/jpeg"), "webp": ("webp", "image/webp")}
+
+
+def encode_frame(frame: np.ndarray, fmt: str = "jpeg", quality: int = 85) -> bytes:
+    # Stored frames are only looked at by people and the LLM; lossy encoding
+    # is a fraction of a PNG's size and CLIP embeds the decoded array anyway
+    buffer = io.BytesIO()
+    Image.fromarray(frame).save(buffer, format=fmt.upper(), quality=quality)
+    return buffer.getvalue()
+
+
+def load_query_image(data: bytes, max_side: int) -> Image.Image:
+    # Decodes an uploaded image in memory, shrunk so its longest side is at
+    # most max_side. draft() lets JPEGs decode directly at a reduced scale.
+    try:
+        image = Image.open(io.BytesIO(data))
+        image.draft("RGB", (max_side, max_side))
+        image = image.convert("RGB")
+    except (OSError, Image.DecompressionBombError) as e:
+        raise ValueError(f"Unreadable image: {e}") from e
+    image.thumbnail((max_side, max_side))
+    return image
+
+
+def _thumbnail(frame: np.ndarray, size: int) -> np.ndarray:
+    # Strided downscale + luma conversion; cheap enough to run on every sample
+    h, w = frame.shape[:2]
+    small = frame[:: max(1, h // size), :: max(1, w // size), :3]
+    return small.astype(np.float32) @ np.array([0.299, 0.587, 0.114], np.float32)
+
+
+def frame_change_score(prev: np.ndarray, cur: np.ndarray) -> float:
+    # Max of histogram total-variation distance (catches cuts and colour
+    # changes) and mean absolute pixel difference (catches layout changes,
+    # e.g. new text on a slide), both in [0, 1].
+    bins = np.linspace(0, 256, 33)
+    h_prev = np.histogram(prev, bins=bins)[0] / prev.size
+    h_cur = np.histogram(cur, bins=bins)[0] / cur.size
+    hist_diff = 0.5 * np.abs(h_prev - h_cur).sum()
+    pixel_diff = np.abs(prev - cur).mean() / 255.0
+    return float(max(hist_diff, pixel_diff))
 
 
 def get_transcript(
     video_id,
     local_video_path: str = None,
     fallback_to_whisper: bool = True,
+    load_s2t=load_s2t_model,
+    **whisper_opts,
+):
+    return list(
+        iter_transcript(
+            video_id,
+            local_video_path=local_video_path,
+            fallback_to_whisper=fallback_to_whisper,
+            load_s2t=load_s2t,
+            **whisper_opts,
+        )
+    )
+
+
+def iter_transcript(
+    video_id,
+    local_video_path: str = None,
+    fallback_to_whisper: bool = True,
+    load_s2t=load_s2t_model,
+    **whisper_opts,
 ):
+    # Yields segments in order; with the Whisper fallback they arrive chunk by
+    # chunk, so callers can embed early segments while later ones transcribe
     try:
         ytt_api = YouTubeTranscriptApi()
         transcript = ytt_api.fetch(video_id, languages=["en"])
         transcript = transcript.to_raw_data()
-        return [
+        yield from (
             {
                 "start": s["start"],
                 "end": s["start"] + s.get("duration", 0),
                 "text": s["text"].strip(),
             }
             for s in transcript
-        ]
+        )
+        return
     except Exception as e:
-        print(f"[WARN] YouTube transcript failed ({e}).", end=" ")
         if not fallback_to_whisper:
-            print("Whisper fallback disabled → returning empty.")
-            return []
+            log_event(
+                "YouTube transcript failed; Whisper fallback disabled",
+                logging.WARNING,
+                video_id=video_id,
+                error=str(e),
+            )
+            return
+        log_event(
+            "YouTube transcript failed",
+            logging.WARNING,
+            video_id=video_id,
+            error=str(e),
+        )
 
     if not local_video_path or not Path(local_video_path).exists():
-        print("No local video → cannot run Whisper.")
-        return []
-
-    # Transcribe – returns timestamps automatically
-    result = s2t_model.transcribe(
-        local_video_path,
-        fp16=False,
-        verbose=True,
+        log_event(
+            "No local video, cannot run Whisper", logging.WARNING, video_id=video_id
+        )
+        return
+
+    yield from iter_whisper_segments(
+        local_video_path, load_s2t=load_s2t, **whisper_opts
     )
 
-    segments = [
-        {"start": s["start"], "end": s["end"], "text": s["text"].strip()}
-        for s in result.get("segments", [])
-    ]
-    return segments
+
+class StageTimer:
+    # Wall-clock span per stage: first start → last end across all threads
+    def __init__(self):
+        self._spans: dict[str, tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def track(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            with self._lock:
+                s, e = self._spans.get(stage, (start, end))
+                self._spans[stage] = (min(s, start), max(e, end))
+
+    def timings(self) -> dict[str, float]:
+        with self._lock:
+            return {stage: round(e - s, 3) for stage, (s, e) in self._spans.items()}
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
 
 
 def ts(sec):
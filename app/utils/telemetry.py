@@ -0,0 +1,175 @@
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import time
+from contextlib import contextmanager
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+
+# Set per HTTP request (middleware) or ingest job (job id); every log line
+# emitted while it is set carries it, so Loki can stitch a request together
+request_id: contextvars.ContextVar[str | None] = contextvars.ContextVar(
+    "request_id", default=None
+)
+
+log = logging.getLogger("askyoutube")
+
+# Ingest stages run for minutes, storage calls for milliseconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900)
+
+STAGE_SECONDS = Histogram(
+    "askyt_stage_seconds",
+    "Wall-clock seconds per pipeline stage",
+    ["pipeline", "stage"],
+    buckets=BUCKETS,
+)
+STORAGE_SECONDS = Histogram(
+    "askyt_storage_seconds",
+    "Seconds per StorageManager call",
+    ["call"],
+    buckets=BUCKETS,
+)
+STORAGE_ERRORS = Counter(
+    "askyt_storage_errors_total", "StorageManager calls that raised", ["call"]
+)
+CONTEXT_TOKENS = Counter(
+    "askyt_context_tokens_total",
+    "Retrieved transcript tokens packed into prompts or dropped for budget",
+    ["kind"],
+)
+HTTP_SECONDS = Histogram(
+    "askyt_http_request_seconds",
+    "Seconds until the response starts, per route",
+    ["method", "route", "status"],
+    buckets=BUCKETS,
+)
+
+POOL_IN_USE = Gauge(
+    "askyt_pool_connections_in_use",
+    "Storage connections checked out, per pool (read at scrape time)",
+    ["pool"],
+)
+POOL_MAX = Gauge(
+    "askyt_pool_connections_max", "Storage connection pool size limit", ["pool"]
+)
+
+METRICS_CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+
+class JsonFormatter(logging.Formatter):
+    # One JSON object per line; structured fields go in `extra={"fields": ...}`
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "request_id": request_id.get(),
+            **getattr(record, "fields", {}),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def setup_logging(level: str = "INFO", json_logs: bool = True):
+    handler = logging.StreamHandler()
+    if json_logs:
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("[%(levelname)s] %(message)s"))
+    log.handlers[:] = [handler]
+    log.setLevel(level)
+    log.propagate = False
+
+
+def log_event(msg: str, level: int = logging.INFO, **fields):
+    if log.isEnabledFor(level):
+        log.log(level, msg, extra={"fields": fields})
+
+
+def record_stages(pipeline: str, timings: dict[str, float], **fields):
+    # Feeds a StageTimer report into the stage histogram and logs it as one
+    # structured line, e.g. {"msg": "chat", "timings": {...}, "video_id": ...}
+    for stage, seconds in timings.items():
+        STAGE_SECONDS.labels(pipeline, stage).observe(seconds)
+    log_event(pipeline, timings=timings, **fields)
+
+
+def record_packing(stats: dict):
+    CONTEXT_TOKENS.labels("packed").inc(stats["packed_tokens"])
+    CONTEXT_TOKENS.labels("dropped").inc(stats["dropped_tokens"])
+
+
+def watch_pool(name: str, size: int, in_use):
+    # in_use: zero-argument callable, evaluated on every /metrics scrape
+    POOL_MAX.labels(name).set(size)
+    POOL_IN_USE.labels(name).set_function(in_use)
+
+
+@contextmanager
+def bind_request_id(value: str):
+    token = request_id.set(value)
+    try:
+        yield
+    finally:
+        request_id.reset(token)
+
+
+def instrument(cls, histogram: Histogram = STORAGE_SECONDS, errors=STORAGE_ERRORS):
+    # Wraps every public class/static method so each call is timed under
+    # its name. Label children are bound once here to keep the per-call cost
+    # to two perf_counter reads and a histogram observe.
+    for name, attr in list(vars(cls).items()):
+        if name.startswith("_") or not isinstance(attr, (classmethod, staticmethod)):
+            continue
+        setattr(
+            cls,
+            name,
+            type(attr)(
+                _timed(attr.__func__, histogram.labels(name), errors.labels(name))
+            ),
+        )
+    return cls
+
+
+def _timed(fn, observed, failed):
+    if inspect.iscoroutinefunction(fn):
+
+        @functools.wraps(fn)
+        async def awrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            except Exception:
+                failed.inc()
+                raise
+            finally:
+                observed.observe(time.perf_counter() - start)
+
+        return awrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        except Exception:
+            failed.inc()
+            raise
+        finally:
+            observed.observe(time.perf_counter() - start)
+
+    return wrapper
+
+
+def metrics() -> bytes:
+    return generate_latest()
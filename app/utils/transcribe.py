@@ -0,0 +1,154 @@
+# Whisper transcription in silence-split chunks. Kept apart from helpers.py
+# so spawned transcription workers import only numpy, not the video stack.
+import multiprocessing
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+
+def load_s2t_model(name: str = "base"):
+    # Imported here so processes that never transcribe don't pay for torch
+    import whisper
+
+    return whisper.load_model(name)
+
+
+SAMPLE_RATE = 16000  # Whisper's input rate
+
+
+def load_audio(path: str, sr: int = SAMPLE_RATE) -> np.ndarray:
+    # Decode the audio track once to mono float32 PCM (same as whisper.load_audio)
+    import imageio_ffmpeg
+
+    cmd = [
+        imageio_ffmpeg.get_ffmpeg_exe(),
+        "-nostdin",
+        "-i",
+        path,
+        "-f",
+        "s16le",
+        "-ac",
+        "1",
+        "-acodec",
+        "pcm_s16le",
+        "-ar",
+        str(sr),
+        "-",
+    ]
+    out = subprocess.run(cmd, capture_output=True, check=True).stdout
+    return np.frombuffer(out, np.int16).astype(np.float32) / 32768.0
+
+
+def split_on_silence(
+    audio: np.ndarray,
+    sr: int = SAMPLE_RATE,
+    chunk_seconds: float = 60.0,
+    search_seconds: float = 5.0,
+    frame_seconds: float = 0.03,
+) -> list[tuple[int, int]]:
+    # Cut roughly every chunk_seconds, at the quietest 30 ms frame within
+    # ±search_seconds of the target, so words are rarely split in half.
+    # Returns (start, end) sample ranges covering the whole signal.
+    hop = max(1, int(sr * frame_seconds))
+    frames = len(audio) // hop
+    energy = np.sqrt(np.mean(audio[: frames * hop].reshape(frames, hop) ** 2, axis=1))
+    step = int(chunk_seconds * sr) // hop
+    search = min(int(search_seconds * sr) // hop, step // 2)
+
+    cuts, pos = [], 0
+    while pos + step + search < frames:
+        lo = pos + step - search
+        pos = lo + int(np.argmin(energy[lo : pos + step + search]))
+        cuts.append(pos * hop)
+    edges = [0, *cuts, len(audio)]
+    return list(zip(edges[:-1], edges[1:]))
+
+
+_worker_s2t = None
+
+
+def _init_s2t_worker(model_name: str, threads: int):
+    # Process-pool initializer: one Whisper model per worker, and torch
+    # limited to its share of the cores so workers don't oversubscribe
+    global _worker_s2t
+    import torch
+
+    torch.set_num_threads(threads)
+    _worker_s2t = load_s2t_model(model_name)
+
+
+def _transcribe_chunk(audio: np.ndarray, offset: float, model=None) -> list[dict]:
+    result = (model or _worker_s2t).transcribe(audio, fp16=False, verbose=None)
+    return [
+        {
+            "start": round(s["start"] + offset, 3),
+            "end": round(s["end"] + offset, 3),
+            "text": s["text"].strip(),
+        }
+        for s in result.get("segments", [])
+        if s["text"].strip()
+    ]
+
+
+def _worker_ready() -> bool:
+    return _worker_s2t is not None
+
+
+class WhisperPool:
+    # Long-lived Whisper process pool shared by every ingest in the process
+    # (ModelRegistry.whisper_pool): each worker loads the model once, in its
+    # initializer, and then transcribes chunks from any video.
+    def __init__(self, model_name: str, workers: int, threads: int = 1):
+        self.workers = workers
+        # spawn: forking a process that already runs torch/uvicorn threads
+        # is unsafe
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_s2t_worker,
+            initargs=(model_name, threads),
+        )
+
+    def submit(self, audio: np.ndarray, offset: float):
+        return self.executor.submit(_transcribe_chunk, audio, offset)
+
+    def warm(self):
+        # Starts every worker and waits for its model to load
+        futures = [self.executor.submit(_worker_ready) for _ in range(self.workers)]
+        for future in futures:
+            future.result()
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_whisper_segments(
+    path: str,
+    chunk_seconds: float = 60.0,
+    load_pool=lambda: None,
+    load_s2t=load_s2t_model,
+):
+    # Transcribes silence-split chunks on the WhisperPool from load_pool and
+    # yields their segments in order as chunks finish. Without a pool they
+    # run in-process on the model from load_s2t.
+    audio = load_audio(path)
+    chunks = split_on_silence(audio, chunk_seconds=chunk_seconds)
+
+    pool = load_pool()
+    if pool is None:
+        model = load_s2t()
+        for start, end in chunks:
+            yield from _transcribe_chunk(audio[start:end], start / SAMPLE_RATE, model)
+        return
+
+    futures = [
+        pool.submit(audio[start:end], start / SAMPLE_RATE) for start, end in chunks
+    ]
+    try:
+        for future in futures:
+            yield from future.result()
+    finally:
+        # An abandoned transcription (failed ingest) frees the shared pool
+        for future in futures:
+            future.cancel()
@@ -0,0 +1,30 @@
+# scripts/apply_vector_profiles.py
+# Moves existing text/image collections to the configured vector profiles
+# (QDRANT_{TEXT,IMAGE}_PROFILE / _HNSW) in place: on-disk originals, HNSW
+# graph settings and quantization are updated and Qdrant rebuilds them in
+# the background. Collections created after a profile change already get
+# it, so this is only needed once per change for the existing library.
+#
+#   python scripts/apply_vector_profiles.py [--dry-run]
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "app"))
+
+from src.storage import StorageManager  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    applied = StorageManager.apply_vector_profiles(dry_run=args.dry_run)
+    for collection, profile in sorted(applied.items()):
+        print(f"{collection} → {profile}")
+    print(f"{len(applied)} collections{' (dry run)' if args.dry_run else ''}")
+
+
+if __name__ == "__main__":
+    main()
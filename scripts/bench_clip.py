@@ -0,0 +1,176 @@
+# scripts/bench_clip.py
+# CLIP frame embedding throughput on CPU: the per-image PIL preprocess path
+# ingest used before FrameEmbedder, against FrameEmbedder's vectorised
+# preprocess on torch, ONNX Runtime and ONNX Runtime int8, across batch sizes
+# and intra-op thread counts. Reports frames/s and frames/s per core, plus
+# cosine similarity to the torch fp32 vectors so the int8 accuracy cost is
+# visible next to its speed-up. Frames are synthetic 720p "slides".
+#
+#   python scripts/bench_clip.py --frames 256 --threads 1,4 --batch 1,16,64
+#   python scripts/bench_clip.py --backends torch,onnx_int8 --out clip.json
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "app"))
+
+from bench_pipeline import ROOT, git_revision, peak_rss_mb  # noqa: E402
+
+
+def synth_frames(count: int, width: int, height: int, seed: int = 0) -> list:
+    # Coloured background, a few text-like bars and mild noise per frame
+    rng = np.random.default_rng(seed)
+    frames = []
+    for _ in range(count):
+        frame = np.empty((height, width, 3), dtype=np.uint8)
+        frame[:] = rng.integers(0, 256, 3, dtype=np.uint8)
+        for _ in range(rng.integers(3, 9)):
+            y, x = rng.integers(0, height - 40), rng.integers(0, width // 2)
+            frame[y : y + 24, x : x + rng.integers(80, width // 2)] = rng.integers(
+                0, 256, 3, dtype=np.uint8
+            )
+        noise = rng.integers(0, 8, frame.shape, dtype=np.uint8)
+        frames.append(frame + noise)
+    return frames
+
+
+def pil_baseline(clip, frames: list, batch_size: int) -> np.ndarray:
+    # The previous path: CLIP's torchvision transform on one PIL image at a
+    # time, then a batched forward pass
+    import torch
+    from PIL import Image
+
+    vectors = []
+    with torch.inference_mode():
+        for i in range(0, len(frames), batch_size):
+            pixels = torch.stack(
+                [
+                    clip._preprocess(Image.fromarray(f))
+                    for f in frames[i : i + batch_size]
+                ]
+            )
+            vectors.append(clip._model.encode_image(pixels).float().numpy())
+    return np.concatenate(vectors)
+
+
+def timed(fn, frames: list) -> tuple[float, np.ndarray]:
+    fn(frames[: min(len(frames), 8)])  # warm-up: allocator, ORT graph, caches
+    start = time.perf_counter()
+    vectors = np.asarray(fn(frames), dtype=np.float32)
+    return time.perf_counter() - start, vectors
+
+
+def cosine(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return (a * b).sum(axis=1)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=256)
+    parser.add_argument("--size", default="1280x720", help="frame WIDTHxHEIGHT")
+    parser.add_argument("--model", default="ViT-B/32")
+    parser.add_argument("--batch", default="1,16,64", help="comma-separated")
+    parser.add_argument(
+        "--threads",
+        default=f"1,{os.cpu_count()}",
+        help="comma-separated intra-op thread counts",
+    )
+    parser.add_argument("--backends", default="torch,onnx,onnx_int8")
+    parser.add_argument("--onnx-dir", default=str(ROOT / "onnx_cache"))
+    parser.add_argument("--out", help="results JSON (default bench-results/)")
+    args = parser.parse_args()
+
+    import torch
+    from llama_index.embeddings.clip import ClipEmbedding
+    from src.models import FrameEmbedder
+
+    width, height = map(int, args.size.lower().split("x"))
+    frames = synth_frames(args.frames, width, height)
+    batches = [int(b) for b in args.batch.split(",")]
+    threads = sorted({int(t) for t in args.threads.split(",")})
+    backends = args.backends.split(",")
+    try:
+        import onnxruntime  # noqa: F401
+    except ImportError:
+        if any(b != "torch" for b in backends):
+            print("onnxruntime not installed: ONNX backends skipped")
+        backends = [b for b in backends if b == "torch"]
+
+    clip = ClipEmbedding(model_name=args.model, device="cpu")
+    print(
+        f"{args.frames} frames {width}x{height}, {args.model}, "
+        f"{os.cpu_count()} cpus, torch {torch.__version__}"
+    )
+
+    results, reference = [], None
+    for n in threads:
+        torch.set_num_threads(n)
+        for batch in batches:
+            seconds, vectors = timed(lambda f: pil_baseline(clip, f, batch), frames)
+            if reference is None:
+                reference = vectors
+            results.append(("pil+torch", n, batch, seconds, vectors))
+            for backend in backends:
+                embedder = FrameEmbedder(
+                    clip._model,
+                    backend=backend,
+                    threads=n,
+                    batch_size=batch,
+                    onnx_dir=args.onnx_dir,
+                    name=args.model,
+                )
+                seconds, vectors = timed(embedder.embed, frames)
+                results.append((backend, n, batch, seconds, vectors))
+
+    rows = []
+    print("-" * 78)
+    print(
+        f"{'path':<12}{'threads':>8}{'batch':>7}{'frames/s':>11}"
+        f"{'per core':>10}{'ms/frame':>10}{'cos mean':>10}{'cos min':>10}"
+    )
+    for path, n, batch, seconds, vectors in results:
+        sim = cosine(vectors, reference)
+        row = {
+            "path": path,
+            "threads": n,
+            "batch": batch,
+            "frames_per_s": round(args.frames / seconds, 2),
+            "frames_per_s_per_core": round(args.frames / seconds / n, 2),
+            "ms_per_frame": round(seconds / args.frames * 1000, 2),
+            "cosine_mean": round(float(sim.mean()), 5),
+            "cosine_min": round(float(sim.min()), 5),
+        }
+        rows.append(row)
+        print(
+            f"{path:<12}{n:>8}{batch:>7}{row['frames_per_s']:>11.1f}"
+            f"{row['frames_per_s_per_core']:>10.1f}{row['ms_per_frame']:>10.2f}"
+            f"{row['cosine_mean']:>10.4f}{row['cosine_min']:>10.4f}"
+        )
+    print("-" * 78)
+
+    sha, dirty = git_revision()
+    out = Path(args.out or ROOT / "bench-results" / f"clip-{sha}.json")
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(
+        json.dumps(
+            {
+                "meta": {"commit": sha, "dirty": dirty, "args": vars(args)},
+                "results": rows,
+                "peak_rss_mb": round(peak_rss_mb(), 1),
+            },
+            indent=2,
+        )
+    )
+    print(f"-> {out}")
+
+
+if __name__ == "__main__":
+    main()
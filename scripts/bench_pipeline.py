@@ -0,0 +1,451 @@
+# scripts/bench_pipeline.py
+# End-to-end ingest + chat benchmark that runs fully offline: a synthetic
+# video (scene changes + tone audio) is generated locally, MinIO is the
+# in-process fake S3 server, Redis is fakeredis, Qdrant runs in :memory:, and
+# the LLM is a stub with a configurable per-token delay. Embeddings are
+# deterministic hash vectors unless --real-models loads the configured ones.
+# Results go to JSON so runs can be compared across commits:
+#
+#   python scripts/bench_pipeline.py --videos 3 --requests 200 --concurrency 8
+#   python scripts/bench_pipeline.py --compare bench-results/pipeline-abc1234.json
+import argparse
+import hashlib
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "app"))
+sys.path.insert(0, str(ROOT / "scripts"))
+
+from fake_s3 import FakeS3Server  # noqa: E402
+from llama_index.core.base.embeddings.base import Embedding  # noqa: E402
+from llama_index.core.embeddings import MultiModalEmbedding  # noqa: E402
+from llama_index.core.llms import (  # noqa: E402
+    CompletionResponse,
+    CompletionResponseGen,
+    CustomLLM,
+    LLMMetadata,
+)
+from llama_index.core.llms.callbacks import llm_completion_callback  # noqa: E402
+
+WORDS = (
+    "gradient descent attention layer token vector index frame slide chart "
+    "camera model training dataset loss kernel memory cache latency query"
+).split()
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentiles(samples: list[float]) -> dict:
+    if not samples:
+        return {}
+    ms = np.array(samples) * 1000
+    return {
+        "p50_ms": round(float(np.percentile(ms, 50)), 2),
+        "p95_ms": round(float(np.percentile(ms, 95)), 2),
+        "p99_ms": round(float(np.percentile(ms, 99)), 2),
+        "max_ms": round(float(ms.max()), 2),
+    }
+
+
+def git_revision() -> tuple[str, bool]:
+    try:
+        sha = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        dirty = bool(
+            subprocess.run(
+                ["git", "status", "--porcelain", "--untracked-files=no"],
+                cwd=ROOT,
+                capture_output=True,
+                text=True,
+            ).stdout.strip()
+        )
+        return sha, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+
+
+def synth_video(path: str, seconds: float, scene_seconds: float, size=(640, 360)):
+    # A new colour/stripe pattern every scene_seconds, so both samplers keep
+    # frames, over a tone that pauses briefly between scenes
+    from moviepy import AudioClip, VideoClip
+
+    w, h = size
+    rng = np.random.default_rng(0)
+    scenes = rng.integers(0, 255, size=(int(seconds // scene_seconds) + 1, 3))
+    ramp = np.linspace(0, 1, w, dtype=np.float32)[None, :, None]
+
+    def frame(t):
+        colour = scenes[int(t // scene_seconds)].astype(np.float32)
+        stripes = 0.5 + 0.5 * np.sin(ramp * (8 + int(t // scene_seconds)) * np.pi)
+        return np.broadcast_to(colour * stripes, (h, w, 3)).astype(np.uint8)
+
+    def tone(t):
+        t = np.asarray(t)
+        voiced = (t % scene_seconds) < scene_seconds - 0.5
+        wave = 0.3 * np.sin(2 * np.pi * 220 * t) * voiced
+        return np.stack([wave, wave], axis=-1) if t.ndim else [wave, wave]
+
+    clip = VideoClip(frame, duration=seconds)
+    clip = clip.with_audio(AudioClip(tone, duration=seconds, fps=16000))
+    clip.write_videofile(
+        path, fps=10, codec="libx264", audio_codec="aac", logger=None, threads=2
+    )
+    clip.close()
+
+
+def synth_transcript(seconds: float, segment_seconds: float = 4.0) -> list[dict]:
+    rng = random.Random(0)
+    segments, t = [], 0.0
+    while t < seconds:
+        words = rng.choices(WORDS, k=rng.randint(8, 16))
+        end = min(t + segment_seconds, seconds)
+        segments.append({"start": t, "end": end, "text": " ".join(words) + "."})
+        t = end
+    return segments
+
+
+class HashEmbedding(MultiModalEmbedding):
+    # Deterministic unit vectors seeded by content: stable across runs,
+    # spread out enough for the vector store to do real work
+    dim: int = 384
+
+    def _vector(self, key: bytes) -> Embedding:
+        seed = int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "big")
+        v = np.random.default_rng(seed).standard_normal(self.dim)
+        return (v / np.linalg.norm(v)).astype(np.float32).tolist()
+
+    def _get_text_embedding(self, text: str) -> Embedding:
+        return self._vector(text.encode())
+
+    def _get_query_embedding(self, query: str) -> Embedding:
+        return self._vector(query.encode())
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        return self._get_query_embedding(query)
+
+    def _get_image_embedding(self, img_file_path) -> Embedding:
+        if hasattr(img_file_path, "read"):
+            return self._vector(img_file_path.read())
+        return self._vector(Path(img_file_path).read_bytes())
+
+    async def _aget_image_embedding(self, img_file_path) -> Embedding:
+        return self._get_image_embedding(img_file_path)
+
+
+class StubLLM(CustomLLM):
+    # Fixed answer; token_latency per generated token and prompt_latency per
+    # prompt word, so a longer context costs time as it would on a real model
+    tokens: int = 64
+    token_latency: float = 0.0
+    prompt_latency: float = 0.0
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return LLMMetadata(model_name="stub")
+
+    @llm_completion_callback()
+    def complete(self, prompt: str, formatted: bool = False, **kwargs):
+        time.sleep(
+            len(prompt.split()) * self.prompt_latency + self.tokens * self.token_latency
+        )
+        return CompletionResponse(text=" ".join(["token"] * self.tokens))
+
+    @llm_completion_callback()
+    def stream_complete(
+        self, prompt: str, formatted: bool = False, **kwargs
+    ) -> CompletionResponseGen:
+        time.sleep(len(prompt.split()) * self.prompt_latency)
+        text = ""
+        for _ in range(self.tokens):
+            time.sleep(self.token_latency)
+            text += "token "
+            yield CompletionResponse(text=text, delta="token ")
+
+
+def use_fake_storage(redis_server=None):
+    # In-memory Qdrant, and fakeredis for Redis and the index store unless a
+    # real Redis is configured (redis_server None)
+    from qdrant_client import QdrantClient
+    from src.storage import StorageManager
+
+    if redis_server is not None:
+        import fakeredis
+        from llama_index.storage.kvstore.redis import RedisKVStore
+
+        StorageManager.redis = fakeredis.FakeRedis(
+            server=redis_server, decode_responses=True
+        )
+        StorageManager.aredis = fakeredis.FakeAsyncRedis(
+            server=redis_server, decode_responses=True
+        )
+        StorageManager.index_kvstore = RedisKVStore(
+            redis_client=fakeredis.FakeRedis(server=redis_server),
+            async_redis_client=fakeredis.FakeAsyncRedis(server=redis_server),
+        )
+    StorageManager.qdrant = QdrantClient(":memory:")
+    StorageManager.aqdrant = None
+
+
+def install_standins(args, video_path: str, redis_server):
+    # Patches the storage clients and models before any service runs
+    from src import ingest
+    from src.models import ModelRegistry
+    from utils.transcribe import iter_whisper_segments
+
+    use_fake_storage(redis_server)
+
+    def fake_download(url, out_dir="video_data"):
+        video_id = url.split("=")[-1]
+        target = Path(out_dir) / f"{video_id}.mp4"
+        target.write_bytes(Path(video_path).read_bytes())
+        return str(target), video_id, []
+
+    def fake_transcript(video_id, local_video_path=None, **whisper_opts):
+        if args.whisper:
+            return iter_whisper_segments(local_video_path, **whisper_opts)
+        return iter(synth_transcript(args.seconds))
+
+    ingest.download_video = fake_download
+    ingest.iter_transcript = fake_transcript
+
+    if args.real_models:
+        return
+    ModelRegistry._models.update(
+        text_embed=HashEmbedding(dim=384),
+        image_embed=HashEmbedding(dim=512),
+        llm=StubLLM(tokens=args.llm_tokens, token_latency=args.llm_token_ms / 1000),
+    )
+
+
+def bench_ingest(args) -> tuple[dict, list[str]]:
+    from src.ingest import IngestService
+
+    runs, video_ids = [], []
+    for i in range(args.videos):
+        video_id = f"bench{i:04d}"
+        start = time.perf_counter()
+        result = IngestService.ingest(f"https://www.youtube.com/watch?v={video_id}")
+        runs.append((time.perf_counter() - start, result))
+        video_ids.append(video_id)
+
+    reruns = []
+    if args.rerun:
+        # Same videos again: artifact cache hits skip download/transcode work
+        for video_id in video_ids:
+            start = time.perf_counter()
+            IngestService.ingest(f"https://www.youtube.com/watch?v={video_id}")
+            reruns.append(time.perf_counter() - start)
+
+    wall = sum(seconds for seconds, _ in runs)
+    stages = sorted({stage for _, r in runs for stage in r["timings"]})
+    report = {
+        "videos": args.videos,
+        "video_seconds": args.seconds,
+        "wall_s": round(wall, 3),
+        "video_seconds_per_s": round(args.videos * args.seconds / wall, 2),
+        "frames_per_s": round(sum(r["frames"] for _, r in runs) / wall, 2),
+        "stages_mean_s": {
+            stage: round(np.mean([r["timings"].get(stage, 0) for _, r in runs]), 3)
+            for stage in stages
+        },
+        "rss_mb": round(peak_rss_mb(), 1),
+        # Local disk per ingest (artifact cache) and encoded frame size
+        "disk_written_mb": round(
+            float(np.mean([r["disk"]["written"] for _, r in runs])) / 2**20, 2
+        ),
+        "disk_peak_mb": round(max(r["disk"]["peak"] for _, r in runs) / 2**20, 2),
+        "frame_kb": round(
+            sum(r["frame_bytes"] for _, r in runs)
+            / max(1, sum(r["frames"] for _, r in runs))
+            / 1024,
+            1,
+        ),
+    }
+    if reruns:
+        report["rerun_mean_s"] = round(float(np.mean(reruns)), 3)
+    return report, video_ids
+
+
+def bench_chat(args, video_ids: list[str]) -> dict:
+    from src.chat import ChatService
+
+    rng = random.Random(1)
+    questions = [
+        (
+            rng.choice(video_ids),
+            f"what does the speaker say about {rng.choice(WORDS)} "
+            f"and {rng.choice(WORDS)} ({i})?",
+        )
+        for i in range(args.requests)
+    ]
+    # Load each video's query engine once so the timings measure steady state
+    for video_id in video_ids:
+        ChatService.chat(video_id, "warm up")
+
+    def ask(question):
+        video_id, query = question
+        start = time.perf_counter()
+        try:
+            if args.stream:
+                for _ in ChatService.stream_chat(video_id, query):
+                    pass
+            else:
+                ChatService.chat(video_id, query)
+        except Exception as e:
+            return time.perf_counter() - start, repr(e)
+        return time.perf_counter() - start, None
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(ask, questions))
+    wall = time.perf_counter() - start
+
+    latencies = [seconds for seconds, error in results if error is None]
+    errors = [error for _, error in results if error is not None]
+    return {
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "stream": args.stream,
+        "wall_s": round(wall, 3),
+        "requests_per_s": round(len(latencies) / wall, 2),
+        **percentiles(latencies),
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def compare(current: dict, baseline_path: str):
+    baseline = json.loads(Path(baseline_path).read_text())
+    rows = [
+        ("ingest", "video_seconds_per_s", True),
+        ("ingest", "frames_per_s", True),
+        ("ingest", "disk_peak_mb", False),
+        ("chat", "requests_per_s", True),
+        ("chat", "p50_ms", False),
+        ("chat", "p95_ms", False),
+        ("chat", "p99_ms", False),
+        (None, "peak_rss_mb", False),
+    ]
+    print(f"vs {baseline['meta']['commit']} ({baseline_path})")
+    for section, key, higher_is_better in rows:
+        old = (baseline.get(section) or {}).get(key) if section else baseline.get(key)
+        new = (current.get(section) or {}).get(key) if section else current.get(key)
+        if not old or new is None:
+            continue
+        change = (new - old) / old * 100
+        worse = change < 0 if higher_is_better else change > 0
+        flag = "  <-- regression" if worse and abs(change) > 10 else ""
+        name = f"{section}.{key}" if section else key
+        print(f"{name:<28} {old:10.2f} -> {new:10.2f}  {change:+6.1f}%{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=120, help="video length")
+    parser.add_argument("--scene-seconds", type=float, default=8)
+    parser.add_argument("--videos", type=int, default=2)
+    parser.add_argument("--rerun", action="store_true", help="also time re-ingests")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--stream", action="store_true", help="time stream_chat")
+    parser.add_argument("--llm-tokens", type=int, default=64)
+    parser.add_argument("--llm-token-ms", type=float, default=0.0)
+    parser.add_argument("--s3-latency", type=float, default=0.0)
+    parser.add_argument("--layout", choices=["per_video", "shared"])
+    parser.add_argument("--real-models", action="store_true")
+    parser.add_argument("--whisper", action="store_true", help="transcribe audio")
+    parser.add_argument("--redis-url", help="real Redis host:port instead of fake")
+    parser.add_argument("--out", help="default: bench-results/pipeline-<commit>.json")
+    parser.add_argument("--compare", help="earlier results JSON to diff against")
+    args = parser.parse_args()
+
+    commit, dirty = git_revision()
+    tmp = tempfile.TemporaryDirectory()
+    server = FakeS3Server(latency=args.s3_latency).start()
+
+    # Settings are read at import, so the environment comes first
+    os.environ.update(
+        MINIO_ENDPOINT=server.endpoint,
+        MINIO_SECURE="false",
+        ARTIFACT_CACHE_DIR=str(Path(tmp.name) / "artifacts"),
+        ANSWER_CACHE_ENABLED="false",
+        LOG_LEVEL="WARNING",
+    )
+    if args.layout:
+        os.environ["QDRANT_LAYOUT"] = args.layout
+    redis_server = None
+    if args.redis_url:
+        host, port = args.redis_url.split(":")
+        os.environ.update(REDIS_HOST=host, REDIS_PORT=port)
+    else:
+        try:
+            import fakeredis
+        except ImportError:
+            sys.exit("fakeredis is required offline (pip install fakeredis)")
+        redis_server = fakeredis.FakeServer()
+
+    video_path = str(Path(tmp.name) / "synthetic.mp4")
+    start = time.perf_counter()
+    synth_video(video_path, args.seconds, args.scene_seconds)
+    print(f"synthetic video: {args.seconds:g}s in {time.perf_counter() - start:.1f}s")
+
+    os.chdir(tmp.name)  # ingest writes its scratch directories to the cwd
+    install_standins(args, video_path, redis_server)
+
+    ingest_report, video_ids = bench_ingest(args)
+    chat_report = bench_chat(args, video_ids)
+
+    from config.settings import settings
+
+    results = {
+        "meta": {
+            "commit": commit,
+            "dirty": dirty,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "layout": settings.QDRANT_LAYOUT,
+            "args": vars(args),
+        },
+        "ingest": ingest_report,
+        "chat": chat_report,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+    out = Path(args.out or ROOT / "bench-results" / f"pipeline-{commit}.json")
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(results, indent=2))
+
+    print("-" * 60)
+    print(json.dumps({k: results[k] for k in ("ingest", "chat")}, indent=2))
+    print(f"peak RSS {results['peak_rss_mb']} MiB -> {out}")
+    if args.compare:
+        print("-" * 60)
+        compare(results, args.compare)
+    server.shutdown()
+    tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
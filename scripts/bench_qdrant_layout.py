@@ -0,0 +1,146 @@
+# scripts/bench_qdrant_layout.py
+# Compares the per_video and shared Qdrant layouts on the local in-memory
+# client: memory growth, time to create/fill the collections, and the latency
+# of a single-video query (collection lookup vs video_id payload filter).
+# Each layout runs in its own subprocess so RSS numbers don't overlap.
+# Note: local mode ignores payload indexes, so shared-layout filters are a
+# full scan here; a Qdrant server with the tenant index will do better.
+#
+#   python scripts/bench_qdrant_layout.py --videos 200 --points 150
+import argparse
+import json
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import time
+import warnings
+
+from qdrant_client import QdrantClient, models
+
+DIMS = {"text": 384, "img": 512}
+
+
+def rss_mb() -> float:
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def vectors(n: int, dim: int) -> list[list[float]]:
+    return [[random.random() for _ in range(dim)] for _ in range(n)]
+
+
+def run_layout(layout: str, videos: int, points: int, queries: int) -> dict:
+    warnings.simplefilter("ignore")
+    random.seed(0)
+    base = rss_mb()
+    client = QdrantClient(":memory:")
+    video_ids = [f"vid{i:05d}" for i in range(videos)]
+
+    start = time.perf_counter()
+    if layout == "shared":
+        for kind, dim in DIMS.items():
+            client.create_collection(
+                f"{kind}_shared",
+                vectors_config=models.VectorParams(
+                    size=dim, distance=models.Distance.COSINE
+                ),
+            )
+            client.create_payload_index(
+                f"{kind}_shared",
+                field_name="video_id",
+                field_schema=models.KeywordIndexParams(type="keyword", is_tenant=True),
+            )
+    next_id = 0
+    for video_id in video_ids:
+        for kind, dim in DIMS.items():
+            collection = (
+                f"{kind}_shared" if layout == "shared" else f"{kind}_{video_id}"
+            )
+            if layout == "per_video":
+                client.create_collection(
+                    collection,
+                    vectors_config=models.VectorParams(
+                        size=dim, distance=models.Distance.COSINE
+                    ),
+                )
+            batch = [
+                models.PointStruct(
+                    id=next_id + i, vector=v, payload={"video_id": video_id}
+                )
+                for i, v in enumerate(vectors(points, dim))
+            ]
+            next_id += points
+            client.upsert(collection, points=batch)
+    load_seconds = time.perf_counter() - start
+
+    latencies = []
+    for _ in range(queries):
+        video_id = random.choice(video_ids)
+        query = vectors(1, DIMS["text"])[0]
+        start = time.perf_counter()
+        if layout == "shared":
+            client.query_points(
+                "text_shared",
+                query=query,
+                limit=5,
+                query_filter=models.Filter(
+                    must=[
+                        models.FieldCondition(
+                            key="video_id", match=models.MatchValue(value=video_id)
+                        )
+                    ]
+                ),
+            )
+        else:
+            client.query_points(f"text_{video_id}", query=query, limit=5)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    latencies.sort()
+    return {
+        "layout": layout,
+        "collections": len(client.get_collections().collections),
+        "load_s": round(load_seconds, 3),
+        "rss_mb": round(rss_mb() - base, 1),
+        "p50_ms": round(statistics.median(latencies), 3),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--videos", type=int, default=200)
+    parser.add_argument("--points", type=int, default=150, help="points per modality")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument(
+        "--layout", choices=["per_video", "shared"], help=argparse.SUPPRESS
+    )
+    args = parser.parse_args()
+
+    if args.layout:
+        result = run_layout(args.layout, args.videos, args.points, args.queries)
+        print(json.dumps(result))
+        return
+
+    print(f"{args.videos} videos × {args.points} points per modality")
+    print("-" * 72)
+    for layout in ("per_video", "shared"):
+        out = subprocess.run(
+            [sys.executable, __file__, "--layout", layout, *sys.argv[1:]],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        r = json.loads(out.stdout.strip().splitlines()[-1])
+        print(
+            f"{r['layout']:<10} collections={r['collections']:<6} "
+            f"load={r['load_s']:7.2f}s  rss=+{r['rss_mb']:7.1f} MB  "
+            f"p50={r['p50_ms']:7.2f} ms  p95={r['p95_ms']:7.2f} ms"
+        )
+    print("-" * 72)
+    print("local mode ignores payload indexes: shared filters scan every point")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+# scripts/bench_segments.py
+# Chat retrieval latency and recall as a video gets longer: flat hybrid
+# retrieval over every transcript node vs the coarse-to-fine segment index
+# (best SEGMENT_TOP_K windows first, then only the nodes and frames inside
+# them). Each length gets a synthetic transcript seeded with exact-term
+# "needle" facts (see eval_retrieval.py) plus a frame every --frame-every
+# seconds; storage is fakeredis + in-memory Qdrant, the LLM a stub that
+# charges per prompt word. Results land in bench-results/segments-<commit>.json
+#
+#   python scripts/bench_segments.py --hours 0.5,1,2,4 --queries 100
+#   python scripts/bench_segments.py --hours 1,8 --segment-seconds 600
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_pipeline import (  # noqa: E402
+    ROOT,
+    HashEmbedding,
+    StubLLM,
+    git_revision,
+    peak_rss_mb,
+)
+from eval_retrieval import (  # noqa: E402
+    TrigramEmbedding,
+    build_corpus,
+    end_to_end,
+    evaluate,
+    index_corpus,
+)
+
+
+def add_frames(video_id: str, seconds: float, every: float) -> int:
+    from src.chat import ChatService
+    from src.ingest import IngestService
+    from src.models import ModelRegistry
+
+    frames = [
+        (f"frames/{video_id}/frame_{i:05d}.jpg", i * every)
+        for i in range(int(seconds // every))
+    ]
+    vectors = ModelRegistry.image_embed().get_text_embedding_batch(
+        [name for name, _ in frames]
+    )
+    ChatService._load_index(video_id).insert_nodes(
+        IngestService._image_nodes(video_id, frames, vectors)
+    )
+    return len(frames)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hours", default="0.5,1,2,4", help="video lengths")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--frame-every", type=float, default=10.0, help="seconds")
+    parser.add_argument("--segment-seconds", type=float, default=300.0)
+    parser.add_argument("--segment-top-k", type=int, default=3)
+    parser.add_argument(
+        "--prompt-ms", type=float, default=0.5, help="stub LLM cost per prompt word"
+    )
+    parser.add_argument("--out", help="results JSON (default bench-results/)")
+    args = parser.parse_args()
+
+    os.environ.update(
+        LOG_LEVEL="WARNING",
+        ANSWER_CACHE_ENABLED="false",
+        RETRIEVAL_MODE="hybrid",
+        SEGMENT_MIN_DURATION="0",
+        SEGMENT_SECONDS=str(args.segment_seconds),
+        SEGMENT_TOP_K=str(args.segment_top_k),
+    )
+    try:
+        import fakeredis
+    except ImportError:
+        sys.exit("fakeredis is required offline (pip install fakeredis)")
+    from bench_pipeline import use_fake_storage
+
+    use_fake_storage(fakeredis.FakeServer())
+
+    from config.settings import settings
+    from src.chat import ChatService
+    from src.models import ModelRegistry
+
+    ModelRegistry._models.update(
+        llm=StubLLM(tokens=32, prompt_latency=args.prompt_ms / 1000),
+        text_embed=TrigramEmbedding(dim=384),
+        image_embed=HashEmbedding(dim=512),
+    )
+
+    results = []
+    for hours in [float(h) for h in args.hours.split(",")]:
+        video_id = f"long{hours:g}h".replace(".", "_")
+        transcript, cases = build_corpus(int(hours * 3600 / 5), args.queries)
+        start = time.perf_counter()
+        nodes = index_corpus(video_id, transcript)
+        frames = add_frames(video_id, transcript[-1]["end"], args.frame_every)
+        print(
+            f"{hours:g}h: {nodes} nodes, {frames} frames indexed in "
+            f"{time.perf_counter() - start:.1f}s"
+        )
+        for name, segmented in (("hybrid", False), ("segments", True)):
+            settings.SEGMENT_INDEX = segmented
+            ChatService.engines.clear()
+            start = time.perf_counter()
+            engine = ChatService.get_query_engine(video_id)
+            build = time.perf_counter() - start
+            result = evaluate(name, engine.retrieve, cases)
+            result.update(
+                hours=hours,
+                nodes=nodes,
+                frames=frames,
+                engine_build_s=round(build, 3),
+                end_to_end=end_to_end(video_id, cases),
+            )
+            if segmented:
+                result["segments"] = len(engine.retriever.segments)
+            results.append(result)
+
+    print("-" * 98)
+    print(
+        f"{'hours':>6}{'config':>10}{'segs':>6}{'build':>8}{'r@1':>7}{'r@3':>7}"
+        f"{'retr p50':>11}{'retr p95':>11}{'e2e p50':>10}{'e2e p95':>10}"
+    )
+    for r in results:
+        print(
+            f"{r['hours']:>6g}{r['config']:>10}{r.get('segments', '-'):>6}"
+            f"{r['engine_build_s']:>7.2f}s{r['recall@1']:>7.2f}{r['recall@3']:>7.2f}"
+            f"{r['retrieve']['p50_ms']:>9.1f}ms{r['retrieve']['p95_ms']:>9.1f}ms"
+            f"{r['end_to_end']['p50_ms']:>8.1f}ms{r['end_to_end']['p95_ms']:>8.1f}ms"
+        )
+    print("-" * 98)
+
+    sha, dirty = git_revision()
+    out = Path(args.out or ROOT / "bench-results" / f"segments-{sha}.json")
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(
+        json.dumps(
+            {
+                "meta": {"commit": sha, "dirty": dirty, "args": vars(args)},
+                "results": results,
+                "peak_rss_mb": round(peak_rss_mb(), 1),
+            },
+            indent=2,
+        )
+    )
+    print(f"-> {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# scripts/bench_uploads.py
+# Compares serial per-frame uploads with StorageManager.upload_many and the
+# frame pack. Runs against an in-process fake S3 server by default, or a real
+# MinIO with --endpoint host:port.
+#
+#   python scripts/bench_uploads.py --frames 300 --latency 0.02
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "app"))
+sys.path.insert(0, str(ROOT / "scripts"))
+
+from fake_s3 import FakeS3Server  # noqa: E402
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--size-kb", type=int, default=60)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--endpoint", help="real MinIO host:port instead of the fake")
+    args = parser.parse_args()
+
+    server = None
+    if args.endpoint:
+        os.environ["MINIO_ENDPOINT"] = args.endpoint
+    else:
+        server = FakeS3Server(latency=args.latency).start()
+        os.environ["MINIO_ENDPOINT"] = server.endpoint
+    os.environ["MINIO_SECURE"] = "false"
+
+    from src.storage import StorageManager
+
+    tmp = tempfile.TemporaryDirectory()
+    files = []
+    for i in range(args.frames):
+        path = Path(tmp.name) / f"frame_{i:04d}.png"
+        path.write_bytes(random.randbytes(args.size_kb * 1024))
+        files.append(str(path))
+
+    def serial(prefix):
+        for path in files:
+            StorageManager.minio.fput_object(
+                StorageManager.bucket, f"{prefix}/{Path(path).name}", path
+            )
+
+    def items(prefix):
+        return [(path, f"{prefix}/{Path(path).name}") for path in files]
+
+    results = {}
+    results["serial"], _ = timed(serial, "bench/serial")
+    results["upload_many"], stats = timed(
+        StorageManager.upload_many, items("bench/many"), max_workers=args.workers
+    )
+    results["upload_many (re-ingest)"], rerun = timed(
+        StorageManager.upload_many, items("bench/many"), max_workers=args.workers
+    )
+    results["frame_pack"], index = timed(
+        StorageManager.upload_frame_pack,
+        "bench/pack",
+        [(path, Path(path).name) for path in files],
+    )
+
+    # Byte-range reads must return the original frame
+    sample = random.choice(files)
+    packed = StorageManager.read_packed("bench/pack", Path(sample).name)
+    assert packed == Path(sample).read_bytes()
+
+    print(
+        f"{args.frames} frames × {args.size_kb} KiB, latency {args.latency * 1000:.0f} ms"
+    )
+    print("-" * 60)
+    for name, seconds in results.items():
+        print(f"{name:<26} {seconds:8.3f}s  {args.frames / seconds:8.1f} frames/s")
+    print("-" * 60)
+    print(f"upload_many: {stats}, re-ingest: {rerun}")
+    print(f"frame pack: {len(index)} members")
+    if server:
+        print(f"fake S3 requests served: {server.requests}")
+        server.shutdown()
+    tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
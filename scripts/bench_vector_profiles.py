@@ -0,0 +1,242 @@
+# scripts/bench_vector_profiles.py
+# Memory, recall@10 against exact search, and query latency for each Qdrant
+# vector profile (QDRANT_{TEXT,IMAGE}_PROFILE: float32, on_disk, scalar,
+# product) on synthetic clustered, normalised 384-d (text) and 512-d (image)
+# vectors. Collections are created with the profile's config and queried
+# with its search params, the way StorageManager does.
+# Memory is the profile's footprint estimate (resident vectors + HNSW links
+# vs vectors on disk). Local mode stores but ignores quantization and HNSW
+# (every search is exact), so without --url the quantized profiles' recall
+# is emulated in numpy: int8 (0.99 quantile) or PQ codes score the
+# candidates, limit * oversampling of them are rescored on the originals.
+# With --url the collections live on a Qdrant server and recall, latency and
+# memory are what it actually does.
+# Results land in bench-results/vector-profiles-<commit>.json
+#
+#   python scripts/bench_vector_profiles.py --points 20000 --queries 200
+#   python scripts/bench_vector_profiles.py --url http://localhost:6333 \
+#       --points 200000 --hnsw '{"m": 16, "ef": 128}' --oversampling 3
+import argparse
+import json
+import sys
+import time
+import warnings
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_pipeline import ROOT, git_revision, percentiles  # noqa: E402
+from qdrant_client import QdrantClient, models  # noqa: E402
+from src.vector_profiles import DIMS, PROFILES, VectorProfile  # noqa: E402
+
+TOP_K = 10
+BATCH = 1024
+
+
+def clustered(rng: np.random.Generator, n: int, dim: int, clusters: int) -> np.ndarray:
+    # Embedding-like: points around a few hundred topic directions
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    points = centers[rng.integers(clusters, size=n)]
+    points += 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+    return points / np.linalg.norm(points, axis=1, keepdims=True)
+
+
+def exact_top_k(vectors: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    scores = queries @ vectors.T
+    best = np.argpartition(-scores, k, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, best, axis=1), axis=1)
+    return np.take_along_axis(best, order, axis=1)
+
+
+def scalar_scores(vectors: np.ndarray, queries: np.ndarray) -> np.ndarray:
+    # int8 codes over the central 99% of values, as ScalarQuantization does
+    lo, hi = np.quantile(vectors, [0.005, 0.995])
+    codes = np.round((np.clip(vectors, lo, hi) - lo) / (hi - lo) * 255)
+    return queries @ (lo + codes * (hi - lo) / 255).T
+
+
+def product_scores(
+    rng: np.random.Generator,
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    compression: str,
+    iterations: int = 8,
+) -> np.ndarray:
+    # One byte (256 centroids) per chunk of `compression` bytes of float32,
+    # centroids by k-means on a sample; queries score against the centroids
+    sub = max(1, int(compression.lstrip("x")) // 4)
+    n, dim = vectors.shape
+    scores = np.zeros((len(queries), n), dtype=np.float32)
+    sample = vectors[rng.choice(n, size=min(n, 4096), replace=False)]
+    for start in range(0, dim, sub):
+        chunk = slice(start, start + sub)
+        train = sample[:, chunk]
+        centroids = train[rng.choice(len(train), size=256, replace=False)]
+        for _ in range(iterations):
+            nearest = _nearest(train, centroids)
+            for c in np.unique(nearest):
+                centroids[c] = train[nearest == c].mean(axis=0)
+        codes = _nearest(vectors[:, chunk], centroids)
+        scores += (queries[:, chunk] @ centroids.T)[:, codes]
+    return scores
+
+
+def _nearest(points: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    distances = (centroids**2).sum(axis=1) - 2 * points @ centroids.T
+    return distances.argmin(axis=1)
+
+
+def rescored(
+    approx: np.ndarray, vectors: np.ndarray, queries: np.ndarray, candidates: int
+) -> np.ndarray:
+    # Top `candidates` by the quantized score, re-ranked on the originals
+    best = np.argpartition(-approx, candidates, axis=1)[:, :candidates]
+    exact = np.einsum("qd,qcd->qc", queries, vectors[best])
+    order = np.argsort(-exact, axis=1)[:, :TOP_K]
+    return np.take_along_axis(best, order, axis=1)
+
+
+def recall(found: np.ndarray, truth: np.ndarray) -> float:
+    return float(np.mean([len(set(f) & set(t)) / TOP_K for f, t in zip(found, truth)]))
+
+
+def run_profile(
+    client: QdrantClient,
+    profile: VectorProfile,
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    truth: np.ndarray,
+    emulate: bool,
+    rng: np.random.Generator,
+) -> dict:
+    collection = f"bench_{profile.dim}_{profile.name}"
+    if client.collection_exists(collection):
+        client.delete_collection(collection)
+    client.create_collection(collection, vectors_config=profile.vector_params())
+
+    start = time.perf_counter()
+    for offset in range(0, len(vectors), BATCH):
+        chunk = vectors[offset : offset + BATCH]
+        client.upsert(
+            collection,
+            points=models.Batch(
+                ids=list(range(offset, offset + len(chunk))), vectors=chunk.tolist()
+            ),
+        )
+    load = time.perf_counter() - start
+
+    params = profile.search_params()
+    found, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        points = client.query_points(
+            collection, query=query.tolist(), limit=TOP_K, search_params=params
+        ).points
+        latencies.append(time.perf_counter() - start)
+        found.append([p.id for p in points])
+
+    candidates = max(TOP_K, int(TOP_K * profile.oversampling))
+    recall_source = "qdrant"
+    if emulate and profile.name == "scalar":
+        found = rescored(scalar_scores(vectors, queries), vectors, queries, candidates)
+        recall_source = "numpy int8 emulation"
+    elif emulate and profile.name == "product":
+        approx = product_scores(rng, vectors, queries, profile.pq_compression)
+        found = rescored(approx, vectors, queries, candidates)
+        recall_source = f"numpy PQ {profile.pq_compression} emulation"
+
+    footprint = profile.footprint(len(vectors))
+    client.delete_collection(collection)
+    return {
+        "profile": profile.name,
+        "dim": profile.dim,
+        "points": len(vectors),
+        "hnsw": profile.hnsw,
+        "oversampling": profile.oversampling if profile.quantized else None,
+        "ram_mb": round(footprint["ram"] / 2**20, 2),
+        "disk_mb": round(footprint["disk"] / 2**20, 2),
+        "load_s": round(load, 3),
+        "recall@10": round(recall(found, truth), 4),
+        "recall_source": recall_source,
+        "query": percentiles(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--points", type=int, default=20000, help="per modality")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--modalities", default="text,image")
+    parser.add_argument("--profiles", default=",".join(PROFILES))
+    parser.add_argument("--hnsw", default="{}", help='JSON, e.g. {"m": 16, "ef": 128}')
+    parser.add_argument("--oversampling", type=float, default=2.0)
+    parser.add_argument("--pq-compression", default="x16")
+    parser.add_argument("--url", help="Qdrant server (default: local in-memory)")
+    parser.add_argument("--out", help="results JSON (default bench-results/)")
+    args = parser.parse_args()
+
+    warnings.simplefilter("ignore")  # local mode warns about ignored configs
+    client = QdrantClient(args.url) if args.url else QdrantClient(":memory:")
+    rng = np.random.default_rng(0)
+    results = []
+    for modality in args.modalities.split(","):
+        dim = DIMS[modality]
+        vectors = clustered(rng, args.points, dim, args.clusters)
+        picks = vectors[rng.integers(args.points, size=args.queries)]
+        queries = picks + 0.3 * rng.standard_normal(picks.shape).astype(np.float32)
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+        truth = exact_top_k(vectors, queries, TOP_K)
+        for name in args.profiles.split(","):
+            profile = VectorProfile(
+                name,
+                dim,
+                json.loads(args.hnsw),
+                args.oversampling,
+                args.pq_compression,
+            )
+            result = run_profile(
+                client, profile, vectors, queries, truth, not args.url, rng
+            )
+            results.append({"modality": modality, **result})
+
+    print("-" * 86)
+    print(
+        f"{'modality':<9}{'profile':<9}{'ram':>10}{'disk':>10}{'recall@10':>11}"
+        f"{'p50':>10}{'p95':>10}  recall from"
+    )
+    for r in results:
+        print(
+            f"{r['modality']:<9}{r['profile']:<9}{r['ram_mb']:>7.1f} MB"
+            f"{r['disk_mb']:>7.1f} MB{r['recall@10']:>11.3f}"
+            f"{r['query']['p50_ms']:>8.2f}ms{r['query']['p95_ms']:>8.2f}ms"
+            f"  {r['recall_source']}"
+        )
+    print("-" * 86)
+    if not args.url:
+        print("local mode: latency is exact search for every profile (see header)")
+
+    sha, dirty = git_revision()
+    out = Path(args.out or ROOT / "bench-results" / f"vector-profiles-{sha}.json")
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(
+        json.dumps(
+            {
+                "meta": {
+                    "commit": sha,
+                    "dirty": dirty,
+                    "server": args.url or "local",
+                    "args": vars(args),
+                },
+                "results": results,
+            },
+            indent=2,
+        )
+    )
+    print(f"-> {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# scripts/bench_whisper.py
+# Compares the old single-call Whisper transcription with the chunked,
+# process-pool path (utils.transcribe.iter_whisper_segments) on a synthetic
+# local audio file: tone bursts separated by short silences, so the splitter
+# has natural cut points. Pass --audio to use a real recording instead.
+# The pool is started (one model load per worker) before timing, as the
+# server does once per process; its start-up is reported on its own.
+#
+#   python scripts/bench_whisper.py --minutes 10 --workers 0
+import argparse
+import os
+import sys
+import tempfile
+import time
+import wave
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "app"))
+
+from utils.transcribe import (  # noqa: E402
+    SAMPLE_RATE,
+    WhisperPool,
+    iter_whisper_segments,
+    load_s2t_model,
+)
+
+
+def synth_audio(path: str, minutes: float):
+    rng = np.random.default_rng(0)
+    parts, total = [], 0.0
+    while total < minutes * 60:
+        burst = rng.uniform(0.5, 3.0)
+        t = np.arange(int(SAMPLE_RATE * burst)) / SAMPLE_RATE
+        freq = rng.uniform(120, 400)
+        parts.append(0.3 * np.sin(2 * np.pi * freq * t) * np.sin(np.pi * t / burst))
+        gap = rng.uniform(0.2, 0.8)
+        parts.append(np.zeros(int(SAMPLE_RATE * gap)))
+        total += burst + gap
+    audio = np.concatenate(parts)
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes((audio * 32767).astype(np.int16).tobytes())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--minutes", type=float, default=10)
+    parser.add_argument("--audio", help="real audio/video file instead of synthetic")
+    parser.add_argument("--model", default="base")
+    parser.add_argument("--chunk-seconds", type=float, default=60)
+    parser.add_argument("--workers", type=int, default=0, help="0 = one per core")
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    path = args.audio
+    if path is None:
+        path = str(Path(tmp.name) / "synthetic.wav")
+        synth_audio(path, args.minutes)
+
+    # Old path: one transcribe() call over the whole file
+    model = load_s2t_model(args.model)
+    start = time.perf_counter()
+    single = model.transcribe(path, fp16=False, verbose=None)["segments"]
+    single_s = time.perf_counter() - start
+
+    # Chunked path: silence-split chunks in a process pool, streamed in order
+    workers = args.workers or len(os.sched_getaffinity(0))
+    pool = None
+    start = time.perf_counter()
+    if workers > 1:
+        pool = WhisperPool(args.model, workers)
+        pool.warm()
+    pool_s = time.perf_counter() - start
+
+    start, first = time.perf_counter(), None
+    chunked = []
+    for segment in iter_whisper_segments(
+        path,
+        chunk_seconds=args.chunk_seconds,
+        load_pool=lambda: pool,
+        load_s2t=lambda: model,
+    ):
+        first = first or time.perf_counter() - start
+        chunked.append(segment)
+    chunked_s = time.perf_counter() - start
+
+    if pool is not None:
+        pool.shutdown()
+    print(f"audio: {path if args.audio else f'{args.minutes:g} min synthetic'}")
+    print(f"pool start-up ({workers} workers, one model load each): {pool_s:.2f}s")
+    print("-" * 60)
+    print(f"{'single call':<14} {single_s:8.2f}s  {len(single):5d} segments")
+    print(
+        f"{'chunked':<14} {chunked_s:8.2f}s  {len(chunked):5d} segments  "
+        f"first segment after {first or 0:.2f}s"
+    )
+    print("-" * 60)
+    print(f"speed-up: {single_s / chunked_s:.2f}x")
+    tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+# scripts/eval_retrieval.py
+# Offline retrieval evaluation: dense-only vs hybrid (BM25 + dense, RRF) vs
+# hybrid + cross-encoder rerank. A synthetic transcript is seeded with
+# "needle" facts full of exact terms (identifiers, version numbers, names)
+# and each query asks for one of them; a query counts as recalled at k when
+# a node among the first k text nodes contains its needle. End-to-end latency
+# goes through ChatService.chat with a stub LLM that charges per prompt word,
+# so sending fewer nodes shows up as it would with a real model.
+#
+# The default dense model is a character-trigram hashing embedding (no
+# downloads); pass --real-models for the configured sentence-transformer.
+#
+#   python scripts/eval_retrieval.py --segments 400 --queries 100
+#   python scripts/eval_retrieval.py --real-models --rerank
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_pipeline import (  # noqa: E402
+    WORDS,
+    HashEmbedding,
+    StubLLM,
+    percentiles,
+    use_fake_storage,
+)
+
+NEEDLES = [
+    (
+        "the helper {ident} returns status code {num}",
+        "what status code does {ident} return?",
+    ),
+    (
+        "version {ver} fixed the {word} regression",
+        "which release fixed the {word} regression?",
+    ),
+    (
+        "{name} measured {num} requests per second",
+        "how many requests per second did {name} measure?",
+    ),
+    (
+        "set the flag {ident} to {num} for the {word} test",
+        "what value should {ident} be set to?",
+    ),
+]
+NAMES = ["Okonkwo", "Vasquez", "Lindqvist", "Nakamura", "Abernathy", "Szymanski"]
+
+
+class TrigramEmbedding(HashEmbedding):
+    # Character trigrams hashed into `dim` buckets: a download-free dense
+    # stand-in that, like small sentence models, blurs exact tokens
+    def _vector(self, key: bytes) -> list[float]:
+        text = f"  {key.decode(errors='ignore').lower()}  "
+        v = np.zeros(self.dim, dtype=np.float32)
+        for i in range(len(text) - 2):
+            digest = hashlib.blake2b(text[i : i + 3].encode(), digest_size=4).digest()
+            v[int.from_bytes(digest, "big") % self.dim] += 1.0
+        return (v / (np.linalg.norm(v) or 1.0)).tolist()
+
+
+def build_corpus(segments: int, queries: int, seed: int = 0):
+    rng = random.Random(seed)
+    transcript = []
+    for i in range(segments):
+        words = rng.choices(WORDS, k=rng.randint(10, 18))
+        transcript.append(
+            {"start": i * 5.0, "end": i * 5.0 + 5, "text": " ".join(words)}
+        )
+
+    cases = []
+    for q, i in enumerate(rng.sample(range(segments), min(queries, segments))):
+        fact, question = NEEDLES[q % len(NEEDLES)]
+        values = {
+            "ident": f"{rng.choice(WORDS)}_{rng.choice(WORDS)}_{q}",
+            "num": str(rng.randint(100, 99999)),
+            "ver": f"{rng.randint(1, 9)}.{rng.randint(0, 30)}.{q}",
+            "word": f"{rng.choice(WORDS)}{q}",
+            "name": f"{rng.choice(NAMES)}{q}",
+        }
+        needle = fact.format(**values)
+        transcript[i]["text"] += f". {needle}."
+        cases.append({"query": question.format(**values), "needle": needle})
+    return transcript, cases
+
+
+def index_corpus(video_id: str, transcript: list[dict]):
+    from config.settings import settings
+    from llama_index.core.node_parser import HierarchicalNodeParser
+    from src.ingest import IngestService
+    from src.models import ModelRegistry
+    from src.storage import StorageManager
+
+    parser = HierarchicalNodeParser.from_defaults(chunk_sizes=settings.CHUNK_SIZES)
+    nodes = parser.get_nodes_from_documents(
+        [IngestService._segment_doc(s, video_id) for s in transcript]
+    )
+    vectors = ModelRegistry.text_embed().get_text_embedding_batch(
+        [n.get_content() for n in nodes]
+    )
+    for node, vector in zip(nodes, vectors):
+        node.embedding = vector
+    StorageManager.delete_video_vectors(video_id)
+    StorageManager.ensure_video_collections(video_id)  # no frames, empty img
+    IngestService._build_index(video_id, nodes)
+    StorageManager.bump_video_version(video_id)
+    end = transcript[-1]["end"]
+    StorageManager.set_video_status(
+        video_id, state="indexed", indexed_until=end, duration=end
+    )
+    return len(nodes)
+
+
+def evaluate(name: str, retrieve, cases: list[dict], ks=(1, 3, 5)) -> dict:
+    from llama_index.core import QueryBundle
+    from llama_index.core.schema import ImageNode
+
+    hits = {k: 0 for k in ks}
+    latencies, returned, words = [], [], []
+    for case in cases:
+        start = time.perf_counter()
+        nodes = retrieve(QueryBundle(query_str=case["query"]))
+        latencies.append(time.perf_counter() - start)
+        text = [n for n in nodes if not isinstance(n.node, ImageNode)]
+        returned.append(len(text))
+        words.append(sum(len(n.node.get_content().split()) for n in text))
+        for k in ks:
+            hits[k] += any(case["needle"] in n.node.get_content() for n in text[:k])
+    return {
+        "config": name,
+        **{f"recall@{k}": round(hits[k] / len(cases), 3) for k in ks},
+        "nodes": round(float(np.mean(returned)), 2),
+        "context_words": round(float(np.mean(words)), 1),
+        "retrieve": percentiles(latencies),
+    }
+
+
+def end_to_end(video_id: str, cases: list[dict]) -> dict:
+    from src.chat import ChatService
+
+    latencies = []
+    for case in cases:
+        start = time.perf_counter()
+        ChatService.chat(video_id, case["query"])
+        latencies.append(time.perf_counter() - start)
+    return percentiles(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--segments", type=int, default=400)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--candidates", type=int, default=10)
+    parser.add_argument("--rerank", action="store_true", help="needs the model")
+    parser.add_argument("--real-models", action="store_true")
+    parser.add_argument(
+        "--prompt-ms", type=float, default=0.5, help="stub LLM cost per prompt word"
+    )
+    parser.add_argument("--out", help="write results as JSON")
+    args = parser.parse_args()
+
+    os.environ.update(
+        LOG_LEVEL="WARNING",
+        ANSWER_CACHE_ENABLED="false",
+        RETRIEVAL_TOP_K=str(args.top_k),
+        RETRIEVAL_CANDIDATES=str(args.candidates),
+        SEGMENT_INDEX="false",  # flat retrieval; bench_segments.py covers it
+    )
+    try:
+        import fakeredis
+    except ImportError:
+        sys.exit("fakeredis is required offline (pip install fakeredis)")
+    use_fake_storage(fakeredis.FakeServer())
+
+    from config.settings import settings
+    from src.chat import ChatService
+    from src.models import ModelRegistry
+
+    ModelRegistry._models["llm"] = StubLLM(
+        tokens=32, prompt_latency=args.prompt_ms / 1000
+    )
+    ModelRegistry._models["image_embed"] = HashEmbedding(dim=512)
+    if not args.real_models:
+        ModelRegistry._models["text_embed"] = TrigramEmbedding(dim=384)
+
+    video_id = "evalvideo"
+    transcript, cases = build_corpus(args.segments, args.queries)
+    start = time.perf_counter()
+    nodes = index_corpus(video_id, transcript)
+    print(
+        f"{args.segments} segments -> {nodes} nodes in {time.perf_counter() - start:.1f}s"
+        f", {len(cases)} queries"
+    )
+
+    configs = [("dense", "dense", False), ("hybrid", "hybrid", False)]
+    if args.rerank:
+        configs.append(("hybrid+rerank", "hybrid", True))
+
+    results = []
+    for name, mode, rerank in configs:
+        settings.RETRIEVAL_MODE = mode
+        settings.RERANK_ENABLED = rerank
+        ChatService.engines.clear()
+        engine = ChatService.get_query_engine(video_id)
+        if mode == "hybrid" and not rerank:
+            # The hybrid retriever's dense half: what raising top-k buys
+            results.append(
+                evaluate(
+                    f"dense@{args.candidates}", engine.retriever.dense.retrieve, cases
+                )
+            )
+        result = evaluate(name, engine.retrieve, cases)
+        result["end_to_end"] = end_to_end(video_id, cases)
+        results.append(result)
+
+    print("-" * 96)
+    print(
+        f"{'config':<16}{'r@1':>7}{'r@3':>7}{'r@5':>7}{'nodes':>7}{'words':>8}"
+        f"{'retr p50':>11}{'retr p95':>11}{'e2e p50':>10}{'e2e p95':>10}"
+    )
+    for r in results:
+        e2e = r.get("end_to_end", {})
+        print(
+            f"{r['config']:<16}{r['recall@1']:>7.2f}{r['recall@3']:>7.2f}"
+            f"{r['recall@5']:>7.2f}{r['nodes']:>7.1f}{r['context_words']:>8.0f}"
+            f"{r['retrieve']['p50_ms']:>9.1f}ms{r['retrieve']['p95_ms']:>9.1f}ms"
+            f"{e2e.get('p50_ms', float('nan')):>8.1f}ms"
+            f"{e2e.get('p95_ms', float('nan')):>8.1f}ms"
+        )
+    print("-" * 96)
+    if args.out:
+        Path(args.out).write_text(json.dumps({"args": vars(args), "results": results}))
+        print(f"-> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+# scripts/fake_s3.py
+# Minimal in-memory S3 server, enough of the API for the MinIO client used by
+# StorageManager (bucket checks, PUT/HEAD/GET object, multipart
+# uploads, ranged GET). Each request
+# sleeps for `latency` seconds to mimic a network round-trip.
+import hashlib
+import threading
+import time
+import uuid
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+LOCATION_XML = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<LocationConstraint xmlns="http://s3.amazonaws.com/doc/2006-03-01/">'
+    "us-east-1</LocationConstraint>"
+)
+
+
+class FakeS3Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0):
+        super().__init__((host, port), FakeS3Handler)
+        self.latency = latency
+        self.buckets: set[str] = set()
+        self.objects: dict[tuple[str, str], tuple[bytes, dict]] = {}
+        self.uploads: dict[str, tuple[dict, dict[int, bytes]]] = {}
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    @property
+    def endpoint(self) -> str:
+        return f"{self.server_address[0]}:{self.server_address[1]}"
+
+    def start(self) -> "FakeS3Server":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class FakeS3Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _route(self):
+        with self.server.lock:
+            self.server.requests += 1
+        time.sleep(self.server.latency)
+        url = urlparse(self.path)
+        bucket, _, key = unquote(url.path).lstrip("/").partition("/")
+        return bucket, key, url.query
+
+    def _send(self, status: int, body: bytes = b"", headers: dict | None = None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _object_headers(self, data: bytes, meta: dict) -> dict:
+        return {
+            "ETag": f'"{hashlib.md5(data).hexdigest()}"',
+            "Last-Modified": formatdate(usegmt=True),
+            "Content-Type": meta.get("content-type", "application/octet-stream"),
+            **{k: v for k, v in meta.items() if k.startswith("x-amz-meta-")},
+        }
+
+    def do_PUT(self):
+        bucket, key, query = self._route()
+        length = int(self.headers.get("Content-Length", 0))
+        data = self.rfile.read(length)
+        if not key:
+            self.server.buckets.add(bucket)
+            return self._send(200)
+        params = parse_qs(query)
+        if "uploadId" in params:
+            _, parts = self.server.uploads[params["uploadId"][0]]
+            parts[int(params["partNumber"][0])] = data
+            return self._send(
+                200, headers={"ETag": f'"{hashlib.md5(data).hexdigest()}"'}
+            )
+        meta = {k.lower(): v for k, v in self.headers.items()}
+        self.server.objects[(bucket, key)] = (data, meta)
+        self._send(200, headers={"ETag": f'"{hashlib.md5(data).hexdigest()}"'})
+
+    def do_POST(self):
+        # Multipart uploads, used by the client for objects over 5 MiB
+        bucket, key, query = self._route()
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        params = parse_qs(query, keep_blank_values=True)
+        if "uploads" in params:
+            upload_id = uuid.uuid4().hex
+            meta = {k.lower(): v for k, v in self.headers.items()}
+            self.server.uploads[upload_id] = (meta, {})
+            body = (
+                "<InitiateMultipartUploadResult>"
+                f"<Bucket>{bucket}</Bucket><Key>{key}</Key>"
+                f"<UploadId>{upload_id}</UploadId>"
+                "</InitiateMultipartUploadResult>"
+            )
+            return self._send(200, body.encode(), {"Content-Type": "application/xml"})
+
+        meta, parts = self.server.uploads.pop(params["uploadId"][0])
+        data = b"".join(parts[n] for n in sorted(parts))
+        self.server.objects[(bucket, key)] = (data, meta)
+        body = (
+            "<CompleteMultipartUploadResult>"
+            f"<Bucket>{bucket}</Bucket><Key>{key}</Key>"
+            f'<ETag>"{hashlib.md5(data).hexdigest()}-{len(parts)}"</ETag>'
+            "</CompleteMultipartUploadResult>"
+        )
+        self._send(200, body.encode(), {"Content-Type": "application/xml"})
+
+    def do_HEAD(self):
+        bucket, key, _ = self._route()
+        if not key:
+            return self._send(200 if bucket in self.server.buckets else 404)
+        obj = self.server.objects.get((bucket, key))
+        if obj is None:
+            return self._send(404)
+        data, meta = obj
+        self.send_response(200)
+        for name, value in self._object_headers(data, meta).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+
+    def do_GET(self):
+        bucket, key, query = self._route()
+        if not key and "location" in query:
+            return self._send(
+                200, LOCATION_XML.encode(), {"Content-Type": "application/xml"}
+            )
+        obj = self.server.objects.get((bucket, key))
+        if obj is None:
+            return self._send(404)
+        data, meta = obj
+        headers = self._object_headers(data, meta)
+        byte_range = self.headers.get("Range")
+        if byte_range:
+            start, _, end = byte_range.removeprefix("bytes=").partition("-")
+            start, end = int(start), int(end) if end else len(data) - 1
+            headers["Content-Range"] = f"bytes {start}-{end}/{len(data)}"
+            return self._send(206, data[start : end + 1], headers)
+        self._send(200, data, headers)
+
+    def log_message(self, *args):
+        pass
@@ -0,0 +1,95 @@
+# scripts/migrate_qdrant_layout.py
+# Copies per-video collections (text_{id} / img_{id}) into the shared
+# collections used by QDRANT_LAYOUT=shared, tagging every point with its
+# video_id. Point ids, vectors and payloads are kept, so the Redis index
+# stores stay valid. Set QDRANT_LAYOUT=shared once this has run.
+#
+#   python scripts/migrate_qdrant_layout.py [--drop] [--dry-run]
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "app"))
+
+from config.settings import settings  # noqa: E402
+from qdrant_client import QdrantClient, models  # noqa: E402
+
+BATCH = 256
+
+
+def ensure_shared(client: QdrantClient, source: str, target: str):
+    if client.collection_exists(target):
+        return
+    params = client.get_collection(source).config.params
+    client.create_collection(target, vectors_config=params.vectors)
+    client.create_payload_index(
+        target,
+        field_name="video_id",
+        field_schema=models.KeywordIndexParams(type="keyword", is_tenant=True),
+    )
+
+
+def migrate_collection(client: QdrantClient, source: str, target: str, video_id: str):
+    copied, offset = 0, None
+    while True:
+        points, offset = client.scroll(
+            source,
+            limit=BATCH,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True,
+        )
+        if points:
+            client.upsert(
+                target,
+                points=[
+                    models.PointStruct(
+                        id=p.id,
+                        vector=p.vector,
+                        payload={**p.payload, "video_id": video_id},
+                    )
+                    for p in points
+                ],
+            )
+            copied += len(points)
+        if offset is None:
+            return copied
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default=settings.QDRANT_URL)
+    parser.add_argument(
+        "--drop", action="store_true", help="delete migrated collections"
+    )
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    client = QdrantClient(args.url)
+    targets = {
+        "text_": settings.QDRANT_TEXT_COLLECTION,
+        "img_": settings.QDRANT_IMAGE_COLLECTION,
+    }
+
+    for collection in sorted(c.name for c in client.get_collections().collections):
+        prefix = next((p for p in targets if collection.startswith(p)), None)
+        if prefix is None or collection in targets.values():
+            continue
+        video_id, target = collection[len(prefix) :], targets[prefix]
+        total = client.count(collection).count
+        print(f"{collection} → {target} (video_id={video_id}, {total} points)")
+        if args.dry_run:
+            continue
+
+        ensure_shared(client, collection, target)
+        copied = migrate_collection(client, collection, target, video_id)
+        if copied != total:
+            print(f"   [WARN] copied {copied} of {total} points, keeping source")
+            continue
+        if args.drop:
+            client.delete_collection(collection)
+            print("   dropped source collection")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+# test/test_batch_ingest.py
+# Batch ingest end to end, in process and offline: playlist URLs expand
+# through a fake lister, downloads copy a short synthetic video (fake
+# downloader), and storage/models are the scripts/bench_pipeline.py
+# stand-ins (fake S3, fakeredis, in-memory Qdrant, hash embeddings).
+# Checks URL forms and dedupe, per-video results, rejected URLs, and that
+# downloads, processing, transcription and embedding stay within their
+# pool sizes.
+#
+#   pytest test/test_batch_ingest.py   (needs fakeredis)
+import sys
+import threading
+import time
+from argparse import Namespace
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "app"))
+sys.path.insert(0, str(ROOT / "scripts"))
+
+fakeredis = pytest.importorskip("fakeredis")
+
+import main  # noqa: E402
+from bench_pipeline import HashEmbedding, install_standins, synth_video  # noqa: E402
+from config.settings import settings  # noqa: E402
+from fake_s3 import FakeS3Server  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from src import ingest, jobs  # noqa: E402
+from src.artifacts import ArtifactCache  # noqa: E402
+from src.ingest import IngestService  # noqa: E402
+from src.models import ModelRegistry  # noqa: E402
+from src.storage import StorageManager, _connect_minio  # noqa: E402
+from utils.helpers import parse_video_id  # noqa: E402
+
+PLAYLIST = "https://www.youtube.com/playlist?list=PLbatchtest"
+URLS = [
+    "https://youtu.be/vidaaaaaaa1?si=share",
+    "https://www.youtube.com/shorts/vidaaaaaaa1",  # same video
+    "https://m.youtube.com/watch?v=vidbbbbbbb2&t=30s",
+    PLAYLIST,  # vidbbbbbbb2 again, vidccccccc3, brokenvid04
+    "https://example.com/not-youtube",
+]
+
+
+class Concurrency:
+    # Highest number of threads inside `track` at once, per name
+    def __init__(self):
+        self.current, self.peak = {}, {}
+        self.lock = threading.Lock()
+
+    def track(self, name: str, fn):
+        with self.lock:
+            self.current[name] = self.current.get(name, 0) + 1
+            self.peak[name] = max(self.peak.get(name, 0), self.current[name])
+        try:
+            return fn()
+        finally:
+            with self.lock:
+                self.current[name] -= 1
+
+
+@pytest.fixture
+def video_path(monkeypatch, tmp_path):
+    # Offline stand-ins for storage, models and downloads, all undone after
+    # the test; returns the synthetic video the downloads copy
+    server = FakeS3Server().start()
+    monkeypatch.setattr(settings, "MINIO_ENDPOINT", server.endpoint)
+    monkeypatch.setattr(settings, "MINIO_SECURE", False)
+    monkeypatch.setattr(StorageManager, "minio", _connect_minio())
+    monkeypatch.setattr(IngestService, "artifacts", ArtifactCache(tmp_path / "cache"))
+    monkeypatch.setattr(ModelRegistry, "_models", dict(ModelRegistry._models))
+    # install_standins assigns these directly; recording their current
+    # values first lets monkeypatch put them back
+    for target, names in (
+        (StorageManager, ("redis", "aredis", "index_kvstore", "qdrant", "aqdrant")),
+        (ingest, ("download_video", "iter_transcript")),
+    ):
+        for name in names:
+            monkeypatch.setattr(target, name, vars(target)[name])
+    monkeypatch.chdir(tmp_path)
+
+    path = str(tmp_path / "synthetic.mp4")
+    synth_video(path, seconds=6, scene_seconds=2)
+    args = Namespace(
+        whisper=False, seconds=6, real_models=False, llm_tokens=8, llm_token_ms=0
+    )
+    install_standins(args, path, fakeredis.FakeServer())
+
+    manager = jobs.IngestJobManager(max_workers=2, download_workers=2, max_active=3)
+    monkeypatch.setattr(main, "ingest_jobs", manager)
+    yield path
+    manager.shutdown()
+    server.shutdown()
+
+
+def test_batch_ingest(monkeypatch, video_path):
+    seen = Concurrency()
+    downloaded = []
+
+    def fake_download(url, out_dir="video_data"):
+        video_id = parse_video_id(url)
+        downloaded.append(video_id)
+
+        def copy():
+            time.sleep(0.3)  # long enough for downloads to overlap
+            if video_id == "brokenvid04":
+                raise RuntimeError("HTTP Error 403: Forbidden")
+            target = Path(out_dir) / f"{video_id}.mp4"
+            target.write_bytes(Path(video_path).read_bytes())
+            return str(target), video_id, []
+
+        return seen.track("download", copy)
+
+    def fake_playlist(url, limit=None):
+        if url != PLAYLIST:
+            raise ValueError(f"Unsupported URL: {url}")
+        return ["vidbbbbbbb2", "vidccccccc3", "brokenvid04"][:limit]
+
+    process = IngestService.process.__func__
+    monkeypatch.setattr(
+        IngestService,
+        "process",
+        classmethod(
+            lambda cls, fetched, progress=None: seen.track(
+                "process", lambda: process(cls, fetched, progress)
+            )
+        ),
+    )
+    monkeypatch.setattr(ingest, "download_video", fake_download)
+    monkeypatch.setattr(jobs, "list_playlist", fake_playlist)
+
+    # Two videos process at once, but share one transcription and one
+    # embedding slot
+    monkeypatch.setattr(IngestService, "transcribe_slots", threading.Semaphore(1))
+    monkeypatch.setattr(IngestService, "embed_slots", threading.Semaphore(1))
+    transcript = ingest.iter_transcript
+
+    def slow_transcript(*args, **kwargs):
+        yield from seen.track(
+            "transcribe",
+            lambda: time.sleep(0.2) or list(transcript(*args, **kwargs)),
+        )
+
+    monkeypatch.setattr(ingest, "iter_transcript", slow_transcript)
+    for name in ("_get_text_embedding", "_get_image_embedding"):
+        embed = getattr(HashEmbedding, name)
+        monkeypatch.setattr(
+            HashEmbedding,
+            name,
+            lambda self, item, embed=embed: seen.track(
+                "embed", lambda: time.sleep(0.01) or embed(self, item)
+            ),
+        )
+
+    client = TestClient(main.app)  # no lifespan: stand-in clients are already set
+    response = client.post("/ingest/batch", json={"urls": URLS})
+    assert response.status_code == 200, response.text
+    batch = response.json()
+    assert [v["video_id"] for v in batch["videos"]] == [
+        "vidaaaaaaa1",
+        "vidbbbbbbb2",
+        "vidccccccc3",
+        "brokenvid04",
+    ], batch["videos"]
+    assert batch["duplicates"] == 2, batch
+    assert [r["url"] for r in batch["rejected"]] == [URLS[-1]], batch["rejected"]
+
+    deadline = time.time() + 300
+    while batch["status"] == "running":
+        assert time.time() < deadline, batch
+        time.sleep(0.5)
+        batch = client.get(f"/ingest/batch/{batch['batch_id']}").json()
+
+    results = {v["video_id"]: v for v in batch["videos"]}
+    assert batch["counts"] == {"completed": 3, "failed": 1}, batch["counts"]
+    assert "403" in results["brokenvid04"]["error"], results["brokenvid04"]
+    assert all(results[v]["frames"] > 0 for v in ("vidaaaaaaa1", "vidccccccc3"))
+    assert sorted(downloaded) == sorted(results), downloaded  # one download each
+    assert seen.peak["download"] == 2, seen.peak
+    assert seen.peak["process"] == 2, seen.peak
+    assert seen.peak["transcribe"] == 1, seen.peak
+    assert seen.peak["embed"] == 1, seen.peak
+
+    # Each video is a regular job too, and bad single URLs are a 422
+    job = client.get(f"/ingest/{results['vidaaaaaaa1']['job_id']}").json()
+    assert job["status"] == "completed" and job["timings"]["total"] > 0, job
+    assert client.post("/ingest", json={"video_url": PLAYLIST}).status_code == 422
+    assert client.get("/ingest/batch/unknown").status_code == 404
@@ -0,0 +1,194 @@
+# test/test_chat_stream.py
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "app"))
+
+import main  # noqa: E402
+from config.settings import settings  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from llama_index.core.schema import NodeWithScore, TextNode  # noqa: E402
+from llama_index.llms.ollama import Ollama  # noqa: E402
+from src.chat import ChatService  # noqa: E402
+from src.models import ModelRegistry  # noqa: E402
+
+TOKENS = ["The ", "speaker ", "explains ", "gradients."]
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    # Stands in for Ollama's /api/chat, streaming one NDJSON chunk per token
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+
+        if getattr(self.server, "fail", False):
+            self.send_response(500)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(json.dumps({"error": "model crashed"}).encode())
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+
+        for token in TOKENS:
+            chunk = {
+                "model": body.get("model", "fake"),
+                "created_at": "2025-01-01T00:00:00Z",
+                "message": {"role": "assistant", "content": token},
+                "done": False,
+            }
+            self.wfile.write((json.dumps(chunk) + "\n").encode())
+            self.wfile.flush()
+
+        final = {
+            "model": body.get("model", "fake"),
+            "created_at": "2025-01-01T00:00:00Z",
+            "message": {"role": "assistant", "content": ""},
+            "done": True,
+            "prompt_eval_count": 12,
+            "eval_count": len(TOKENS),
+        }
+        self.wfile.write((json.dumps(final) + "\n").encode())
+
+    def log_message(self, *args):
+        pass
+
+
+def start_fake_ollama(fail: bool = False) -> ThreadingHTTPServer:
+    # fail: answer every chat with a 500, as a crashed model would
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOllamaHandler)
+    server.fail = fail
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def fake_llm(server: ThreadingHTTPServer) -> Ollama:
+    return Ollama(
+        model="fake",
+        base_url=f"http://127.0.0.1:{server.server_port}",
+        request_timeout=10,
+        context_window=2048,
+    )
+
+
+def retrieved_nodes() -> list[NodeWithScore]:
+    return [
+        NodeWithScore(
+            node=TextNode(
+                text="Backpropagation computes gradients layer by layer.",
+                metadata={"type": "text", "start": 62.0, "end": 75.5},
+            ),
+            score=0.9,
+        )
+    ]
+
+
+def test_chat_stream():
+    server = start_fake_ollama()
+    llm = fake_llm(server)
+    nodes = retrieved_nodes()
+
+    try:
+        frames = list(ChatService.stream_answer("What is explained?", nodes, llm=llm))
+    finally:
+        server.shutdown()
+
+    for frame in frames:
+        print(frame)
+
+    assert frames[0]["type"] == "sources"
+    assert frames[0]["sources"][0]["time"] == "01:02–01:15"
+
+    tokens = [f["text"] for f in frames if f["type"] == "token"]
+    assert tokens == TOKENS
+
+    assert frames[-1]["type"] == "done"
+    assert frames[-1]["answer"] == "".join(TOKENS)
+    assert frames[-1]["time_to_first_token"] <= frames[-1]["elapsed"]
+
+    print("-" * 60)
+    print("TEST PASSED")
+
+
+@pytest.fixture
+def stream_route(monkeypatch):
+    # /chat/stream over an indexed video whose retrieval returns
+    # retrieved_nodes(); the LLM is set per test through the fake Ollama
+    async def acoverage(cls, video_id):
+        if video_id != "vidstream01":
+            raise LookupError(f"Video {video_id} has not been ingested")
+        return {}
+
+    class Engine:
+        def retrieve(self, query_bundle):
+            return retrieved_nodes()
+
+    monkeypatch.setattr(settings, "APP_ROLE", "all")
+    monkeypatch.setattr(settings, "ANSWER_CACHE_ENABLED", False)
+    monkeypatch.setattr(ChatService, "acoverage", classmethod(acoverage))
+    monkeypatch.setattr(ChatService, "coverage", classmethod(lambda cls, v: {}))
+    monkeypatch.setattr(
+        ChatService, "get_query_engine", classmethod(lambda cls, v: Engine())
+    )
+
+    def use_llm(llm):
+        monkeypatch.setattr(ModelRegistry, "llm", classmethod(lambda cls: llm))
+
+    return TestClient(main.app), use_llm
+
+
+def stream_frames(client: TestClient, video_id: str) -> list[dict]:
+    response = client.post(
+        "/chat/stream", data={"video_id": video_id, "query": "What is explained?"}
+    )
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_chat_stream_route(stream_route):
+    client, use_llm = stream_route
+    server = start_fake_ollama()
+    use_llm(fake_llm(server))
+    try:
+        frames = stream_frames(client, "vidstream01")
+    finally:
+        server.shutdown()
+
+    # One sources frame, a token frame per delta, then done
+    assert [f["type"] for f in frames] == ["sources"] + ["token"] * len(TOKENS) + [
+        "done"
+    ], frames
+    assert frames[0]["sources"][0]["time"] == "01:02–01:15"
+    assert [f["text"] for f in frames[1:-1]] == TOKENS
+    assert frames[-1]["answer"] == "".join(TOKENS)
+
+    response = client.post(
+        "/chat/stream", data={"video_id": "unknown0001", "query": "Anything?"}
+    )
+    assert response.status_code == 404
+
+
+def test_chat_stream_route_error(stream_route):
+    client, use_llm = stream_route
+    server = start_fake_ollama(fail=True)
+    use_llm(fake_llm(server))
+    try:
+        frames = stream_frames(client, "vidstream01")
+    finally:
+        server.shutdown()
+
+    # The response has started, so the failure arrives as a final frame
+    assert [f["type"] for f in frames] == ["sources", "error"], frames
+    assert frames[-1]["detail"]
+
+
+if __name__ == "__main__":
+    test_chat_stream()
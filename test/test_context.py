@@ -0,0 +1,58 @@
+# test/test_context.py
+# Merging of adjacent transcript segments when the context is packed.
+# YouTube captions usually run past the next caption's start, so the
+# neighbours to merge often overlap rather than touch.
+#
+#   pytest test/test_context.py
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "app"))
+
+from config.settings import settings  # noqa: E402
+from llama_index.core.schema import NodeWithScore, TextNode  # noqa: E402
+from src.context import _merge_adjacent  # noqa: E402
+
+
+def segment(text: str, start: float, end: float, score: float, video_id="vid1"):
+    node = TextNode(
+        text=text,
+        metadata={"start": start, "end": end, "type": "text", "video_id": video_id},
+    )
+    return NodeWithScore(node=node, score=score)
+
+
+def test_overlapping_segments_merge():
+    merged = _merge_adjacent(
+        [
+            segment("and then the gradient", 12.0, 15.5, 0.4),
+            segment("so we start with", 10.0, 13.2, 0.9),  # runs into the next
+            segment("flows backwards", 15.1, 17.0, 0.5),
+        ]
+    )
+    assert len(merged) == 1, [m.node.metadata for m in merged]
+    node = merged[0].node
+    assert node.text == "so we start with and then the gradient flows backwards"
+    assert (node.metadata["start"], node.metadata["end"]) == (10.0, 17.0)
+    assert merged[0].score == 0.9
+
+
+def test_merge_keeps_the_later_end():
+    # A short caption inside a longer one doesn't pull the end back
+    merged = _merge_adjacent(
+        [segment("a long caption", 0.0, 8.0, 0.5), segment("brief", 3.0, 4.0, 0.6)]
+    )
+    assert len(merged) == 1
+    assert merged[0].node.metadata["end"] == 8.0
+
+
+def test_gaps_and_other_videos_stay_apart():
+    gap = settings.CONTEXT_MERGE_GAP
+    merged = _merge_adjacent(
+        [
+            segment("first", 0.0, 5.0, 0.9),
+            segment("much later", 5.0 + gap + 1.0, 12.0, 0.8),
+            segment("other video", 4.0, 6.0, 0.7, video_id="vid2"),
+        ]
+    )
+    assert [m.node.text for m in merged] == ["first", "much later", "other video"]
@@ -1,5 +1,6 @@
 # ingest_video.py
 import sys
+import time
 
 import requests
 
@@ -16,10 +17,30 @@ def ingest(video_url: str):
         sys.exit(1)
 
     data = response.json()
+    print(f"Job {data['job_id']} {data['status']}")
+    while data["status"] in ("queued", "running"):
+        time.sleep(2)
+        data = requests.get(f"{BASE_URL}/ingest/{data['job_id']}").json()
+        print(f"   stage: {data['stage'] or '-'} ({data['status']})")
+
+    if data["status"] != "completed":
+        print(f"Failed: {data['error']}")
+        sys.exit(1)
+
     video_id = data["video_id"]
     print("SUCCESS!")
     print(f"   Video ID: {video_id}")
     print(f"   Frames extracted: {data['frames']}")
+    print(f"   Frames dropped (near-duplicates): {data['frames_dropped']}")
+    print(f"   Cache hits: {', '.join(data['cache_hits']) or 'none'}")
+    disk = data.get("disk", {})
+    print(
+        f"   Disk: {disk.get('written', 0) / 1e6:.1f} MB written, "
+        f"peak {disk.get('peak', 0) / 1e6:.1f} MB; "
+        f"frames stored: {data.get('frame_bytes', 0) / 1e6:.1f} MB"
+    )
+    for stage, seconds in data["timings"].items():
+        print(f"   {stage:>12}: {seconds:.2f}s")
     print(f"\nUse this ID to chat: python test_chat.py {video_id}")
     print(f'   Example: python test_chat.py {video_id} "What is shown at 3:00?"')
 
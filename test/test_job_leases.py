@@ -0,0 +1,99 @@
+# test/test_job_leases.py
+# Ingest job ownership across replicas, offline on fakeredis: two
+# IngestJobManagers stand in for two replicas sharing one Redis. Jobs are
+# only recorded as submitted, never run. Checks that a restarting replica
+# leaves jobs leased by a live one alone and adopts them once the lease
+# expires, that concurrent submitters taking over a stale claim agree
+# on a single job, and that a job finishing while resume() runs stays
+# finished.
+#
+#   pytest test/test_job_leases.py   (needs fakeredis)
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "app"))
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from src.jobs import IngestJobManager  # noqa: E402
+from src.storage import StorageManager  # noqa: E402
+
+URL = "https://www.youtube.com/watch?v=leasetest01"
+
+
+@pytest.fixture
+def replicas(monkeypatch):
+    monkeypatch.setattr(
+        StorageManager, "redis", fakeredis.FakeRedis(decode_responses=True)
+    )
+    managers = [IngestJobManager(), IngestJobManager()]
+    for manager in managers:
+        manager.queued = []
+        monkeypatch.setattr(
+            manager.downloads,
+            "submit",
+            lambda fn, job_id, m=manager: m.queued.append(job_id),
+        )
+    yield managers
+    for manager in managers:
+        manager.shutdown()
+
+
+def test_resume_only_adopts_expired_leases(replicas):
+    live, restarted = replicas
+    job = live.submit(URL)
+    assert live.queued == [job["job_id"]]
+
+    assert restarted.resume() == []  # still leased by the live replica
+    assert restarted.queued == []
+
+    StorageManager.redis.delete(f"{live.lease_prefix}{job['job_id']}")  # expired
+    assert restarted.resume() == [job["job_id"]]
+    assert restarted.queued == [job["job_id"]]
+    assert (
+        StorageManager.redis.get(f"{live.inflight_prefix}leasetest01") == job["job_id"]
+    )
+    assert restarted.resume() == []  # now its own
+
+
+def test_stale_claim_has_one_winner(replicas):
+    StorageManager.redis.set(f"{IngestJobManager.inflight_prefix}leasetest01", "gone")
+    barrier = threading.Barrier(len(replicas))
+    jobs = [None] * len(replicas)
+
+    def submit(i):
+        barrier.wait()
+        jobs[i] = replicas[i].submit(URL)
+
+    threads = [threading.Thread(target=submit, args=(i,)) for i in range(len(replicas))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert jobs[0]["job_id"] == jobs[1]["job_id"], jobs
+    assert sum(len(m.queued) for m in replicas) == 1
+
+
+def test_resume_skips_job_finished_after_snapshot(replicas, monkeypatch):
+    live, restarted = replicas
+    job = live.submit(URL)
+    StorageManager.redis.delete(f"{live.lease_prefix}{job['job_id']}")  # expired
+    lease = restarted._lease
+
+    def finish_then_lease(job_id):
+        # The live replica completes the job after resume() took its snapshot
+        live.active.acquire()  # as _run would have
+        live._update(live.get(job_id), status="completed")
+        live._finish(live.get(job_id))
+        return lease(job_id)
+
+    monkeypatch.setattr(restarted, "_lease", finish_then_lease)
+    assert restarted.resume() == []
+    assert restarted.queued == []
+    assert restarted.leases == set()
+    assert live.get(job["job_id"])["status"] == "completed"
+    assert StorageManager.redis.get(f"{live.lease_prefix}{job['job_id']}") is None
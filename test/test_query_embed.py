@@ -0,0 +1,90 @@
+# test/test_query_embed.py
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "app"))
+
+from llama_index.core.embeddings import MockEmbedding  # noqa: E402
+from src.models import BatchingEmbedding, ModelRegistry  # noqa: E402
+
+
+class CountingEmbedding(MockEmbedding):
+    # Records the size of every batched forward pass
+    def __init__(self, **kwargs):
+        super().__init__(embed_dim=8, **kwargs)
+        object.__setattr__(self, "calls", [])
+
+    def _get_text_embeddings(self, texts):
+        self.calls.append(len(texts))
+        time.sleep(0.02)  # a forward pass long enough for callers to queue up
+        return [[float(len(t))] * 8 for t in texts]
+
+
+def test_query_embed():
+    model = CountingEmbedding()
+    embed = BatchingEmbedding(model, window=0.05, max_batch=16)
+    queries = [f"question number {i}" for i in range(16)]
+
+    barrier = threading.Barrier(len(queries))
+
+    def ask(query):
+        barrier.wait()
+        return embed.get_query_embedding(query)
+
+    with ThreadPoolExecutor(max_workers=len(queries)) as pool:
+        vectors = list(pool.map(ask, queries))
+
+    stats = embed.stats()
+    print(stats)
+    assert vectors[3] == [float(len(queries[3]))] * 8
+    assert stats["queries"] == len(queries)
+    assert stats["batches"] < len(queries)
+    assert sum(model.calls) == len(queries)
+
+    # Case and whitespace variants are served from the cache
+    calls = len(model.calls)
+    assert embed.get_query_embedding("  Question   NUMBER 3 ") == vectors[3]
+    assert len(model.calls) == calls
+    assert embed.stats()["cache"]["hits"] == 1
+
+    print("-" * 60)
+    print("TEST PASSED")
+
+
+def test_registry_load_does_not_block_loaded_models():
+    # A slow first load (say the text embedder on the first ingest) must not
+    # stall lookups of models that are already loaded
+    saved = dict(ModelRegistry._models)
+    ModelRegistry._models.update(query_embed="loaded")
+    ModelRegistry._models.pop("slow_model", None)
+    started = threading.Event()
+
+    def load():
+        started.set()
+        time.sleep(0.5)
+        return "slow"
+
+    try:
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            loads = [pool.submit(ModelRegistry._get, "slow_model", load)]
+            started.wait()
+            begin = time.perf_counter()
+            assert ModelRegistry._get("query_embed", None) == "loaded"
+            assert time.perf_counter() - begin < 0.1
+            # Concurrent callers of the loading model wait for that one load
+            loads += [
+                pool.submit(ModelRegistry._get, "slow_model", load) for _ in range(2)
+            ]
+            assert [f.result() for f in loads] == ["slow"] * 3
+    finally:
+        ModelRegistry._models.clear()
+        ModelRegistry._models.update(saved)
+        ModelRegistry.load_times.pop("slow_model", None)
+
+
+if __name__ == "__main__":
+    test_query_embed()
+    test_registry_load_does_not_block_loaded_models()